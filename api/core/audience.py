@@ -0,0 +1,111 @@
+"""
+Maintenance of the materialized `alert_recipients` audience table.
+
+Visibility used to be re-derived on every inbox load and reminder scan with
+`is_org_wide OR target_teams.any(...) OR target_users.any(...)`. The audience
+of every targeted alert is now resolved once, when the alert is created or its
+targets change, and kept in sync when users are created or change team.
+Org-wide alerts are never expanded into rows; `Alert.is_org_wide` covers them.
+
+Usage (from the api/ directory):
+    python -m core.audience rebuild
+"""
+import argparse
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, delete, insert, select, union
+from sqlalchemy.orm import Session
+
+from services import models
+from services.database import SessionLocal, engine
+from services.migrations import run_migrations
+
+recipients = models.alert_recipients
+
+def _audience_select(alert_ids: Optional[Iterable[int]] = None, user_ids: Optional[Iterable[int]] = None):
+    """(alert_id, user_id) pairs of every targeted, non-org-wide alert, optionally narrowed."""
+    direct = select(models.alert_target_users.c.alert_id, models.alert_target_users.c.user_id)
+    via_team = select(models.alert_target_teams.c.alert_id, models.User.id). \
+        join(models.User, models.User.team_id == models.alert_target_teams.c.team_id)
+
+    if alert_ids is not None:
+        alert_ids = list(alert_ids)
+        direct = direct.where(models.alert_target_users.c.alert_id.in_(alert_ids))
+        via_team = via_team.where(models.alert_target_teams.c.alert_id.in_(alert_ids))
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        direct = direct.where(models.alert_target_users.c.user_id.in_(user_ids))
+        via_team = via_team.where(models.User.id.in_(user_ids))
+
+    pairs = union(direct, via_team).subquery()
+    return select(pairs.c.alert_id, pairs.c.user_id). \
+        join(models.Alert, models.Alert.id == pairs.c.alert_id). \
+        where(models.Alert.is_org_wide == False)
+
+def rebuild_alert_audience(db: Session, alert_ids: Iterable[int]):
+    """Re-resolves the audience of the given alerts. The caller commits."""
+    alert_ids = list(alert_ids)
+    if not alert_ids:
+        return
+    db.execute(delete(recipients).where(recipients.c.alert_id.in_(alert_ids)))
+    db.execute(insert(recipients).from_select(["alert_id", "user_id"], _audience_select(alert_ids=alert_ids)))
+
+def sync_user_audience(db: Session, user_id: int):
+    """Re-resolves which targeted alerts a user belongs to, e.g. after creation or a team change. The caller commits."""
+    sync_users_audience(db, [user_id])
+
+def sync_users_audience(db: Session, user_ids: Iterable[int]):
+    """`sync_user_audience` for many users at once, as bulk imports create or move them. The caller commits."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    db.execute(delete(recipients).where(recipients.c.user_id.in_(user_ids)))
+    db.execute(insert(recipients).from_select(["alert_id", "user_id"], _audience_select(user_ids=user_ids)))
+
+def rebuild_all(db: Session):
+    """Rebuilds the whole table from the alert targets."""
+    db.execute(delete(recipients))
+    db.execute(insert(recipients).from_select(["alert_id", "user_id"], _audience_select()))
+    db.commit()
+
+def ensure_backfilled(db: Session):
+    """Populates the table on first start against a database that predates it."""
+    if db.execute(select(recipients.c.alert_id).limit(1)).first() is not None:
+        return
+    if db.execute(_audience_select().limit(1)).first() is not None:
+        rebuild_all(db)
+
+def user_ids_for_alert(db: Session, alert: models.Alert) -> Optional[List[int]]:
+    """The users an alert is currently visible to, or None when it is org-wide (everyone)."""
+    if alert.is_org_wide:
+        return None
+    return db.execute(select(recipients.c.user_id).where(recipients.c.alert_id == alert.id)).scalars().all()
+
+def visible_to_user(user_id):
+    """
+    Join condition and filter for "alerts visible to `user_id`". Outer-join
+    `alert_recipients` with the returned ON clause, then apply the filter.
+    `user_id` may be a literal id or a column such as models.User.id.
+    """
+    on_clause = and_(recipients.c.alert_id == models.Alert.id, recipients.c.user_id == user_id)
+    return on_clause, (models.Alert.is_org_wide == True) | (recipients.c.user_id != None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the alert_recipients audience table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Rebuild every alert's audience from its targets")
+    parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+
+    run_migrations()
+    db = SessionLocal()
+    try:
+        rebuild_all(db)
+        count = db.query(recipients).count()
+    finally:
+        db.close()
+    print(f"Rebuilt alert audiences: {count} recipient rows.")
+
+if __name__ == "__main__":
+    main()
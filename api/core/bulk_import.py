@@ -0,0 +1,397 @@
+"""
+Bulk import of teams, users, team memberships and alerts (POST /admin/import).
+
+The body is CSV with a header row, or JSONL with one object per line, and is
+parsed as it streams in. Records are validated and written IMPORT_CHUNK_ROWS
+at a time, one transaction per chunk, with multi-row statements (COPY for
+teams and users on PostgreSQL) instead of one ORM round trip and commit per
+row. Team names resolve through a lookup of every team built once per
+import; user emails through one query per chunk for the emails it mentions.
+The side effects of the single-row routes (audiences, unread counters,
+rollups, resource versions, caches, live streams) run once per chunk.
+
+A row that is malformed, names an unknown team or user, or repeats a team
+name or user email that already exists is skipped and reported with its
+line; the rest of the import goes ahead. When a chunk's write fails (say, an
+email created concurrently) the chunk is rolled back and its rows reported.
+
+Columns, which are also the JSONL keys; lists are "a|b" cells in CSV:
+- teams:        name
+- users:        email, full_name, team (name) or team_id, is_active
+- memberships:  email, team (name); moves existing users to the team
+- alerts:       title, message_body, created_by (email), severity, start_time,
+                expiry_time, reminder_enabled, is_org_wide,
+                target_teams (names), target_users (emails)
+
+Usage (from the api/ directory):
+    python -m core.bulk_import users users.csv
+    python -m core.bulk_import alerts alerts.jsonl [--format jsonl]
+"""
+import argparse
+import codecs
+import csv
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from services import models, schemas
+from services.database import SessionLocal, bulk_insert, engine
+from services.migrations import run_migrations
+from core import audience, inbox, realtime, rollups, unread_counts, versions
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+users = models.User.__table__
+teams = models.Team.__table__
+alerts = models.Alert.__table__
+
+ROW_MODELS = {
+    schemas.ImportKind.TEAMS: schemas.ImportTeamRow,
+    schemas.ImportKind.USERS: schemas.ImportUserRow,
+    schemas.ImportKind.MEMBERSHIPS: schemas.ImportMembershipRow,
+    schemas.ImportKind.ALERTS: schemas.ImportAlertRow,
+}
+
+# (line, record) with the record as a dict, or as an error message when the line could not be parsed
+Record = Tuple[int, Union[dict, str]]
+
+def format_for(filename_or_type: Optional[str]) -> schemas.ImportFormat:
+    """JSONL for a .jsonl/.ndjson name or a JSON lines content type, CSV otherwise."""
+    value = (filename_or_type or "").lower()
+    if any(marker in value for marker in ("jsonl", "ndjson", "json-lines", "jsonlines")):
+        return schemas.ImportFormat.JSONL
+    return schemas.ImportFormat.CSV
+
+class RecordReader:
+    """Turns streamed text into Records, however the text is split."""
+    def __init__(self, fmt: schemas.ImportFormat):
+        self.fmt = fmt
+        self._tail = ""          # text after the last newline seen
+        self._line = 0
+        self._pending: List[str] = [] # lines of a CSV record whose quoted field spans lines
+        self._quotes = 0
+        self._start = 0
+        self._header: Optional[List[str]] = None
+
+    def feed(self, text: str) -> List[Record]:
+        lines = (self._tail + text).split("\n")
+        self._tail = lines.pop()
+        return [record for record in map(self._take, lines) if record is not None]
+
+    def close(self) -> List[Record]:
+        records = self.feed("\n") if self._tail else []
+        if self._pending:
+            records.append((self._start, "Unterminated quoted field"))
+            self._pending = []
+        return records
+
+    def _take(self, line: str) -> Optional[Record]:
+        self._line += 1
+        if line.endswith("\r"):
+            line = line[:-1]
+        if self.fmt == schemas.ImportFormat.JSONL:
+            if not line.strip():
+                return None
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                return self._line, f"Invalid JSON: {exc}"
+            return self._line, record if isinstance(record, dict) else "Expected a JSON object"
+
+        if not self._pending:
+            self._start = self._line
+        self._pending.append(line)
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return None # inside a quoted field; the record goes on on the next line
+        text, self._pending, self._quotes = "\n".join(self._pending), [], 0
+        if not text.strip():
+            return None
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as exc:
+            return self._start, f"Invalid CSV: {exc}"
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self._header):
+            return self._start, f"Expected {len(self._header)} columns, got {len(values)}"
+        # Empty cells count as not given, so the row's defaults apply
+        return self._start, {name: value for name, value in zip(self._header, values) if value != ""}
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+class Importer:
+    """
+    One import: feed it the body as it arrives, then call `finish` for the
+    report. Rows are written whenever IMPORT_CHUNK_ROWS of them are buffered.
+    """
+    def __init__(self, kind: schemas.ImportKind, fmt: schemas.ImportFormat, chunk_rows: int = None):
+        self.kind = kind
+        self.chunk_rows = chunk_rows or settings.IMPORT_CHUNK_ROWS
+        self.report = schemas.ImportReport(kind=kind)
+        self._reader = RecordReader(fmt)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._records: List[Record] = []
+        self._team_ids: Optional[Dict[str, int]] = None # team name -> id, loaded on the first chunk
+        self._known_team_ids: Set[int] = set()
+        self._user_ids: Dict[str, int] = {}             # email -> id of users already looked up
+        self._started = time.perf_counter()
+
+    def feed(self, data: bytes):
+        self._records.extend(self._reader.feed(self._decoder.decode(data)))
+        while len(self._records) >= self.chunk_rows:
+            chunk, self._records = self._records[:self.chunk_rows], self._records[self.chunk_rows:]
+            self._import_chunk(chunk)
+
+    def finish(self) -> schemas.ImportReport:
+        self._records.extend(self._reader.feed(self._decoder.decode(b"", final=True)))
+        self._records.extend(self._reader.close())
+        if self._records:
+            self._import_chunk(self._records)
+            self._records = []
+        self.report.errors.sort(key=lambda error: error.line)
+        self.report.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+        logger.info(
+            "import.finished kind=%s received=%d imported=%d failed=%d duration_ms=%.1f",
+            self.kind.value, self.report.received, self.report.imported, self.report.failed, self.report.duration_ms,
+        )
+        return self.report
+
+    def _fail(self, line: int, error: str):
+        self.report.failed += 1
+        if len(self.report.errors) < settings.IMPORT_MAX_ERRORS:
+            self.report.errors.append(schemas.ImportRowError(line=line, error=error))
+        else:
+            self.report.errors_truncated = True
+
+    def _import_chunk(self, records: List[Record]):
+        started = time.perf_counter()
+        row_model = ROW_MODELS[self.kind]
+        rows = []
+        for line, record in records:
+            self.report.received += 1
+            if isinstance(record, str):
+                self._fail(line, record)
+                continue
+            try:
+                rows.append((line, row_model.model_validate(record)))
+            except ValidationError as exc:
+                self._fail(line, _describe(exc))
+
+        write = getattr(self, f"_write_{self.kind.value}")
+        with SessionLocal() as db:
+            if self._team_ids is None:
+                self._add_teams(dict(db.execute(select(teams.c.name, teams.c.id)).all()))
+            rejected: Set[int] = set()
+            try:
+                imported, on_commit = write(db, rows, rejected)
+                db.commit()
+            except SQLAlchemyError as exc:
+                db.rollback()
+                logger.warning("import.chunk_failed kind=%s rows=%d error=%s", self.kind.value, len(rows), exc)
+                error = str(getattr(exc, "orig", None) or exc).splitlines()[0]
+                for line, _ in rows:
+                    if line not in rejected:
+                        self._fail(line, f"Chunk not imported: {error}")
+                return
+            if on_commit is not None:
+                on_commit()
+
+        self.report.imported += imported
+        logger.info(
+            "import.chunk kind=%s rows=%d imported=%d duration_ms=%.1f",
+            self.kind.value, len(records), imported, (time.perf_counter() - started) * 1000,
+        )
+
+    def _add_teams(self, team_ids: Dict[str, int]):
+        if self._team_ids is None:
+            self._team_ids = {}
+        self._team_ids.update(team_ids)
+        self._known_team_ids.update(team_ids.values())
+
+    def _reject(self, rejected: Set[int], line: int, error: str):
+        rejected.add(line)
+        self._fail(line, error)
+
+    def _lookup_users(self, db: Session, emails: Iterable[str]) -> Dict[str, int]:
+        """Ids of the users with `emails`; missing ones are left out."""
+        missing = {email for email in emails if email not in self._user_ids}
+        if missing:
+            self._user_ids.update(db.execute(select(users.c.email, users.c.id).where(users.c.email.in_(missing))).all())
+        return self._user_ids
+
+    # --- One writer per kind: write a chunk of validated rows, return (imported, run after commit) ---
+    def _write_teams(self, db: Session, rows, rejected: Set[int]) -> Tuple[int, Optional[Callable]]:
+        names: List[str] = []
+        for line, row in rows:
+            if row.name in self._team_ids or row.name in names:
+                self._reject(rejected, line, f"Team '{row.name}' already exists")
+                continue
+            names.append(row.name)
+        if not names:
+            return 0, None
+
+        bulk_insert(db, teams, [{"name": name} for name in names])
+        created = dict(db.execute(select(teams.c.name, teams.c.id).where(teams.c.name.in_(names))).all())
+        versions.bump(db, versions.TEAMS)
+        return len(names), lambda: self._add_teams(created)
+
+    def _resolve_team(self, rejected: Set[int], line: int, name: Optional[str], team_id: Optional[int] = None) -> Tuple[bool, Optional[int]]:
+        """(found, team id) for a row naming a team by name or by id; rejects the row when the team is unknown."""
+        if name is not None:
+            team_id = self._team_ids.get(name)
+            if team_id is None:
+                self._reject(rejected, line, f"Unknown team '{name}'")
+                return False, None
+        elif team_id is not None and team_id not in self._known_team_ids:
+            self._reject(rejected, line, f"Unknown team_id {team_id}")
+            return False, None
+        return True, team_id
+
+    def _write_users(self, db: Session, rows, rejected: Set[int]) -> Tuple[int, Optional[Callable]]:
+        emails = {row.email for _, row in rows}
+        existing = set(db.execute(select(users.c.email).where(users.c.email.in_(emails))).scalars()) if emails else set()
+        new_users: Dict[str, dict] = {}
+        for line, row in rows:
+            email = row.email
+            if email in existing or email in new_users:
+                self._reject(rejected, line, f"User '{email}' already exists")
+                continue
+            found, team_id = self._resolve_team(rejected, line, row.team, row.team_id)
+            if found:
+                new_users[email] = {"email": email, "full_name": row.full_name, "team_id": team_id, "is_active": row.is_active}
+        if not new_users:
+            return 0, None
+
+        bulk_insert(db, users, list(new_users.values()))
+        user_ids = db.execute(select(users.c.id).where(users.c.email.in_(list(new_users)))).scalars().all()
+        audience.sync_users_audience(db, user_ids)
+        versions.bump(db, versions.USERS)
+        return len(new_users), lambda: inbox.inbox_cache.invalidate_many(user_ids)
+
+    def _write_memberships(self, db: Session, rows, rejected: Set[int]) -> Tuple[int, Optional[Callable]]:
+        known = self._lookup_users(db, (row.email for _, row in rows))
+        moves: Dict[int, int] = {} # user id -> team id; a user's last row wins
+        imported = 0
+        for line, row in rows:
+            user_id = known.get(row.email)
+            if user_id is None:
+                self._reject(rejected, line, f"Unknown user '{row.email}'")
+                continue
+            found, team_id = self._resolve_team(rejected, line, row.team)
+            if found:
+                moves[user_id] = team_id
+                imported += 1
+        if not moves:
+            return 0, None
+
+        db.execute(
+            update(users).where(users.c.id == bindparam("moved_id")).values(team_id=bindparam("new_team_id")),
+            [{"moved_id": user_id, "new_team_id": team_id} for user_id, team_id in moves.items()],
+        )
+        user_ids = list(moves)
+        # Team-targeted alerts follow the users to their new teams
+        audience.sync_users_audience(db, user_ids)
+        unread_counts.users_changed(db, user_ids)
+        versions.bump(db, versions.USERS, versions.ALERTS)
+
+        def on_commit():
+            inbox.inbox_cache.invalidate_many(user_ids)
+            realtime.hub.publish(user_ids, {"type": "inbox.changed"})
+        return imported, on_commit
+
+    def _write_alerts(self, db: Session, rows, rejected: Set[int]) -> Tuple[int, Optional[Callable]]:
+        known = self._lookup_users(db, {
+            email for _, row in rows for email in [row.created_by, *row.target_users]
+        })
+        now = datetime.utcnow()
+        new_alerts, targets = [], []
+        for line, row in rows:
+            creator_id = known.get(row.created_by)
+            unknown_users = [email for email in row.target_users if email not in known]
+            unknown_teams = [name for name in row.target_teams if name not in self._team_ids]
+            if creator_id is None:
+                self._reject(rejected, line, f"Unknown creator '{row.created_by}'")
+            elif unknown_users or unknown_teams:
+                self._reject(rejected, line, "Unknown targets: " + ", ".join(
+                    [f"user '{email}'" for email in unknown_users] + [f"team '{name}'" for name in unknown_teams]
+                ))
+            else:
+                new_alerts.append({
+                    "title": row.title, "message_body": row.message_body, "severity": row.severity,
+                    "start_time": row.start_time or now, "expiry_time": row.expiry_time,
+                    "reminder_enabled": row.reminder_enabled, "is_archived": False, "created_at": now,
+                    "is_org_wide": row.is_org_wide, "created_by_id": creator_id,
+                })
+                targets.append((
+                    {known[email] for email in row.target_users},
+                    {self._team_ids[name] for name in row.target_teams},
+                ))
+        if not new_alerts:
+            return 0, None
+
+        created = db.execute(
+            insert(alerts).returning(alerts.c.id, alerts.c.severity, sort_by_parameter_order=True), new_alerts
+        ).all()
+        alert_ids = [alert.id for alert in created]
+        user_targets = [{"alert_id": alert_id, "user_id": user_id} for alert_id, (user_ids, _) in zip(alert_ids, targets) for user_id in user_ids]
+        team_targets = [{"alert_id": alert_id, "team_id": team_id} for alert_id, (_, team_ids) in zip(alert_ids, targets) for team_id in team_ids]
+        if user_targets:
+            db.execute(insert(models.alert_target_users), user_targets)
+        if team_targets:
+            db.execute(insert(models.alert_target_teams), team_targets)
+
+        any_org_wide = any(alert["is_org_wide"] for alert in new_alerts)
+        audience.rebuild_alert_audience(db, alert_ids)
+        unread_counts.alerts_created(db, alert_ids, any_org_wide)
+        rollups.alerts_created(db, created)
+        versions.bump(db, versions.ALERTS)
+        recipients = None
+        if realtime.hub.has_subscribers and not any_org_wide:
+            recipients = set(db.execute(
+                select(audience.recipients.c.user_id).where(audience.recipients.c.alert_id.in_(alert_ids))
+            ).scalars())
+
+        def on_commit():
+            inbox.inbox_cache.clear()
+            if any_org_wide:
+                realtime.hub.publish(None, {"type": "inbox.changed"})
+            elif recipients:
+                realtime.hub.publish(recipients, {"type": "inbox.changed"})
+        return len(new_alerts), on_commit
+
+def import_file(path: str, kind: schemas.ImportKind, fmt: Optional[schemas.ImportFormat] = None) -> schemas.ImportReport:
+    importer = Importer(kind, fmt or format_for(path))
+    with open(path, "rb") as body:
+        for block in iter(lambda: body.read(1 << 20), b""):
+            importer.feed(block)
+    return importer.finish()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import teams, users, memberships or alerts from CSV or JSONL")
+    parser.add_argument("kind", choices=[kind.value for kind in schemas.ImportKind])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=[fmt.value for fmt in schemas.ImportFormat], default=None,
+                        help="Default: from the file extension")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+    report = import_file(args.path, schemas.ImportKind(args.kind), args.format and schemas.ImportFormat(args.format))
+    print(report.model_dump_json(indent=2))
+
+if __name__ == "__main__":
+    main()
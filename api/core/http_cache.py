@@ -0,0 +1,95 @@
+"""
+Conditional GET support for list endpoints.
+
+A response's strong ETag is derived from the versions of the resources it
+lists (core/versions.py). A request whose If-None-Match carries the current
+ETag gets an empty 304; otherwise the serialized body is served from a small
+in-process cache keyed by (path, query, ETag), and only built when missing.
+`cached_response_async` does the same for the AsyncSession routes.
+"""
+import asyncio
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Tuple, Union
+
+import pydantic_core
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from core import versions
+from core.cache import TTLCache
+from services import profiling
+from utils.settings import settings
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+def etag_for(db: Session, resource: Union[str, Tuple[str, ...]]) -> str:
+    """The ETag of one resource, or of a response combining several."""
+    resources = (resource,) if isinstance(resource, str) else resource
+    tag = "-".join(f"{name}-{versions.current(db, name)}" for name in resources)
+    if versions.ANALYTICS in resources:
+        # Snoozes all end at midnight UTC, which changes the dashboard without any write
+        tag += f"-{datetime.utcnow():%Y%m%d}"
+    return f'"{tag}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+def encode(payload: Any) -> bytes:
+    """The JSON body of a payload of pydantic models, lists or dicts."""
+    with profiling.serialization():
+        return pydantic_core.to_json(payload) # what jsonable_encoder + json.dumps would give, in compiled code
+
+async def encode_in_thread(render: Callable[[], Any]) -> bytes:
+    """
+    Runs `render` (which builds the payload, e.g. validates pydantic models
+    from ORM rows) and encodes its result in a worker thread, keeping that
+    CPU work off the event loop.
+    """
+    return await asyncio.to_thread(lambda: encode(render()))
+
+def _not_modified(request: Request, etag: str) -> Tuple[dict, Optional[Response], tuple]:
+    """The response headers, a 304 when the client's copy is current, and the body's cache key."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} # clients may keep it but must revalidate
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return headers, Response(status_code=304, headers=headers), None
+    return headers, None, (request.url.path, tuple(sorted(request.query_params.multi_items())), etag)
+
+def cached_response(request: Request, db: Session, resource: Union[str, Tuple[str, ...]], build: Callable[[], Any]) -> Response:
+    """
+    Answers a GET for `resource`: 304 when the client's copy is current,
+    else a cached or freshly built JSON body. `build` returns the payload
+    (pydantic models, lists or dicts) and only runs on a cache miss.
+    """
+    headers, not_modified, key = _not_modified(request, etag_for(db, resource))
+    if not_modified is not None:
+        return not_modified
+
+    body = response_cache.get(key)
+    if body is None:
+        body = encode(build())
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def cached_response_async(
+    request: Request,
+    db: "AsyncSession",
+    resource: Union[str, Tuple[str, ...]],
+    build: Callable[[], Awaitable[bytes]],
+) -> Response:
+    """`cached_response` for AsyncSession routes; `build` returns the encoded body (see `encode_in_thread`)."""
+    headers, not_modified, key = _not_modified(request, await db.run_sync(etag_for, resource))
+    if not_modified is not None:
+        return not_modified
+
+    body = response_cache.get(key)
+    if body is None:
+        body = await build()
+        response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from services import models
+from core import audience
+from core.cache import TTLCache
+from utils.settings import settings
+
+# Each user's rendered inbox, keyed by user id. Entries are dropped by the
+# write paths that can change them (read, snooze, alert create/update/archive)
+# and otherwise expire after INBOX_CACHE_TTL_SECONDS, which also bounds how
+# late an alert's start or expiry time shows up.
+inbox_cache = TTLCache(settings.INBOX_CACHE_SIZE, settings.INBOX_CACHE_TTL_SECONDS)
+
+def inbox_statement(user_id: int, now: datetime):
+    """
+    The select() behind `load_inbox`: all active, non-expired, non-archived
+    alerts visible to a user together with their personal status.
+    """
+    on_clause, is_visible = audience.visible_to_user(user_id)
+
+    return select(
+            models.Alert.id,
+            models.Alert.title,
+            models.Alert.message_body,
+            models.Alert.severity,
+            models.Alert.start_time,
+            models.UserAlertStatus.status,
+            models.UserAlertStatus.snoozed_until,
+        ). \
+        select_from(models.Alert). \
+        join(models.User, models.User.id == user_id). \
+        outerjoin(audience.recipients, on_clause). \
+        outerjoin(models.UserAlertStatus, and_(
+            models.UserAlertStatus.alert_id == models.Alert.id,
+            models.UserAlertStatus.user_id == user_id
+        )). \
+        where(
+            models.Alert.is_archived == False,
+            models.Alert.start_time <= now,
+            or_(models.Alert.expiry_time == None, models.Alert.expiry_time > now)
+        ). \
+        where(is_visible)
+
+def render_inbox(rows) -> List[dict]:
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "message_body": row.message_body,
+            "severity": row.severity,
+            "start_time": row.start_time,
+            "personal_status": {
+                # If no status exists, it's implicitly UNREAD
+                "status": row.status or models.UserAlertStatusEnum.UNREAD,
+                "snoozed_until": row.snoozed_until,
+            }
+        }
+        for row in rows
+    ]
+
+def load_inbox(db: Session, user_id: int) -> List[dict]:
+    """A user's inbox, in a single query. Unknown users get no rows."""
+    return render_inbox(db.execute(inbox_statement(user_id, datetime.utcnow())).all())
+
+def invalidate_user(user_id: int):
+    inbox_cache.invalidate(user_id)
+
+def invalidate_alert(db: Session, alert: models.Alert):
+    """Drops the cached inbox of everyone the alert is currently visible to."""
+    user_ids = audience.user_ids_for_alert(db, alert)
+    if user_ids is None:
+        inbox_cache.clear()
+    else:
+        inbox_cache.invalidate_many(user_ids)
@@ -1,35 +1,283 @@
+import csv
+import io
+import logging
+import smtplib
 from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from services import models
+from core import realtime, rollups
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class NotificationTarget(NamedTuple):
+    """The columns a channel needs to deliver one (user, alert) notification."""
+    user_id: int
+    alert_id: int
+    severity: models.AlertSeverity
+    title: str
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def digest_severities() -> Set[models.AlertSeverity]:
+    return {
+        models.AlertSeverity(name.strip().upper())
+        for name in settings.REMINDER_DIGEST_SEVERITIES.split(",") if name.strip()
+    }
+
+def group_notifications(targets: List[NotificationTarget]) -> List[List[NotificationTarget]]:
+    """
+    Splits a batch into the notifications that actually go out: a user's
+    targets at REMINDER_DIGEST_SEVERITIES become one digest, every other
+    target goes out on its own. A digest of one target is a plain notification.
+    """
+    digested = digest_severities()
+    groups: List[List[NotificationTarget]] = []
+    digests: Dict[int, List[NotificationTarget]] = {}
+    for target in targets:
+        if target.severity not in digested:
+            groups.append([target])
+            continue
+        digest = digests.get(target.user_id)
+        if digest is None:
+            digest = digests[target.user_id] = []
+            groups.append(digest)
+        digest.append(target)
+    return groups
 
 class NotificationChannel(ABC):
-    """Abstract base class for all notification channels."""
+    """
+    Abstract base class for all notification channels. The outbox
+    (core/outbox.py) hands a channel claimed batches: `transmit` delivers
+    them to the outside world, then `send_many` records the delivered ones.
+    """
+    name: str
+    batch_size: int = 1000 # jobs the outbox claims at a time
+    concurrency: int = 1   # claimed batches in flight at once
+
+    def transmit(self, db: Session, targets: List[NotificationTarget]) -> List[Optional[str]]:
+        """
+        Delivers a batch outside the database; returns one error message per
+        target, None when it went out. Channels whose delivery is the log row
+        itself have nothing to transmit.
+        """
+        return [None] * len(targets)
+
     @abstractmethod
-    def send(self, db: Session, user: models.User, alert: models.Alert):
+    def send(self, db: Session, target: NotificationTarget):
         pass
 
+    def send_many(self, db: Session, targets: List[NotificationTarget], chunk_size: Optional[int] = None) -> int:
+        """
+        Sends a batch of notifications, committing every `chunk_size` rows.
+        Channels that can write a whole chunk in one round trip should override this.
+        """
+        chunk_size = chunk_size or settings.DELIVERY_COMMIT_CHUNK_SIZE
+        for chunk in _chunks(targets, chunk_size):
+            for target in chunk:
+                self.send(db, target)
+            rollups.deliveries_written(db, chunk, self.name)
+            db.commit()
+        return len(targets)
+
 class InAppNotificationChannel(NotificationChannel):
     """
-    'Sends' a notification by creating a delivery log entry.
-    In a real app, this might also send a WebSocket message.
+    Sends a notification by creating a delivery log entry, then pushes it to
+    the user's open /users/{user_id}/stream connections, if any.
     """
-    def send(self, db: Session, user: models.User, alert: models.Alert):
-        print(f"INFO: Generating IN_APP notification for user {user.id} for alert {alert.id}")
-        
+    name = "IN_APP"
+
+    @property
+    def batch_size(self) -> int:
+        return settings.IN_APP_BATCH_SIZE
+
+    @property
+    def concurrency(self) -> int:
+        return settings.IN_APP_CONCURRENCY
+
+    def send(self, db: Session, target: NotificationTarget):
+        logger.debug("notification.send channel=%s user_id=%s alert_id=%s", self.name, target.user_id, target.alert_id)
+
         delivery_log = models.NotificationDelivery(
-            alert_id=alert.id,
-            user_id=user.id,
-            channel="IN_APP"
+            alert_id=target.alert_id,
+            user_id=target.user_id,
+            channel=self.name
         )
         db.add(delivery_log)
         # The session will be committed by the calling service.
 
+    def send_many(self, db: Session, targets: List[NotificationTarget], chunk_size: Optional[int] = None) -> int:
+        """
+        Writes the delivery log rows for a batch without going through the ORM
+        unit of work: COPY on PostgreSQL (psycopg2), a multi-row INSERT elsewhere.
+        Digests (see `group_notifications`) get one row each, plus one
+        notification_delivery_alerts row per alert they cover.
+        """
+        chunk_size = chunk_size or settings.DELIVERY_COMMIT_CHUNK_SIZE
+        use_copy = db.get_bind().dialect.driver == "psycopg2"
+
+        for chunk in _chunks(targets, chunk_size):
+            groups = group_notifications(chunk)
+            singles = [group[0] for group in groups if len(group) == 1]
+            if singles and use_copy:
+                self._copy_rows(db, singles)
+            elif singles:
+                db.execute(
+                    insert(models.NotificationDelivery),
+                    [{"alert_id": t.alert_id, "user_id": t.user_id, "channel": self.name} for t in singles],
+                )
+            self._write_digests(db, [group for group in groups if len(group) > 1])
+            # Rollups count every alert a digest covered, so analytics read the same either way
+            rollups.deliveries_written(db, chunk, self.name)
+            db.commit()
+            self._push(groups)
+            logger.info(
+                "notification.chunk_written channel=%s rows=%d alerts=%d first_user_id=%s last_user_id=%s",
+                self.name, len(groups), len(chunk), chunk[0].user_id, chunk[-1].user_id,
+            )
+        return len(targets)
+
+    def _write_digests(self, db: Session, digests: List[List[NotificationTarget]]):
+        if not digests:
+            return
+        delivery_ids = db.execute(
+            insert(models.NotificationDelivery).returning(models.NotificationDelivery.id, sort_by_parameter_order=True),
+            [
+                {"alert_id": digest[0].alert_id, "user_id": digest[0].user_id, "channel": self.name, "alert_count": len(digest)}
+                for digest in digests
+            ],
+        ).scalars().all()
+        db.execute(insert(models.NotificationDeliveryAlert), [
+            {"delivery_id": delivery_id, "alert_id": target.alert_id}
+            for delivery_id, digest in zip(delivery_ids, digests) for target in digest
+        ])
+
+    def _push(self, groups: List[List[NotificationTarget]]):
+        if not realtime.hub.has_subscribers:
+            return
+        events: List[Tuple[int, dict]] = []
+        for group in groups:
+            t = group[0]
+            if len(group) == 1:
+                event = {"type": "reminder", "alert_id": t.alert_id, "severity": t.severity, "title": t.title}
+            else:
+                event = {"type": "digest", "alert_ids": [target.alert_id for target in group]}
+            events.append((t.user_id, event))
+        realtime.hub.publish_many(events)
+
+    def _copy_rows(self, db: Session, chunk: List[NotificationTarget]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for target in chunk:
+            writer.writerow((target.alert_id, target.user_id, self.name))
+        buffer.seek(0)
+
+        # sent_at is left to its server default, exactly like the ORM path
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                "COPY notification_deliveries (alert_id, user_id, channel) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
+class EmailNotificationChannel(InAppNotificationChannel):
+    """
+    Emails each notification (or digest) over SMTP, one connection per
+    batch. Sent emails are logged exactly like in-app deliveries (with
+    channel EMAIL), but are not pushed to the in-app stream.
+    """
+    name = "EMAIL"
+
+    @property
+    def batch_size(self) -> int:
+        return settings.EMAIL_BATCH_SIZE
+
+    @property
+    def concurrency(self) -> int:
+        return settings.EMAIL_CONCURRENCY
+
+    def transmit(self, db: Session, targets: List[NotificationTarget]) -> List[Optional[str]]:
+        emails = dict(db.execute(
+            select(models.User.id, models.User.email).where(models.User.id.in_({t.user_id for t in targets}))
+        ).all())
+        bodies = dict(db.execute(
+            select(models.Alert.id, models.Alert.message_body).where(models.Alert.id.in_({t.alert_id for t in targets}))
+        ).all())
+
+        # A digest's outcome applies to every alert in it
+        outcomes: Dict[Tuple[int, int], Optional[str]] = {}
+        groups = group_notifications(targets)
+        with self._connect() as smtp:
+            for group in groups:
+                to = emails.get(group[0].user_id)
+                if not to:
+                    error = "User has no email address"
+                else:
+                    try:
+                        smtp.send_message(self._message(group, to, bodies))
+                        error = None
+                    except smtplib.SMTPRecipientsRefused as exc:
+                        error = f"Recipient refused: {exc.recipients}"
+                    except (smtplib.SMTPException, OSError) as exc:
+                        # Recorded per message, so emails already sent in this batch are not sent again
+                        error = f"{type(exc).__name__}: {exc}"
+                outcomes.update(((target.user_id, target.alert_id), error) for target in group)
+
+        errors = [outcomes[(target.user_id, target.alert_id)] for target in targets]
+        logger.info(
+            "notification.emails_sent emails=%d alerts=%d failed=%d",
+            len(groups), len(targets), sum(error is not None for error in errors),
+        )
+        return errors
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if settings.SMTP_STARTTLS:
+            smtp.starttls()
+        if settings.SMTP_USERNAME:
+            smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD or "")
+        return smtp
+
+    def _message(self, group: List[NotificationTarget], to: str, bodies: Dict[int, str]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = settings.EMAIL_FROM
+        message["To"] = to
+        if len(group) == 1:
+            target = group[0]
+            message["Subject"] = f"[{target.severity.value}] {target.title}"
+            body = bodies.get(target.alert_id, "")
+            footer = "You are receiving this reminder until you read or snooze the alert."
+        else:
+            message["Subject"] = f"{len(group)} alerts are waiting for you"
+            body = "\n\n".join(
+                f"[{target.severity.value}] {target.title}\n{bodies.get(target.alert_id, '')}" for target in group
+            )
+            footer = "You are receiving this digest until you read or snooze these alerts."
+        message.set_content(f"{body}\n\n{footer}")
+        return message
+
+    def _push(self, groups: List[List[NotificationTarget]]):
+        pass
+
 # --- Factory to get the desired channel ---
+CHANNELS = {
+    "IN_APP": InAppNotificationChannel,
+    "EMAIL": EmailNotificationChannel,
+}
+
 def get_notification_channel(channel_name: str) -> NotificationChannel:
-    if channel_name.upper() == "IN_APP":
-        return InAppNotificationChannel()
-    # In the future, we would add Email, SMS, etc.
-    # elif channel_name.upper() == "EMAIL":
-    #     return EmailNotificationChannel()
-    else:
-        raise ValueError(f"Unsupported notification channel: {channel_name}")
\ No newline at end of file
+    channel = CHANNELS.get(channel_name.strip().upper())
+    if channel is None:
+        raise ValueError(f"Unsupported notification channel: {channel_name}")
+    return channel()
+
+def delivery_channels() -> List[NotificationChannel]:
+    """The channels every reminder goes out on (DELIVERY_CHANNELS)."""
+    return [get_notification_channel(name) for name in settings.DELIVERY_CHANNELS.split(",") if name.strip()]
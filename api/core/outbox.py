@@ -0,0 +1,312 @@
+"""
+Durable delivery outbox between reminder cycles and notification channels.
+
+Reminder cycles only queue (channel, user, alert) jobs in `delivery_outbox`,
+so the candidate scan never waits on a channel. The dispatcher drains the
+queue with `channel.concurrency` loops per channel, each running on that
+channel's own threads, so a slow channel (SMTP) never holds up another. A
+loop repeatedly:
+
+1. claims up to `channel.batch_size` due jobs by stamping a claim token on
+   them (PENDING jobs whose retry time has come, or SENDING ones whose
+   lease ran out);
+2. hands the batch to `channel.transmit`, which sends a user's jobs at
+   REMINDER_DIGEST_SEVERITIES as one digest;
+3. in one transaction, deletes the delivered jobs and records them with
+   `channel.send_many`, and schedules each failed job again with
+   exponential backoff, or marks it DEAD after OUTBOX_MAX_ATTEMPTS.
+
+Delivery is at least once: if a process dies between 2 and 3, the lease
+runs out and the batch is transmitted again. A pair still queued on a
+channel absorbs later reminders for it, which bounds the queue when a
+channel falls behind. Dead letters do not: the pair's next reminder is
+queued as a new job, and requeue-dead drops dead jobs whose pair has been
+queued again since.
+
+The dispatcher runs inside the API unless OUTBOX_DISPATCH_ENABLED is off.
+
+Usage (from the api/ directory):
+    python -m core.outbox drain                     # run the dispatcher in its own process
+    python -m core.outbox stats
+    python -m core.outbox requeue-dead [--channel EMAIL]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from services import models
+from services.database import SessionLocal, dialect_insert, engine
+from services.migrations import run_migrations
+from core.notifications import NotificationChannel, NotificationTarget, delivery_channels, digest_severities
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+outbox = models.DeliveryJob.__table__
+
+ENQUEUE_CHUNK_ROWS = 1000 # keeps multi-row INSERTs under SQLite's bound-parameter limit
+
+# --- Producer side ---
+def enqueue(db: Session, targets: List[NotificationTarget], channels: List[NotificationChannel]) -> int:
+    """
+    Queues every target on every channel in the caller's transaction. Pairs
+    already queued on a channel are skipped (dead jobs do not count). Returns
+    the number of jobs added.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "channel": channel.name, "user_id": target.user_id, "alert_id": target.alert_id,
+            "severity": target.severity, "title": target.title,
+            "status": "PENDING", "attempts": 0, "next_attempt_at": now, "created_at": now,
+        }
+        for channel in channels for target in targets
+    ]
+
+    added = 0
+    insert_ = dialect_insert(db)
+    for start in range(0, len(rows), ENQUEUE_CHUNK_ROWS):
+        chunk = rows[start:start + ENQUEUE_CHUNK_ROWS]
+        if insert_ is not None:
+            added += db.execute(
+                insert_(outbox).values(chunk).on_conflict_do_nothing(
+                    index_elements=["channel", "user_id", "alert_id"], index_where=text("status != 'DEAD'"),
+                )
+            ).rowcount
+            continue
+
+        queued = set(db.execute(
+            select(outbox.c.channel, outbox.c.user_id, outbox.c.alert_id).
+            where(outbox.c.user_id.in_({row["user_id"] for row in chunk}), outbox.c.status != "DEAD")
+        ).tuples())
+        fresh = [row for row in chunk if (row["channel"], row["user_id"], row["alert_id"]) not in queued]
+        if fresh:
+            db.execute(insert(outbox), fresh)
+        added += len(fresh)
+    return added
+
+# --- Consumer side ---
+def _due(channel: str, now: datetime):
+    lease_expired = now - timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    return and_(
+        outbox.c.channel == channel,
+        or_(
+            and_(outbox.c.status == "PENDING", outbox.c.next_attempt_at <= now),
+            and_(outbox.c.status == "SENDING", outbox.c.claimed_at < lease_expired),
+        )
+    )
+
+def claim_batch(db: Session, channel: NotificationChannel) -> list:
+    """
+    Claims up to `channel.batch_size` due jobs and returns them. PostgreSQL
+    skips rows other dispatchers are claiming (FOR UPDATE SKIP LOCKED); the
+    `_due` re-check keeps the claim exclusive elsewhere. With digests on, a
+    full batch also claims the rest of its last user's due jobs, so that
+    user's digest is not split in two.
+    """
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    candidates = select(outbox.c.id).where(_due(channel.name, now)). \
+        order_by(outbox.c.next_attempt_at, outbox.c.user_id, outbox.c.id).limit(channel.batch_size)
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    claim = dict(status="SENDING", claim_token=token, claimed_at=now)
+    claimed = db.execute(update(outbox).where(outbox.c.id.in_(candidates), _due(channel.name, now)).values(**claim)).rowcount
+    if claimed >= channel.batch_size and digest_severities():
+        last_user_id = db.execute(
+            select(outbox.c.user_id).where(outbox.c.claim_token == token).
+            order_by(outbox.c.next_attempt_at.desc(), outbox.c.user_id.desc()).limit(1)
+        ).scalar()
+        db.execute(update(outbox).where(outbox.c.user_id == last_user_id, _due(channel.name, now)).values(**claim))
+    db.commit()
+    return db.execute(select(outbox).where(outbox.c.claim_token == token).order_by(outbox.c.id)).all()
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0) # jitter, so a failed batch is not retried in lockstep
+
+def _settle(db: Session, channel: NotificationChannel, jobs: list, errors: List[Optional[str]]):
+    """Records the delivered jobs and reschedules or dead-letters the failed ones, in one transaction."""
+    now = datetime.utcnow()
+    delivered = [job for job, error in zip(jobs, errors) if error is None]
+    retries = []
+    for job, error in zip(jobs, errors):
+        if error is None:
+            continue
+        attempts = job.attempts + 1
+        dead = attempts >= settings.OUTBOX_MAX_ATTEMPTS
+        retries.append({
+            "job_id": job.id,
+            "new_status": "DEAD" if dead else "PENDING",
+            "new_attempts": attempts,
+            "retry_at": now if dead else now + timedelta(seconds=_retry_delay(attempts)),
+            "error": error[:500],
+        })
+        if dead:
+            logger.warning(
+                "outbox.dead_lettered channel=%s job_id=%s user_id=%s alert_id=%s error=%s",
+                channel.name, job.id, job.user_id, job.alert_id, error,
+            )
+
+    if retries:
+        db.execute(
+            update(outbox).
+            where(outbox.c.id == bindparam("job_id")).
+            values(
+                status=bindparam("new_status"), attempts=bindparam("new_attempts"),
+                next_attempt_at=bindparam("retry_at"), last_error=bindparam("error"),
+                claim_token=None, claimed_at=None,
+            ),
+            retries,
+        )
+    if delivered:
+        db.execute(delete(outbox).where(outbox.c.id.in_([job.id for job in delivered])))
+        # Writes the delivery log and rollups, then commits everything above with them
+        channel.send_many(db, [NotificationTarget(job.user_id, job.alert_id, job.severity, job.title) for job in delivered],
+                          chunk_size=len(delivered))
+    db.commit()
+    logger.info(
+        "outbox.batch_settled channel=%s delivered=%d retried=%d dead=%d",
+        channel.name, len(delivered), sum(r["new_status"] == "PENDING" for r in retries),
+        sum(r["new_status"] == "DEAD" for r in retries),
+    )
+
+def process_batch(channel: NotificationChannel) -> int:
+    """Claims, transmits and settles one batch. Returns how many jobs it handled, 0 when none were due."""
+    db = SessionLocal()
+    try:
+        jobs = claim_batch(db, channel)
+        if not jobs:
+            return 0
+        targets = [NotificationTarget(job.user_id, job.alert_id, job.severity, job.title) for job in jobs]
+        try:
+            errors = channel.transmit(db, targets)
+        except Exception as exc:
+            logger.exception("outbox.transmit_failed channel=%s jobs=%d", channel.name, len(jobs))
+            errors = [f"{type(exc).__name__}: {exc}"] * len(jobs)
+        db.rollback() # end the transaction transmit read in before settling
+        _settle(db, channel, jobs, errors)
+        return len(jobs)
+    finally:
+        db.close()
+
+class OutboxDispatcher:
+    """
+    Drains the outbox from the event loop: `channel.concurrency` loops per
+    channel, whose blocking work runs on a thread pool of that channel's own.
+    """
+    def __init__(self, channels: Optional[List[NotificationChannel]] = None):
+        self.channels = channels or delivery_channels()
+        self._executors: List[ThreadPoolExecutor] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        for channel in self.channels:
+            executor = ThreadPoolExecutor(max_workers=channel.concurrency, thread_name_prefix=f"outbox-{channel.name.lower()}")
+            self._executors.append(executor)
+            self._tasks.extend(asyncio.create_task(self._drain(channel, executor)) for _ in range(channel.concurrency))
+        logger.info("outbox.started channels=%s", ",".join(channel.name for channel in self.channels))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for executor in self._executors:
+            executor.shutdown(wait=False) # a batch in flight finishes on its own; its lease covers a crash
+        logger.info("outbox.stopped")
+
+    async def _drain(self, channel: NotificationChannel, executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                handled = await loop.run_in_executor(executor, process_batch, channel)
+            except Exception:
+                logger.exception("outbox.batch_failed channel=%s", channel.name)
+                handled = 0
+            if not handled:
+                await asyncio.sleep(settings.OUTBOX_POLL_SECONDS)
+
+# --- Administration ---
+def stats(db: Session) -> Dict[str, dict]:
+    """Queued, in-flight and dead jobs per channel, and when the oldest queued job was created."""
+    result: Dict[str, dict] = {}
+    rows = db.execute(
+        select(outbox.c.channel, outbox.c.status, func.count(), func.min(outbox.c.created_at)).
+        group_by(outbox.c.channel, outbox.c.status)
+    )
+    for channel, status, count, oldest in rows:
+        entry = result.setdefault(channel, {"pending": 0, "sending": 0, "dead": 0, "oldest_pending_at": None})
+        entry[status.lower()] = count
+        if status == "PENDING":
+            entry["oldest_pending_at"] = oldest
+    return result
+
+def requeue_dead(db: Session, channel: Optional[str] = None) -> int:
+    """
+    Gives dead jobs a fresh set of attempts. A dead job whose pair has been
+    queued again since, or that died again later, is deleted instead. The
+    caller commits.
+    """
+    dead = [outbox.c.status == "DEAD"]
+    if channel:
+        dead.append(outbox.c.channel == channel.upper())
+    other = outbox.alias("other")
+    superseded = select(other.c.id).where(
+        other.c.channel == outbox.c.channel, other.c.user_id == outbox.c.user_id, other.c.alert_id == outbox.c.alert_id,
+        or_(other.c.status != "DEAD", other.c.id > outbox.c.id),
+    ).exists()
+    db.execute(delete(outbox).where(*dead, superseded))
+    return db.execute(update(outbox).where(*dead).values(status="PENDING", attempts=0, next_attempt_at=datetime.utcnow())).rowcount
+
+async def _drain_forever():
+    dispatcher = OutboxDispatcher()
+    dispatcher.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await dispatcher.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Drain and inspect the delivery outbox")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("drain", help="Deliver queued jobs until interrupted")
+    commands.add_parser("stats", help="Print queued, in-flight and dead jobs per channel")
+    requeue = commands.add_parser(
+        "requeue-dead", help="Retry dead-lettered jobs, dropping those whose (channel, user, alert) was queued again since",
+    )
+    requeue.add_argument("--channel", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+    if args.command == "drain":
+        try:
+            asyncio.run(_drain_forever())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "stats":
+            print(stats(db))
+        else:
+            requeued = requeue_dead(db, args.channel)
+            db.commit()
+            print(f"Requeued {requeued} dead jobs.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
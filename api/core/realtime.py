@@ -0,0 +1,199 @@
+"""
+In-process fan-out of live inbox events to /users/{user_id}/stream clients.
+
+Write paths publish small events once they have committed: an alert was
+created, updated or archived, a status changed, a reminder was delivered.
+Events only say what changed; clients reload their inbox when one arrives.
+
+Each connection has a bounded buffer that never makes a publisher wait. An
+event replaces a queued one with the same key, so a burst of changes to one
+alert is sent once. A connection that still falls more than
+STREAM_QUEUE_SIZE events behind has its buffer replaced by a single
+`resync` event, which tells the client to reload everything.
+
+The hub lives on the API's event loop, and `publish` may be called from any
+thread (sync routes, the reminder scheduler's worker thread). Events only
+reach connections held by the process that published them: writes handled by
+another API worker, and cycles run by `python -m core.workers`, are not streamed.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from services import models
+from core import audience
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {"type": "resync"}
+PING = {"type": "ping"}
+
+def _key(event: dict) -> str:
+    return f"{event['type']}:{event.get('alert_id', '')}"
+
+class Subscriber:
+    """One stream connection's coalescing event buffer. Only used on the hub's loop."""
+    __slots__ = ("user_id", "closed", "_pending", "_ready")
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.closed = False
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> bool:
+        """Queues `event`; False when the buffer overflowed and was replaced by a resync."""
+        self._pending[_key(event)] = event
+        overflowed = len(self._pending) > settings.STREAM_QUEUE_SIZE
+        if overflowed:
+            self._pending.clear()
+            self._pending[_key(RESYNC)] = RESYNC
+        self._ready.set()
+        return not overflowed
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_events(self, timeout: float) -> List[dict]:
+        """Everything queued, waiting up to `timeout` seconds for something; empty on timeout or close."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+class Hub:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        self.connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.user_id]
+        self.connections -= 1
+
+    def close_all(self):
+        """Ends every stream still open when the app shuts down."""
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                subscriber.close()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, user_ids: Optional[Iterable[int]], event: dict):
+        """Sends `event` to the connections of `user_ids`, or to all of them when None. Never blocks."""
+        if user_ids is not None:
+            user_ids = list(user_ids)
+        self._call(self._fan_out, user_ids, event)
+
+    def publish_many(self, events: List[Tuple[int, dict]]):
+        """Sends each (user id, event) pair, in one hop onto the loop."""
+        self._call(self._deliver_many, events)
+
+    def _call(self, callback, *args):
+        loop = self._loop
+        if loop is None or not self._subscribers: # nobody listening in this process
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback(*args)
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError: # the loop closed during shutdown
+            pass
+
+    def _fan_out(self, user_ids: Optional[List[int]], event: dict):
+        self.published += 1
+        if user_ids is None:
+            targets = [subscriber for subscribers in self._subscribers.values() for subscriber in subscribers]
+        elif len(user_ids) > len(self._subscribers):
+            wanted = set(user_ids)
+            targets = [subscriber for user_id, subscribers in self._subscribers.items() if user_id in wanted for subscriber in subscribers]
+        else:
+            targets = [subscriber for user_id in user_ids for subscriber in self._subscribers.get(user_id, ())]
+        for subscriber in targets:
+            self._deliver(subscriber, event)
+
+    def _deliver_many(self, events: List[Tuple[int, dict]]):
+        self.published += len(events)
+        for user_id, event in events:
+            for subscriber in self._subscribers.get(user_id, ()):
+                self._deliver(subscriber, event)
+
+    def _deliver(self, subscriber: Subscriber, event: dict):
+        self.delivered += 1
+        if not subscriber.push(event):
+            self.resyncs += 1
+            logger.info("stream.resync user_id=%s", subscriber.user_id)
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "users": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+hub = Hub()
+
+# --- Helpers for the write paths; call them after committing ---
+def audience_of(db: Session, alert: models.Alert) -> Optional[Set[int]]:
+    """Who can see `alert` (None for everyone); empty, without a query, when nobody is connected."""
+    if not hub.has_subscribers:
+        return set()
+    user_ids = audience.user_ids_for_alert(db, alert)
+    return None if user_ids is None else set(user_ids)
+
+def alert_changed(db: Session, alert: models.Alert, event_type: str, *earlier_audiences: Optional[Set[int]]):
+    """
+    Publishes `event_type` for `alert` to its audience, and to any
+    `earlier_audiences` taken with `audience_of` before an update changed it.
+    """
+    audiences = (audience_of(db, alert),) + earlier_audiences
+    event = {"type": event_type, "alert_id": alert.id}
+    if any(user_ids is None for user_ids in audiences):
+        hub.publish(None, event)
+        return
+    user_ids = set().union(*audiences)
+    if user_ids:
+        hub.publish(user_ids, event)
+
+def status_changed(user_id: int, alert_id: int):
+    hub.publish([user_id], {"type": "status.changed", "alert_id": alert_id})
+
+def inbox_changed(user_id: int):
+    """Several alerts changed for the user at once (bulk updates, a team move)."""
+    hub.publish([user_id], {"type": "inbox.changed"})
@@ -1,43 +1,54 @@
+import logging
+import time
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func
 from datetime import datetime
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from services import models
-from core.notifications import get_notification_channel
+from core import audience, outbox
+from core.notifications import NotificationTarget, delivery_channels
+from utils.settings import settings
 
-def find_users_needing_reminders(db: Session) -> List[Tuple[models.User, models.Alert]]:
+logger = logging.getLogger(__name__)
+
+def _is_reminding(now: datetime):
+    """Alerts that are active, not archived, and have reminders enabled."""
+    return and_(
+        models.Alert.is_archived == False,
+        models.Alert.reminder_enabled == True,
+        models.Alert.start_time <= now,
+        or_(models.Alert.expiry_time == None, models.Alert.expiry_time > now)
+    )
+
+def _reminder_candidates_query(db: Session, now: datetime):
     """
-    Finds all pairs of (user, alert) that require a notification right now.
-    
+    Builds the projection-only query behind the reminder scan.
+
     A user needs a reminder if:
     1. The alert is active, not archived, and has reminders enabled.
     2. The user is a target of the alert (org-wide, team, or individual).
     3. The user has not marked the alert as READ.
     4. The user's snooze period for the alert has expired.
     """
-    now = datetime.utcnow()
-    
-    # Subquery to find alerts that are currently active
-    active_alerts = db.query(models.Alert.id).filter(
-        models.Alert.is_archived == False,
-        models.Alert.reminder_enabled == True,
-        models.Alert.start_time <= now,
-        or_(models.Alert.expiry_time == None, models.Alert.expiry_time > now)
-    ).subquery()
-    
-    # Main query to find users who need a reminder
-    users_to_notify = db.query(models.User, models.Alert). \
-        join(models.Alert, or_(
-            models.Alert.is_org_wide == True,
-            models.Alert.target_teams.any(id=models.User.team_id),
-            models.Alert.target_users.any(id=models.User.id)
-        )). \
+    on_clause, is_visible = audience.visible_to_user(models.User.id)
+
+    # Only the columns the channels need, so no ORM objects are hydrated.
+    # Users are paired with the (few) currently active alerts, and visibility is
+    # a primary-key probe into the materialized alert_recipients table.
+    return db.query(
+            models.User.id.label("user_id"),
+            models.Alert.id.label("alert_id"),
+            models.Alert.severity,
+            models.Alert.title,
+        ). \
+        join(models.Alert, _is_reminding(now)). \
+        outerjoin(audience.recipients, on_clause). \
         outerjoin(models.UserAlertStatus, and_(
             models.UserAlertStatus.user_id == models.User.id,
             models.UserAlertStatus.alert_id == models.Alert.id
         )). \
-        filter(models.Alert.id.in_(active_alerts)). \
+        filter(is_visible). \
         filter(
             or_(
                 # Condition 1: No status record exists, so it's implicitly UNREAD and not snoozed
@@ -51,26 +62,96 @@ def find_users_needing_reminders(db: Session) -> List[Tuple[models.User, models.
                     )
                 )
             )
-        ).all()
-        
-    return users_to_notify
+        )
 
-def process_reminders(db: Session):
+def iter_reminder_batches(
+    db: Session,
+    batch_size: Optional[int] = None,
+    user_id_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[List[NotificationTarget]]:
     """
-    Orchestrates the process of finding and sending reminders.
+    Streams the (user, alert) pairs that require a notification right now,
+    one window of users at a time. `user_id_range` restricts the scan to users
+    with start <= id < end (one shard of a sharded cycle).
+
+    A users-only query finds where the next window of user ids ends, and the
+    candidate query then pairs just those users with the active alerts, so
+    every batch costs the same however far into the user table it is, and
+    the caller is free to write (and commit) between batches. The first window
+    holds `batch_size` / (active alerts) users, and each later one is resized
+    to the rows the previous one yielded per user, aiming at `batch_size`
+    rows; since batches end on user boundaries, one may run past it.
     """
-    users_and_alerts = find_users_needing_reminders(db)
-    
-    if not users_and_alerts:
-        print("INFO: No reminders to send at this time.")
-        return {"message": "No reminders to send."}
-
-    # For now, we only support the "IN_APP" channel
-    notification_channel = get_notification_channel("IN_APP")
-    
-    for user, alert in users_and_alerts:
-        notification_channel.send(db, user, alert)
-        
-    db.commit() # Commit all the new delivery logs at once
-    
-    return {"message": f"Successfully sent {len(users_and_alerts)} reminders."}
\ No newline at end of file
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    now = datetime.utcnow()
+    reminding = db.query(func.count(models.Alert.id)).filter(_is_reminding(now)).scalar()
+    if not reminding:
+        return
+    window = max(1, batch_size // reminding)
+
+    users = db.query(models.User.id)
+    query = _reminder_candidates_query(db, now)
+    if user_id_range is not None:
+        users = users.filter(models.User.id >= user_id_range[0], models.User.id < user_id_range[1])
+        query = query.filter(models.User.id >= user_id_range[0], models.User.id < user_id_range[1])
+
+    last_user_id = None
+    while True:
+        ahead, page = users, query
+        if last_user_id is not None:
+            ahead = ahead.filter(models.User.id > last_user_id)
+            page = page.filter(models.User.id > last_user_id)
+        # Last user id of the next window; None once fewer users than that are left
+        window_end = ahead.order_by(models.User.id).offset(window - 1).limit(1).scalar()
+        if window_end is not None:
+            page = page.filter(models.User.id <= window_end)
+
+        rows = page.order_by(models.User.id, models.Alert.id).all()
+        if rows:
+            yield [NotificationTarget(*row) for row in rows]
+
+        if window_end is None:
+            return
+        last_user_id = window_end
+        # Resize the next window to the density of this one, within 1..batch_size users
+        window = max(1, min(batch_size, window * batch_size // max(len(rows), 1)))
+
+def find_users_needing_reminders(db: Session) -> List[NotificationTarget]:
+    """
+    Finds all (user, alert) pairs that require a notification right now.
+    Prefer `iter_reminder_batches` for large organisations; this collects the
+    whole stream into one list.
+    """
+    return [target for batch in iter_reminder_batches(db) for target in batch]
+
+def process_reminders(
+    db: Session,
+    user_id_range: Optional[Tuple[int, int]] = None,
+    after_batch: Optional[Callable[[], None]] = None,
+):
+    """
+    Finds the reminders due right now and queues them on every delivery
+    channel; core/outbox.py sends them from there. Each candidate batch is
+    queued and committed before the next one is scanned, and `after_batch`
+    is then called; the scheduler renews its lease there, and an exception
+    it raises ends the cycle.
+    """
+    channels = delivery_channels()
+
+    started = time.perf_counter()
+    queued = 0
+    for batch in iter_reminder_batches(db, user_id_range=user_id_range):
+        queued += outbox.enqueue(db, batch, channels)
+        db.commit()
+        if after_batch is not None:
+            after_batch()
+
+    if not queued:
+        logger.info("reminders.cycle_finished queued=0 user_id_range=%s", user_id_range)
+        return {"message": "No new reminders to queue.", "queued": 0}
+
+    logger.info(
+        "reminders.cycle_finished queued=%d user_id_range=%s duration_ms=%.1f",
+        queued, user_id_range, (time.perf_counter() - started) * 1000,
+    )
+    return {"message": f"Queued {queued} reminder deliveries.", "queued": queued}
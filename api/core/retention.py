@@ -0,0 +1,199 @@
+"""
+Retention for notification_deliveries, the fastest-growing table.
+
+Deliveries older than DELIVERY_RETENTION_DAYS whole UTC days are first
+rolled up into delivery_archive_rollups (see core/rollups.py), one row per
+day, alert and channel, and then removed:
+
+- on PostgreSQL the table is partitioned by month on sent_at
+  (services/partitions.py), and a month that lies entirely outside the
+  window is detached and dropped at once. Each run also creates the
+  partitions for the next DELIVERY_PARTITIONS_AHEAD months;
+- the remaining expired rows, and every expired row on other databases,
+  are deleted oldest first, RETENTION_CHUNK_ROWS per transaction. SQLite
+  then runs VACUUM to give the space back.
+
+The dashboard and daily delivery series read the rollups, so they still
+cover removed rows. Minute and hour series, and series filtered by alert
+or team, only reach back as far as the window.
+
+The job runs inside the API every RETENTION_INTERVAL_SECONDS, under the
+`delivery-retention` lease lock so only one API worker runs it.
+
+Usage (from the api/ directory):
+    python -m core.retention run [--days 30]
+    python -m core.retention partitions
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+
+from services import models, partitions
+from services.database import SessionLocal, engine
+from services.migrations import run_migrations
+from core import rollups
+from core.scheduler import acquire_lock, release_lock
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_NAME = "delivery-retention"
+RETENTION_LOCK_TTL_SECONDS = 6 * 3600
+
+deliveries = models.NotificationDelivery
+covered = models.NotificationDeliveryAlert
+
+def cutoff_for(days: int) -> datetime:
+    """Midnight UTC `days` days ago; deliveries sent before it have expired."""
+    today = datetime.utcnow().date()
+    return datetime.combine(today - timedelta(days=days), datetime.min.time())
+
+def _archive(db: Session, in_range: Callable):
+    """
+    Rolls the deliveries whose sent_at satisfies `in_range` up into
+    delivery_archive_rollups and deletes their digest rows, ahead of
+    removing the deliveries themselves. The caller commits.
+    """
+    pairs = rollups.delivered_alerts()
+    day = func.date(pairs.c.sent_at)
+    counts = db.execute(
+        select(day, pairs.c.alert_id, pairs.c.channel, func.count()).
+        where(in_range(pairs.c.sent_at)).
+        group_by(day, pairs.c.alert_id, pairs.c.channel)
+    )
+    rollups.deliveries_archived(db, [
+        {"day": date.fromisoformat(day) if isinstance(day, str) else day, "alert_id": alert_id, "channel": channel, "delivered_count": count}
+        for day, alert_id, channel, count in counts
+    ])
+    db.execute(delete(covered).where(covered.delivery_id.in_(
+        select(deliveries.id).where(in_range(deliveries.sent_at), deliveries.alert_count > 1)
+    )))
+
+def _drop_expired_partitions(db: Session, cutoff: datetime) -> int:
+    removed = 0
+    for name, month in partitions.month_partitions(db.connection()):
+        start, end = partitions.month_start(month), partitions.month_start(partitions.next_month(month))
+        if end > cutoff:
+            break
+        in_month = lambda sent_at: and_(sent_at >= start, sent_at < end)
+        rows = db.execute(select(func.count()).select_from(deliveries).where(in_month(deliveries.sent_at))).scalar()
+        _archive(db, in_month)
+        partitions.drop_month(db.connection(), name)
+        db.commit()
+        removed += rows
+        logger.info("retention.partition_dropped name=%s rows=%d", name, rows)
+    return removed
+
+def _delete(db: Session, in_range: Callable) -> int:
+    _archive(db, in_range)
+    removed = db.execute(delete(deliveries).where(in_range(deliveries.sent_at))).rowcount
+    db.commit()
+    return removed
+
+def prune(db: Session, cutoff: datetime, chunk_rows: int = None) -> int:
+    """Archives and removes every delivery sent before `cutoff`. Returns how many rows went."""
+    chunk_rows = chunk_rows or settings.RETENTION_CHUNK_ROWS
+    removed = 0
+    if partitions.is_partitioned(db.connection()):
+        removed += _drop_expired_partitions(db, cutoff)
+
+    while True:
+        # The chunk ends at the sent_at of its last row, found through the sent_at index; rows
+        # written in the same transaction share that sent_at and go with it
+        bound = db.execute(
+            select(deliveries.sent_at).where(deliveries.sent_at < cutoff).
+            order_by(deliveries.sent_at).offset(chunk_rows - 1).limit(1)
+        ).scalar()
+        if bound is None:
+            return removed + _delete(db, lambda sent_at: sent_at < cutoff)
+        removed += _delete(db, lambda sent_at: sent_at <= bound)
+        logger.info("retention.chunk_removed through=%s removed=%d", bound, removed)
+
+def vacuum():
+    """Returns the space freed by deletes to the file system; SQLite only. Locks the database while it runs."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+
+def ensure_partitions(db: Session) -> int:
+    """Creates this month's partition and the next DELIVERY_PARTITIONS_AHEAD; PostgreSQL only."""
+    conn = db.connection()
+    if not partitions.is_partitioned(conn):
+        return 0
+    created = partitions.ensure_months(conn, datetime.utcnow().date(), settings.DELIVERY_PARTITIONS_AHEAD + 1)
+    db.commit()
+    return created
+
+def run_once(days: int = None) -> int:
+    """Runs the whole job once. Returns how many delivery rows were removed."""
+    days = settings.DELIVERY_RETENTION_DAYS if days is None else days
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        ensure_partitions(db)
+        if days <= 0:
+            return 0
+        cutoff = cutoff_for(days)
+        removed = prune(db, cutoff)
+    finally:
+        db.close()
+
+    if removed and engine.dialect.name == "sqlite" and settings.RETENTION_SQLITE_VACUUM:
+        vacuum()
+    logger.info(
+        "retention.finished cutoff=%s removed=%d duration_ms=%.1f",
+        cutoff.isoformat(), removed, (time.perf_counter() - started) * 1000,
+    )
+    return removed
+
+def _run_locked(owner: str):
+    db = SessionLocal()
+    try:
+        if not acquire_lock(db, RETENTION_LOCK_NAME, owner, RETENTION_LOCK_TTL_SECONDS):
+            logger.info("retention.skipped reason=locked")
+            return
+        try:
+            run_once()
+        finally:
+            release_lock(db, RETENTION_LOCK_NAME, owner)
+    finally:
+        db.close()
+
+async def run_periodically(interval_seconds: int):
+    """Runs the job at startup and then every `interval_seconds`, in a worker thread."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    while True:
+        try:
+            await asyncio.to_thread(_run_locked, owner)
+        except Exception:
+            logger.exception("retention.failed")
+        await asyncio.sleep(interval_seconds)
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive and remove old notification deliveries")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Roll up and remove deliveries older than the retention window")
+    run.add_argument("--days", type=int, default=None, help="Retention window in days (default: DELIVERY_RETENTION_DAYS)")
+    commands.add_parser("partitions", help="Create the upcoming monthly partitions (PostgreSQL)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+    if args.command == "partitions":
+        with SessionLocal() as db:
+            print(f"Created {ensure_partitions(db)} partitions.")
+        return
+    print(f"Removed {run_once(args.days)} delivery rows.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Pre-aggregated analytics counters, so the dashboard never scans
+notification_deliveries or user_alert_status.
+
+- `alert_rollups`: deliveries and reads per alert;
+- `severity_rollups`: alerts created and deliveries per severity;
+- `delivery_daily_rollups`: deliveries per UTC day and channel;
+- `delivery_archive_rollups`: deliveries per UTC day, alert and channel of
+  the rows core/retention.py removed, so `rebuild` still counts them.
+
+The write paths bump them in the same transaction as the rows they count:
+channels after each delivery chunk, the alert routes on create and on a
+severity change, and core/statuses when a status turns READ. Active snoozes
+depend on the clock, so they are counted through the index on
+user_alert_status.snoozed_until instead, whose `> now` range only covers
+rows snoozed right now. `rebuild` recomputes every rollup from the base tables.
+
+Usage (from the api/ directory):
+    python -m core.rollups rebuild
+"""
+import argparse
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from services import models
+from services.database import SessionLocal, dialect_insert, engine
+from services.migrations import run_migrations
+from core import versions
+
+alert_rollups = models.AlertRollup.__table__
+severity_rollups = models.SeverityRollup.__table__
+daily_rollups = models.DeliveryDailyRollup.__table__
+archive_rollups = models.DeliveryArchiveRollup.__table__
+
+def _increment(db: Session, table, keys: List[str], rows: List[dict]):
+    """
+    Adds each row's counters onto the rollup row with the same key, creating
+    it when missing. Rows must have distinct keys; they are written in key
+    order so concurrent writers lock rollup rows in the same order.
+    """
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+    counters = [column for column in rows[0] if column not in keys]
+
+    insert_ = dialect_insert(db)
+    if insert_ is not None:
+        upsert = insert_(table)
+        upsert = upsert.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: table.c[column] + upsert.excluded[column] for column in counters},
+        )
+        db.execute(upsert, rows)
+        return
+
+    for row in rows:
+        updated = db.execute(
+            update(table).
+            where(*(table.c[key] == row[key] for key in keys)).
+            values({column: table.c[column] + row[column] for column in counters})
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(**row))
+
+# --- Write-path hooks; each runs inside the caller's transaction ---
+def deliveries_written(db: Session, targets: List, channel: str, day: Optional[date] = None):
+    """Counts a chunk of delivered NotificationTargets."""
+    if not targets:
+        return
+    per_alert = Counter(target.alert_id for target in targets)
+    per_severity = Counter(target.severity for target in targets)
+    _increment(db, alert_rollups, ["alert_id"], [
+        {"alert_id": alert_id, "delivered_count": count} for alert_id, count in per_alert.items()
+    ])
+    _increment(db, severity_rollups, ["severity"], [
+        {"severity": severity, "delivered_count": count} for severity, count in per_severity.items()
+    ])
+    _increment(db, daily_rollups, ["day", "channel"], [
+        {"day": day or datetime.utcnow().date(), "channel": channel, "delivered_count": len(targets)}
+    ])
+    versions.bump(db, versions.ANALYTICS)
+
+def deliveries_archived(db: Session, rows: List[dict]):
+    """
+    Keeps (day, alert_id, channel, delivered_count) rows counting deliveries
+    that are about to be removed. The live rollups already count them.
+    """
+    _increment(db, archive_rollups, ["day", "alert_id", "channel"], rows)
+
+def alert_created(db: Session, alert: models.Alert):
+    alerts_created(db, [alert])
+
+def alerts_created(db: Session, alerts: List):
+    """Counts new alerts; anything with `id` and `severity` will do, such as rows returned by a bulk INSERT."""
+    if not alerts:
+        return
+    db.execute(insert(alert_rollups), [{"alert_id": alert.id, "delivered_count": 0, "read_count": 0} for alert in alerts])
+    per_severity = Counter(alert.severity for alert in alerts)
+    _increment(db, severity_rollups, ["severity"], [
+        {"severity": severity, "alert_count": count} for severity, count in per_severity.items()
+    ])
+    versions.bump(db, versions.ANALYTICS)
+
+def alert_severity_changed(db: Session, old: models.AlertSeverity, new: models.AlertSeverity):
+    """Moves the alert between severities; its past deliveries stay counted under the old one."""
+    if old == new:
+        return
+    _increment(db, severity_rollups, ["severity"], [
+        {"severity": old, "alert_count": -1},
+        {"severity": new, "alert_count": 1},
+    ])
+    versions.bump(db, versions.ANALYTICS)
+
+def reads_recorded(db: Session, per_alert: Dict[int, int]):
+    """`per_alert` maps alert ids to how many status rows just turned READ."""
+    rows = [{"alert_id": alert_id, "read_count": count} for alert_id, count in per_alert.items() if count]
+    if rows:
+        _increment(db, alert_rollups, ["alert_id"], rows)
+        versions.bump(db, versions.ANALYTICS)
+
+# --- Rebuild ---
+def delivered_alerts():
+    """
+    A subquery with one (delivery_id, alert_id, user_id, channel, sent_at)
+    row per alert delivered to a user: plain deliveries as they are, digests
+    expanded through notification_delivery_alerts.
+    """
+    deliveries = models.NotificationDelivery
+    covered = models.NotificationDeliveryAlert
+    plain = select(deliveries.id.label("delivery_id"), deliveries.alert_id, deliveries.user_id, deliveries.channel, deliveries.sent_at). \
+        where(deliveries.alert_count == 1)
+    digested = select(deliveries.id.label("delivery_id"), covered.alert_id, deliveries.user_id, deliveries.channel, deliveries.sent_at). \
+        join(deliveries, deliveries.id == covered.delivery_id)
+    return union_all(plain, digested).subquery("delivered_alerts")
+
+def rebuild(db: Session):
+    """Recomputes every rollup from the base tables. The caller commits."""
+    deliveries = models.NotificationDelivery
+    status = models.UserAlertStatus
+
+    db.execute(delete(alert_rollups))
+    db.execute(delete(severity_rollups))
+    db.execute(delete(daily_rollups))
+
+    archived = models.DeliveryArchiveRollup
+    pairs = delivered_alerts()
+    per_alert = union_all(
+        select(pairs.c.alert_id, func.count().label("n")).group_by(pairs.c.alert_id),
+        select(archived.alert_id, func.sum(archived.delivered_count).label("n")).group_by(archived.alert_id),
+    ).subquery()
+    delivered = select(per_alert.c.alert_id, func.sum(per_alert.c.n).label("n")).group_by(per_alert.c.alert_id).subquery()
+    read = select(status.alert_id, func.count().label("n")). \
+        where(status.status == models.UserAlertStatusEnum.READ). \
+        group_by(status.alert_id).subquery()
+
+    db.execute(insert(alert_rollups).from_select(
+        ["alert_id", "delivered_count", "read_count"],
+        select(models.Alert.id, func.coalesce(delivered.c.n, 0), func.coalesce(read.c.n, 0)).
+        outerjoin(delivered, delivered.c.alert_id == models.Alert.id).
+        outerjoin(read, read.c.alert_id == models.Alert.id)
+    ))
+    db.execute(insert(severity_rollups).from_select(
+        ["severity", "alert_count", "delivered_count"],
+        select(models.Alert.severity, func.count(models.Alert.id), func.coalesce(func.sum(delivered.c.n), 0)).
+        outerjoin(delivered, delivered.c.alert_id == models.Alert.id).
+        group_by(models.Alert.severity)
+    ))
+    day = func.date(deliveries.sent_at)
+    per_day = union_all(
+        select(day.label("day"), deliveries.channel, func.sum(deliveries.alert_count).label("n")).group_by(day, deliveries.channel),
+        select(archived.day, archived.channel, func.sum(archived.delivered_count).label("n")).group_by(archived.day, archived.channel),
+    ).subquery()
+    db.execute(insert(daily_rollups).from_select(
+        ["day", "channel", "delivered_count"],
+        select(per_day.c.day, per_day.c.channel, func.sum(per_day.c.n)).group_by(per_day.c.day, per_day.c.channel)
+    ))
+    versions.bump(db, versions.ANALYTICS)
+
+def ensure_backfilled(db: Session):
+    """Builds the rollups once for databases that predate them."""
+    if db.execute(select(severity_rollups.c.severity).limit(1)).first() is not None:
+        return
+    if db.execute(select(models.Alert.id).limit(1)).first() is None:
+        return
+    rebuild(db)
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the analytics rollup tables")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recompute every rollup from notification_deliveries, user_alert_status and the delivery archive")
+    parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+
+    run_migrations()
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        alerts = db.query(func.count(alert_rollups.c.alert_id)).scalar()
+        days = db.query(func.count(func.distinct(daily_rollups.c.day))).scalar()
+    finally:
+        db.close()
+    print(f"Rebuilt analytics rollups for {alerts} alerts over {days} days of deliveries.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from services import models, schemas
+from services.database import SessionLocal
+from core.reminders import process_reminders
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LOCK_NAME = "reminder-cycle"
+MAX_CYCLE_HISTORY = 100
+
+# --- DB-backed lease lock ---
+def acquire_lock(db: Session, name: str, owner: str, ttl_seconds: int) -> bool:
+    """
+    Takes (or renews) the named lease if it is free, expired or already ours.
+    Returns False when another owner holds an unexpired lease.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    taken = db.query(models.SchedulerLock).filter(
+        models.SchedulerLock.name == name,
+        or_(models.SchedulerLock.expires_at <= now, models.SchedulerLock.owner == owner)
+    ).update({"owner": owner, "expires_at": expires_at}, synchronize_session=False)
+
+    if not taken:
+        # Either nobody has ever held the lock, or somebody else holds it right now
+        db.add(models.SchedulerLock(name=name, owner=owner, expires_at=expires_at))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    db.commit()
+    return True
+
+def release_lock(db: Session, name: str, owner: str):
+    db.query(models.SchedulerLock).filter(
+        models.SchedulerLock.name == name,
+        models.SchedulerLock.owner == owner
+    ).update({"expires_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+# --- Scheduler ---
+class LeaseLost(Exception):
+    """The scheduler's lease expired mid-cycle and another worker took it over."""
+
+class ReminderScheduler:
+    """
+    Runs `process_reminders` in a worker thread, every `interval_seconds` and
+    whenever a cycle is enqueued. Cycles never overlap: within a process they
+    are consumed one at a time from a queue, and across API workers the
+    `reminder-cycle` lease lock decides who runs. The lease is renewed after
+    every batch, and a cycle that finds it taken over stops as ABORTED.
+
+    Cycles are rows of `reminder_cycles`, so every API worker can report on
+    a cycle, whichever one queued it.
+    """
+    def __init__(self, interval_seconds: int = None, lock_ttl_seconds: int = None):
+        self.interval_seconds = settings.REMINDER_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.lock_ttl_seconds = lock_ttl_seconds or settings.REMINDER_LOCK_TTL_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        logger.info("scheduler.started owner=%s interval_s=%s", self.owner, self.interval_seconds)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        logger.info("scheduler.stopped owner=%s", self.owner)
+
+    def enqueue(self, trigger: str = "manual") -> schemas.ReminderCycle:
+        """
+        Queues a cycle and returns immediately; called from the threadpool. If
+        a cycle this scheduler queued is still waiting to run it is returned
+        instead, so repeated clicks do not stack up.
+        """
+        with SessionLocal() as db:
+            waiting = db.query(models.ReminderCycle).filter(
+                models.ReminderCycle.owner == self.owner,
+                models.ReminderCycle.status == "QUEUED"
+            ).first()
+            if waiting is not None:
+                return schemas.ReminderCycle.model_validate(waiting)
+            cycle = self._new_cycle(db, trigger)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, cycle.cycle_id)
+        return cycle
+
+    def get_cycle(self, cycle_id: str) -> Optional[schemas.ReminderCycle]:
+        with SessionLocal() as db:
+            cycle = db.get(models.ReminderCycle, cycle_id)
+            return schemas.ReminderCycle.model_validate(cycle) if cycle is not None else None
+
+    def _new_cycle(self, db: Session, trigger: str) -> schemas.ReminderCycle:
+        cycle = models.ReminderCycle(
+            cycle_id=uuid.uuid4().hex,
+            trigger=trigger,
+            status="QUEUED",
+            owner=self.owner,
+            queued_at=datetime.utcnow(),
+        )
+        db.add(cycle)
+        db.flush()
+        # Keep the newest MAX_CYCLE_HISTORY cycles
+        oldest_dropped = db.query(models.ReminderCycle.queued_at). \
+            order_by(models.ReminderCycle.queued_at.desc()). \
+            offset(MAX_CYCLE_HISTORY).limit(1).scalar()
+        if oldest_dropped is not None:
+            db.query(models.ReminderCycle).filter(
+                models.ReminderCycle.queued_at <= oldest_dropped
+            ).delete(synchronize_session=False)
+        result = schemas.ReminderCycle.model_validate(cycle)
+        db.commit()
+        return result
+
+    def _update_cycle(self, db: Session, cycle_id: str, **values):
+        db.query(models.ReminderCycle).filter(models.ReminderCycle.cycle_id == cycle_id). \
+            update(values, synchronize_session=False)
+        db.commit()
+
+    def _renew_lock(self, db: Session):
+        if not acquire_lock(db, REMINDER_LOCK_NAME, self.owner, self.lock_ttl_seconds):
+            raise LeaseLost("The reminder lease expired and another worker took over the cycle.")
+
+    async def _run(self):
+        timeout = self.interval_seconds if self.interval_seconds > 0 else None
+        while True:
+            try:
+                cycle_id = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                cycle_id = None
+            await asyncio.to_thread(self._run_cycle, cycle_id)
+
+    def _run_cycle(self, cycle_id: Optional[str]):
+        """Runs a queued cycle, or a new interval cycle when `cycle_id` is None."""
+        started = time.perf_counter()
+        status, message = "FAILED", None
+
+        db = SessionLocal()
+        try:
+            if cycle_id is None:
+                cycle_id = self._new_cycle(db, "interval").cycle_id
+            self._update_cycle(db, cycle_id, status="RUNNING", started_at=datetime.utcnow())
+            if not acquire_lock(db, REMINDER_LOCK_NAME, self.owner, self.lock_ttl_seconds):
+                status, message = "SKIPPED", "Another worker is already running a reminder cycle."
+                return
+            try:
+                result = process_reminders(db, after_batch=lambda: self._renew_lock(db))
+                status, message = "COMPLETED", result["message"]
+            except LeaseLost as exc:
+                status, message = "ABORTED", str(exc)
+                logger.warning("scheduler.cycle_aborted cycle_id=%s owner=%s", cycle_id, self.owner)
+            finally:
+                db.rollback() # Discard anything a failed cycle left behind before releasing
+                release_lock(db, REMINDER_LOCK_NAME, self.owner)
+        except Exception as exc:
+            db.rollback()
+            message = str(exc)
+            logger.exception("scheduler.cycle_failed cycle_id=%s", cycle_id)
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            if cycle_id is not None:
+                try:
+                    self._update_cycle(db, cycle_id, status=status, message=message,
+                                       finished_at=datetime.utcnow(), duration_ms=duration_ms)
+                except Exception:
+                    db.rollback()
+                    logger.exception("scheduler.cycle_update_failed cycle_id=%s", cycle_id)
+            db.close()
+            logger.info(
+                "scheduler.cycle_finished cycle_id=%s status=%s duration_ms=%.1f",
+                cycle_id, status, duration_ms,
+            )
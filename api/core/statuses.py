@@ -0,0 +1,180 @@
+"""
+Writes to user_alert_status.
+
+Each (user_id, alert_id) pair has at most one status row, enforced by the
+unique index ux_user_alert_status_user_alert. Read and snooze are written as
+an `INSERT ... ON CONFLICT DO UPDATE` on PostgreSQL and SQLite, so concurrent
+clicks cannot create duplicates; other databases fall back to read-then-write.
+Bulk changes write every selected (user, alert) pair with one set-based
+statement.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import and_, exists, func, literal, or_, select, true, tuple_, update
+from sqlalchemy.orm import Session
+
+from services import models, schemas
+from services.database import dialect_insert
+from core import audience, rollups, unread_counts, versions
+
+status_table = models.UserAlertStatus.__table__
+
+def _is_counted(now: datetime):
+    return and_(
+        status_table.c.status == models.UserAlertStatusEnum.UNREAD,
+        or_(status_table.c.snoozed_until == None, status_table.c.snoozed_until <= now)
+    )
+
+def _stamped(values: dict, now: datetime) -> dict:
+    """Adds the read_at / snoozed_at timestamps the analytics time series are bucketed on."""
+    values = dict(values)
+    if values.get("status") == models.UserAlertStatusEnum.READ:
+        values["read_at"] = now
+    if values.get("snoozed_until") is not None:
+        values["snoozed_at"] = now
+    return values
+
+def set_status(db: Session, user_id: int, alert_id: int, values: dict, now: Optional[datetime] = None) -> bool:
+    """
+    Applies `values` to the user's status row for the alert, creating it when
+    missing. Returns whether the alert counted as unread before the write, so
+    the caller can adjust the unread counter. A row turning READ is counted
+    in the analytics rollups here. The caller commits.
+
+    The upsert only updates a row that is still counted, and reports through
+    RETURNING whether it wrote. Inserts and counted rows, the common case,
+    take one round trip; a row that was already read or snoozed takes a
+    second, plain UPDATE.
+    """
+    now = now or datetime.utcnow()
+    values = _stamped(values, now)
+    marks_read = values.get("status") == models.UserAlertStatusEnum.READ
+    if "snoozed_until" in values:
+        versions.bump(db, versions.ANALYTICS) # active snooze counts
+    insert = dialect_insert(db)
+    if insert is None:
+        status_obj = db.query(models.UserAlertStatus).filter_by(user_id=user_id, alert_id=alert_id).with_for_update().first()
+        was_counted = unread_counts.is_counted(status_obj, now)
+        if marks_read and status_obj is not None and status_obj.status == models.UserAlertStatusEnum.READ:
+            values.pop("read_at") # Already read; keep the original timestamp
+        elif marks_read:
+            rollups.reads_recorded(db, {alert_id: 1})
+        if status_obj is None:
+            db.add(models.UserAlertStatus(user_id=user_id, alert_id=alert_id, **values))
+        else:
+            for key, value in values.items():
+                setattr(status_obj, key, value)
+        db.flush()
+        return was_counted
+
+    upsert = insert(status_table). \
+        values(user_id=user_id, alert_id=alert_id, **values). \
+        on_conflict_do_update(index_elements=["user_id", "alert_id"], set_=values, where=_is_counted(now)). \
+        returning(status_table.c.id)
+    if db.execute(upsert).first() is not None:
+        if marks_read:
+            rollups.reads_recorded(db, {alert_id: 1})
+        return True
+
+    fallback = update(status_table). \
+        where(status_table.c.user_id == user_id, status_table.c.alert_id == alert_id). \
+        values(**values)
+    if marks_read:
+        fallback = fallback.where(status_table.c.status != models.UserAlertStatusEnum.READ)
+    if db.execute(fallback).rowcount and marks_read:
+        rollups.reads_recorded(db, {alert_id: 1})
+    return False
+
+# --- Bulk changes ---
+def _end_of_day(now: datetime) -> datetime:
+    return now.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+def bulk_values(action: schemas.BulkStatusAction, now: datetime) -> dict:
+    if action == schemas.BulkStatusAction.READ:
+        return {"status": models.UserAlertStatusEnum.READ}
+    if action == schemas.BulkStatusAction.SNOOZE:
+        return {"snoozed_until": _end_of_day(now)}
+    return {"snoozed_until": None}
+
+def bulk_set(db: Session, pairs, action: schemas.BulkStatusAction, now: Optional[datetime] = None) -> int:
+    """
+    Applies `action` to every (user_id, alert_id) row of the `pairs` SELECT,
+    creating missing status rows, in one statement. Returns the number of rows
+    written. The analytics rollups are updated here; unread counters and
+    caches are left to the caller, which also commits.
+    """
+    now = now or datetime.utcnow()
+    values = _stamped(bulk_values(action, now), now)
+    if "snoozed_until" in values:
+        versions.bump(db, versions.ANALYTICS) # active snooze counts
+    pairs = pairs.subquery()
+    selected = tuple_(status_table.c.user_id, status_table.c.alert_id).in_(select(pairs.c.user_id, pairs.c.alert_id))
+
+    if action == schemas.BulkStatusAction.READ:
+        # Pairs about to turn READ, per alert, for the read rollups
+        newly_read = db.execute(
+            select(pairs.c.alert_id, func.count()).
+            select_from(pairs).
+            outerjoin(status_table, and_(
+                status_table.c.user_id == pairs.c.user_id, status_table.c.alert_id == pairs.c.alert_id
+            )).
+            where(or_(status_table.c.id == None, status_table.c.status != models.UserAlertStatusEnum.READ)).
+            group_by(pairs.c.alert_id)
+        ).all()
+        rollups.reads_recorded(db, dict(newly_read))
+
+    if action == schemas.BulkStatusAction.UNSNOOZE:
+        # Pairs without a row are not snoozed; only existing rows change
+        return db.execute(update(status_table).where(selected, status_table.c.snoozed_until != None).values(**values)).rowcount
+
+    inserted = {"status": models.UserAlertStatusEnum.UNREAD, **values}
+    source = select(
+            pairs.c.user_id,
+            pairs.c.alert_id,
+            *(literal(value, status_table.c[column].type) for column, value in inserted.items()),
+        ). \
+        where(true()) # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+    columns = ["user_id", "alert_id", *inserted]
+
+    # Rows that were already read keep their original read_at
+    updated_values = dict(values)
+    if "read_at" in values:
+        updated_values["read_at"] = func.coalesce(status_table.c.read_at, values["read_at"])
+
+    insert = dialect_insert(db)
+    if insert is not None:
+        upsert = insert(status_table). \
+            from_select(columns, source). \
+            on_conflict_do_update(index_elements=["user_id", "alert_id"], set_=updated_values)
+        return db.execute(upsert).rowcount
+
+    updated = db.execute(update(status_table).where(selected).values(**updated_values)).rowcount
+    missing = source.where(~exists().where(
+        status_table.c.user_id == pairs.c.user_id, status_table.c.alert_id == pairs.c.alert_id
+    ))
+    return updated + db.execute(status_table.insert().from_select(columns, missing)).rowcount
+
+def visible_pairs_for_user(user_id: int, now: datetime, alert_ids: Optional[List[int]] = None):
+    """(user_id, alert_id) for the active alerts visible to a user, optionally limited to `alert_ids`."""
+    on_clause, is_visible = audience.visible_to_user(user_id)
+    query = select(models.User.id.label("user_id"), models.Alert.id.label("alert_id")). \
+        select_from(models.Alert). \
+        join(models.User, models.User.id == user_id). \
+        outerjoin(audience.recipients, on_clause). \
+        where(unread_counts.is_active_alert(now), is_visible)
+    if alert_ids is not None:
+        query = query.where(models.Alert.id.in_(alert_ids))
+    return query
+
+def audience_pairs_for_alert(alert_id: int, team_id: Optional[int] = None):
+    """(user_id, alert_id) for every user the alert is visible to, optionally limited to one team."""
+    on_clause, is_visible = audience.visible_to_user(models.User.id)
+    query = select(models.User.id.label("user_id"), models.Alert.id.label("alert_id")). \
+        select_from(models.User). \
+        join(models.Alert, models.Alert.id == alert_id). \
+        outerjoin(audience.recipients, on_clause). \
+        where(is_visible)
+    if team_id is not None:
+        query = query.where(models.User.team_id == team_id)
+    return query
@@ -0,0 +1,130 @@
+"""
+Bucketed time series of deliveries, reads and snoozes for the analytics view.
+
+Rows are grouped by `epoch // bucket_seconds` in SQL, so only one row per
+bucket leaves the database. When the requested range holds more than
+ANALYTICS_MAX_POINTS buckets, the bucket is widened to a multiple of the
+requested one until it fits, which bounds the response however much history
+is retained. Empty buckets are filled with zeros.
+"""
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import BigInteger, Integer, cast, func
+from sqlalchemy.orm import Session
+
+from services import models, schemas
+from core import rollups
+from utils.settings import settings
+
+BUCKET_SECONDS = {
+    schemas.TimeseriesBucket.MINUTE: 60,
+    schemas.TimeseriesBucket.HOUR: 3600,
+    schemas.TimeseriesBucket.DAY: 86400,
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _epoch_seconds(db: Session, column):
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return cast(func.extract("epoch", column), BigInteger)
+
+def _source(metric: schemas.TimeseriesMetric, alert_id: Optional[int]):
+    """(table, timestamp column, count per bucket) a metric is counted from."""
+    if metric == schemas.TimeseriesMetric.DELIVERIES:
+        if alert_id is not None:
+            # A digest row only names its first alert
+            delivered = rollups.delivered_alerts()
+            return delivered, delivered.c.sent_at, func.count()
+        deliveries = models.NotificationDelivery.__table__
+        return deliveries, deliveries.c.sent_at, func.sum(deliveries.c.alert_count)
+    status = models.UserAlertStatus.__table__
+    if metric == schemas.TimeseriesMetric.READS:
+        return status, status.c.read_at, func.count()
+    return status, status.c.snoozed_at, func.count()
+
+def _seconds(value: datetime) -> float:
+    return (value - EPOCH).total_seconds()
+
+def bucket_starts(bucket: schemas.TimeseriesBucket, start: datetime, end: datetime, max_points: int) -> range:
+    """Aligned starts (epoch seconds) of the buckets covering [start, end), widened to at most `max_points`."""
+    base = BUCKET_SECONDS[bucket]
+    width = base * max(1, math.ceil((end - start).total_seconds() / (base * max_points)))
+    while True:
+        starts = range(int(_seconds(start)) // width * width, math.ceil(_seconds(end)), width)
+        if len(starts) <= max_points:
+            return starts
+        width += base
+
+def _counts_from_rows(db: Session, metric, start, end, width, alert_id, team_id) -> Dict[int, int]:
+    source, timestamp, count = _source(metric, alert_id)
+    bucket = _epoch_seconds(db, timestamp) // width * width
+
+    query = db.query(bucket.label("bucket"), count).select_from(source). \
+        filter(timestamp >= start, timestamp < end)
+    if alert_id is not None:
+        query = query.filter(source.c.alert_id == alert_id)
+    if team_id is not None:
+        query = query.join(models.User, models.User.id == source.c.user_id).filter(models.User.team_id == team_id)
+    return {int(bucket_start): int(count) for bucket_start, count in query.group_by(bucket)}
+
+def _counts_from_daily_rollups(db: Session, start, end, width) -> Dict[int, int]:
+    """Daily delivery totals, which outlive the delivery rows themselves."""
+    rollup = models.DeliveryDailyRollup
+    rows = db.query(rollup.day, func.sum(rollup.delivered_count)). \
+        filter(rollup.day >= start.date(), rollup.day < end.date() + timedelta(days=1)). \
+        group_by(rollup.day)
+
+    counts: Dict[int, int] = {}
+    for day, count in rows:
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        epoch = int(_seconds(datetime(day.year, day.month, day.day)))
+        counts[epoch // width * width] = counts.get(epoch // width * width, 0) + int(count)
+    return counts
+
+def series(
+    db: Session,
+    metric: schemas.TimeseriesMetric,
+    bucket: schemas.TimeseriesBucket,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    alert_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    max_points: Optional[int] = None,
+) -> schemas.Timeseries:
+    """
+    Counts of `metric` per bucket over [start, end), in naive UTC. Defaults to
+    the latest `max_points` buckets. Raises ValueError for an empty range.
+    """
+    max_points = max_points or settings.ANALYTICS_MAX_POINTS
+    start, end = _naive_utc(start), _naive_utc(end)
+    end = end or datetime.utcnow()
+    if start is None:
+        # The latest `max_points` whole buckets, the last one holding `end`
+        base = BUCKET_SECONDS[bucket]
+        start = EPOCH + timedelta(seconds=int(_seconds(end)) // base * base - base * (max_points - 1))
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    starts = bucket_starts(bucket, start, end, max_points)
+    width = starts.step
+
+    if metric == schemas.TimeseriesMetric.DELIVERIES and width % 86400 == 0 and alert_id is None and team_id is None:
+        counts = _counts_from_daily_rollups(db, start, end, width)
+    else:
+        counts = _counts_from_rows(db, metric, start, end, width, alert_id, team_id)
+
+    points = [
+        schemas.TimeseriesPoint(bucket_start=EPOCH + timedelta(seconds=bucket_start), count=counts.get(bucket_start, 0))
+        for bucket_start in starts
+    ]
+    return schemas.Timeseries(
+        metric=metric, bucket=bucket, bucket_seconds=width, from_time=start, to_time=end, points=points,
+    )
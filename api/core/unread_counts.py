@@ -0,0 +1,226 @@
+"""
+Incrementally maintained per-user unread counters for badge polling.
+
+`user_unread_counts` holds, per user, the number of visible and active alerts
+that are neither READ nor currently snoozed. Reading a counter is a primary-key
+lookup. Writes keep it current:
+
+- a new alert increments the counter of everyone in its audience;
+- reading or snoozing an alert that was counted decrements it;
+- updating or archiving an alert drops the affected counters, which are
+  recomputed on their next read;
+- alerts that start or expire and snoozes that end are handled through
+  `valid_until`: a counter past that moment is recomputed on its next read.
+
+Usage (from the api/ directory):
+    python -m core.unread_counts rebuild
+"""
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, delete, exists, func, insert, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from services import models
+from services.database import SessionLocal, dialect_insert, engine
+from services.migrations import run_migrations
+from core import audience
+
+counts = models.UserUnreadCount.__table__
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC, but PostgreSQL and API clients may hand back aware ones
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def is_counted(status_obj: Optional[models.UserAlertStatus], now: datetime) -> bool:
+    """Whether an alert with this personal status currently counts as unread."""
+    if status_obj is None:
+        return True
+    snoozed_until = _as_naive_utc(status_obj.snoozed_until)
+    return status_obj.status == models.UserAlertStatusEnum.UNREAD and (snoozed_until is None or snoozed_until <= now)
+
+def is_active_alert(now: datetime):
+    """Filter on Alert: not archived, already started and not yet expired at `now`."""
+    return and_(
+        models.Alert.is_archived == False,
+        models.Alert.start_time <= now,
+        or_(models.Alert.expiry_time == None, models.Alert.expiry_time > now)
+    )
+
+def _next_alert_change(db: Session, now: datetime) -> Optional[datetime]:
+    """The next moment any alert starts or expires; counters are re-checked then."""
+    next_start, next_expiry = db.query(
+        func.min(case((models.Alert.start_time > now, models.Alert.start_time))),
+        func.min(case((models.Alert.expiry_time > now, models.Alert.expiry_time))),
+    ).filter(models.Alert.is_archived == False).one()
+    candidates = [_as_naive_utc(value) for value in (next_start, next_expiry) if value is not None]
+    return min(candidates) if candidates else None
+
+def recompute(db: Session, user_ids: Optional[Iterable[int]] = None):
+    """
+    Recomputes the counters of `user_ids` (all users when None) with one
+    grouped query, and upserts them; the whole table is only replaced when
+    rebuilding every counter. The caller commits.
+    """
+    now = datetime.utcnow()
+    on_clause, is_visible = audience.visible_to_user(models.User.id)
+    status = models.UserAlertStatus
+
+    counted = or_(
+        status.id == None,
+        and_(status.status == models.UserAlertStatusEnum.UNREAD,
+             or_(status.snoozed_until == None, status.snoozed_until <= now))
+    )
+    snoozed = and_(status.status == models.UserAlertStatusEnum.UNREAD, status.snoozed_until > now)
+
+    query = db.query(
+            models.User.id,
+            func.count(case((counted, 1))),
+            func.min(case((snoozed, status.snoozed_until))),
+        ). \
+        select_from(models.User). \
+        join(models.Alert, is_active_alert(now)). \
+        outerjoin(audience.recipients, on_clause). \
+        outerjoin(status, and_(status.user_id == models.User.id, status.alert_id == models.Alert.id)). \
+        filter(is_visible)
+    existing = db.query(models.User.id)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        query = query.filter(models.User.id.in_(user_ids))
+        existing = existing.filter(models.User.id.in_(user_ids))
+
+    grouped = {user_id: (count, snooze_ends) for user_id, count, snooze_ends in query.group_by(models.User.id)}
+    next_change = _next_alert_change(db, now)
+
+    rows = []
+    for (user_id,) in existing:
+        count, snooze_ends = grouped.get(user_id, (0, None))
+        candidates = [_as_naive_utc(value) for value in (next_change, snooze_ends) if value is not None]
+        rows.append({"user_id": user_id, "unread_count": count, "valid_until": min(candidates) if candidates else None})
+
+    if user_ids is None:
+        db.execute(delete(counts))
+        if rows:
+            db.execute(insert(counts), rows)
+        return
+
+    # Counters of users that no longer exist
+    gone = set(user_ids) - {row["user_id"] for row in rows}
+    if gone:
+        db.execute(delete(counts).where(counts.c.user_id.in_(gone)))
+    if not rows:
+        return
+    insert_ = dialect_insert(db)
+    if insert_ is None:
+        db.execute(delete(counts).where(counts.c.user_id.in_([row["user_id"] for row in rows])))
+        db.execute(insert(counts), rows)
+        return
+    # An upsert, as concurrent reads of the same stale counter may both recompute it
+    upsert = insert_(counts)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[counts.c.user_id],
+        set_={"unread_count": upsert.excluded.unread_count, "valid_until": upsert.excluded.valid_until},
+    )
+    db.execute(upsert, rows)
+
+def get_unread_counts(db: Session, user_ids: List[int]) -> Dict[int, int]:
+    """Counters for existing users among `user_ids`; stale or missing ones are recomputed first."""
+    now = datetime.utcnow()
+    fresh = dict(db.query(counts.c.user_id, counts.c.unread_count).filter(
+        counts.c.user_id.in_(user_ids),
+        or_(counts.c.valid_until == None, counts.c.valid_until > now)
+    ).all())
+
+    stale = [user_id for user_id in user_ids if user_id not in fresh]
+    if stale:
+        recompute(db, stale)
+        db.commit()
+        fresh.update(db.query(counts.c.user_id, counts.c.unread_count).filter(counts.c.user_id.in_(stale)).all())
+    return fresh
+
+# --- Write-path hooks; each runs inside the caller's transaction ---
+def _lower_valid_until(when: datetime):
+    return case((or_(counts.c.valid_until == None, counts.c.valid_until > when), when), else_=counts.c.valid_until)
+
+def _audience_filter(db: Session, alert: models.Alert):
+    user_ids = audience.user_ids_for_alert(db, alert)
+    return true() if user_ids is None else counts.c.user_id.in_(user_ids)
+
+def alert_created(db: Session, alert: models.Alert):
+    now = datetime.utcnow()
+    values = {}
+    if _as_naive_utc(alert.start_time) <= now:
+        values["unread_count"] = counts.c.unread_count + 1
+        if alert.expiry_time is not None:
+            values["valid_until"] = _lower_valid_until(alert.expiry_time)
+    else:
+        # Not visible yet; re-check when it starts
+        values["valid_until"] = _lower_valid_until(alert.start_time)
+    db.execute(update(counts).where(_audience_filter(db, alert)).values(**values))
+
+def alerts_created(db: Session, alert_ids: List[int], any_org_wide: bool):
+    """
+    Many alerts created at once (bulk imports): rather than incrementing per
+    alert, drops the counters of their audiences, or every counter when one
+    of them is org-wide. They are recomputed on their next read.
+    """
+    if any_org_wide:
+        db.execute(delete(counts))
+    elif alert_ids:
+        users_changed(db, select(audience.recipients.c.user_id).where(audience.recipients.c.alert_id.in_(alert_ids)))
+
+def alert_changed(db: Session, alert: models.Alert):
+    """Drops the counters of the alert's current audience; call before and after an update."""
+    db.execute(delete(counts).where(_audience_filter(db, alert)))
+
+def user_changed(db: Session, user_id: int):
+    db.execute(delete(counts).where(counts.c.user_id == user_id))
+
+def users_changed(db: Session, user_ids):
+    """Drops the counters of `user_ids`, a list or a SELECT of user ids."""
+    db.execute(delete(counts).where(counts.c.user_id.in_(user_ids)))
+
+def alert_cleared(db: Session, user_id: int, alert_id: int, until: Optional[datetime] = None):
+    """
+    A counted (unread, unsnoozed) alert was read, or snoozed until `until`.
+    Decrements the counter if the alert is currently active and visible to the user.
+    """
+    now = datetime.utcnow()
+    on_clause, is_visible = audience.visible_to_user(user_id)
+    counted_alert = exists(
+        select(models.Alert.id).
+        outerjoin(audience.recipients, on_clause).
+        where(models.Alert.id == alert_id, is_active_alert(now), is_visible)
+    )
+    values = {"unread_count": counts.c.unread_count - 1}
+    if until is not None:
+        values["valid_until"] = _lower_valid_until(until)
+    db.execute(
+        update(counts).
+        where(counts.c.user_id == user_id, counts.c.unread_count > 0, counted_alert).
+        values(**values)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the user_unread_counts table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recompute every user's unread counter from scratch")
+    parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+
+    run_migrations()
+    db = SessionLocal()
+    try:
+        recompute(db)
+        db.commit()
+        total = db.query(func.count(counts.c.user_id)).scalar()
+    finally:
+        db.close()
+    print(f"Rebuilt unread counters for {total} users.")
+
+if __name__ == "__main__":
+    main()
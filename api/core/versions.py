@@ -0,0 +1,68 @@
+"""
+Per-resource version counters for conditional GETs.
+
+Every write to a listed resource bumps its row in `resource_versions` inside
+the same transaction, so all API workers and background processes agree on
+the current version. Readers keep an in-process copy for
+RESOURCE_VERSION_TTL_SECONDS, which lets a matching If-None-Match be answered
+without a database round trip. A worker forgets its copy as soon as it commits
+a bump itself; bumps made by other processes are seen within the TTL.
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+
+from services import models
+from utils.settings import settings
+
+ALERTS = "alerts"
+USERS = "users"
+TEAMS = "teams"
+ANALYTICS = "analytics"
+RESOURCES = (ALERTS, USERS, TEAMS, ANALYTICS)
+
+versions = models.ResourceVersion.__table__
+
+_known: Dict[str, Tuple[float, int]] = {} # name -> (expires at, version)
+_lock = threading.Lock()
+
+def bump(db: Session, *names: str):
+    """Bumps the versions of `names` in the caller's transaction."""
+    db.execute(update(versions).where(versions.c.name.in_(names)).values(version=versions.c.version + 1))
+    db.info.setdefault("bumped_resources", set()).update(names)
+
+@event.listens_for(Session, "after_commit")
+def _forget_bumped(session: Session):
+    bumped = session.info.pop("bumped_resources", None)
+    if bumped:
+        with _lock:
+            for name in bumped:
+                _known.pop(name, None)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumped(session: Session):
+    session.info.pop("bumped_resources", None)
+
+def current(db: Session, name: str) -> int:
+    """The version of `name`, from the in-process copy while it is fresh."""
+    now = time.monotonic()
+    with _lock:
+        known = _known.get(name)
+    if known is not None and known[0] > now:
+        return known[1]
+
+    version = db.execute(select(versions.c.version).where(versions.c.name == name)).scalar() or 0
+    with _lock:
+        _known[name] = (now + settings.RESOURCE_VERSION_TTL_SECONDS, version)
+    return version
+
+def ensure_rows(db: Session):
+    """Creates the counter rows that do not exist yet, so `bump` can be a plain UPDATE."""
+    existing = set(db.execute(select(versions.c.name)).scalars())
+    missing = [{"name": name, "version": 0} for name in RESOURCES if name not in existing]
+    if missing:
+        db.execute(insert(versions), missing)
+        db.commit()
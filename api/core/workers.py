@@ -0,0 +1,187 @@
+"""
+Sharded reminder cycles.
+
+A cycle is planned by splitting the user-id space into shards stored in the
+`reminder_shards` work table. Any number of worker processes then claim
+shards one at a time and run the candidate scan and delivery writes for just
+that slice, so a cycle spreads over all available cores and connections.
+
+Usage (from the api/ directory):
+    python -m core.workers run --workers 4 --shards 32   # plan a cycle and run it on a process pool
+    python -m core.workers plan --shards 32              # plan only, prints the cycle id
+    python -m core.workers work <cycle_id>               # join a planned cycle from another process/host
+"""
+import argparse
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from services import models
+from services.database import SessionLocal, engine
+from services.migrations import run_migrations
+from core.reminders import process_reminders
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def plan_cycle(db: Session, shard_count: Optional[int] = None) -> str:
+    """Splits the current user-id range into `shard_count` shards and returns the new cycle id."""
+    shard_count = shard_count or settings.REMINDER_SHARD_COUNT
+    cycle_id = uuid.uuid4().hex
+
+    low, high = db.query(func.min(models.User.id), func.max(models.User.id)).one()
+    if low is None:
+        return cycle_id
+
+    span = high - low + 1
+    shard_count = max(1, min(shard_count, span))
+    step = -(-span // shard_count) # ceiling division
+    db.execute(models.ReminderShard.__table__.insert(), [
+        {"cycle_id": cycle_id, "user_id_start": start, "user_id_end": min(start + step, high + 1), "status": "PENDING"}
+        for start in range(low, high + 1, step)
+    ])
+    db.commit()
+    return cycle_id
+
+def _claimable(cycle_id: str):
+    # Shards whose worker died mid-claim become claimable again once the lease runs out
+    stale_before = datetime.utcnow() - timedelta(seconds=settings.REMINDER_LOCK_TTL_SECONDS)
+    return and_(
+        models.ReminderShard.cycle_id == cycle_id,
+        or_(
+            models.ReminderShard.status == "PENDING",
+            and_(models.ReminderShard.status == "CLAIMED", models.ReminderShard.claimed_at < stale_before)
+        )
+    )
+
+def claim_shard(db: Session, cycle_id: str, worker_id: str) -> Optional[models.ReminderShard]:
+    """
+    Claims the next free shard of a cycle for `worker_id`.
+
+    PostgreSQL uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers
+    never wait on each other. Other databases (SQLite) fall back to a
+    compare-and-set UPDATE that stamps a unique claim token on one row.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        shard = db.query(models.ReminderShard).filter(_claimable(cycle_id)). \
+            order_by(models.ReminderShard.id). \
+            with_for_update(skip_locked=True). \
+            limit(1).first()
+        if shard is None:
+            db.rollback()
+            return None
+        shard.status = "CLAIMED"
+        shard.claim_token = uuid.uuid4().hex
+        shard.claimed_by = worker_id
+        shard.claimed_at = datetime.utcnow()
+        db.commit()
+        return shard
+
+    while True:
+        token = uuid.uuid4().hex
+        next_shard = select(models.ReminderShard.id).where(_claimable(cycle_id)). \
+            order_by(models.ReminderShard.id).limit(1).scalar_subquery()
+        result = db.execute(
+            update(models.ReminderShard).
+            where(models.ReminderShard.id == next_shard, _claimable(cycle_id)).
+            values(status="CLAIMED", claim_token=token, claimed_by=worker_id, claimed_at=datetime.utcnow()).
+            execution_options(synchronize_session=False)
+        )
+        db.commit()
+        if result.rowcount:
+            return db.query(models.ReminderShard).filter(models.ReminderShard.claim_token == token).one()
+        # Lost the race for that row; stop only once nothing claimable is left
+        if not db.query(models.ReminderShard.id).filter(_claimable(cycle_id)).first():
+            return None
+
+def _finish_shard(db: Session, shard_id: int, status: str, sent_count: int = 0):
+    db.query(models.ReminderShard).filter(models.ReminderShard.id == shard_id).update(
+        {"status": status, "sent_count": sent_count, "finished_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+
+def run_shard_worker(cycle_id: str, worker_id: Optional[str] = None) -> int:
+    """Claims and processes shards of `cycle_id` until none are left. Returns reminder deliveries queued."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queued = 0
+    db = SessionLocal()
+    try:
+        while True:
+            shard = claim_shard(db, cycle_id, worker_id)
+            if shard is None:
+                break
+            shard_id, user_id_range = shard.id, (shard.user_id_start, shard.user_id_end)
+            try:
+                result = process_reminders(db, user_id_range=user_id_range)
+            except Exception:
+                db.rollback()
+                _finish_shard(db, shard_id, "FAILED")
+                logger.exception("workers.shard_failed cycle_id=%s shard_id=%s", cycle_id, shard_id)
+                continue
+            _finish_shard(db, shard_id, "DONE", result["queued"])
+            queued += result["queued"]
+    finally:
+        db.close()
+    return queued
+
+def _init_pool_worker():
+    # Connections inherited from the parent process must not be shared with it
+    engine.dispose(close=False)
+
+def run_sharded_cycle(workers: Optional[int] = None, shard_count: Optional[int] = None) -> dict:
+    """Plans a cycle and runs it on a pool of `workers` processes."""
+    workers = workers or settings.REMINDER_WORKERS
+    started = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        cycle_id = plan_cycle(db, shard_count)
+    finally:
+        db.close()
+    engine.dispose()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker) as pool:
+        queued = sum(pool.map(run_shard_worker, [cycle_id] * workers))
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    logger.info("workers.cycle_finished cycle_id=%s workers=%d queued=%d duration_ms=%.1f", cycle_id, workers, queued, duration_ms)
+    return {"cycle_id": cycle_id, "queued": queued, "duration_ms": round(duration_ms, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded reminder workers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Plan a cycle and run it on a local process pool")
+    run.add_argument("--workers", type=int, default=None)
+    run.add_argument("--shards", type=int, default=None)
+    plan = commands.add_parser("plan", help="Plan a cycle and print its id")
+    plan.add_argument("--shards", type=int, default=None)
+    work = commands.add_parser("work", help="Process shards of an already planned cycle")
+    work.add_argument("cycle_id")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+    if args.command == "run":
+        print(run_sharded_cycle(args.workers, args.shards))
+    elif args.command == "plan":
+        db = SessionLocal()
+        try:
+            print(plan_cycle(db, args.shards))
+        finally:
+            db.close()
+    else:
+        print({"cycle_id": args.cycle_id, "queued": run_shard_worker(args.cycle_id)})
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,64 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from services import models
-from services.database import engine
-from routes import alerts, users ,user_management,team_management,analytics
+from services.database import engine, SessionLocal, async_engine
+from routes import alerts, users ,user_management,team_management,analytics,metrics,stream,ui,bulk_import
+from core import audience, realtime, retention, rollups, versions
+from core.outbox import OutboxDispatcher
+from core.scheduler import ReminderScheduler
+from services.migrations import run_migrations
+from services.pool_metrics import log_pool_metrics_periodically
+from services import profiling
+from utils.settings import settings
 
-# Create all database tables
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+# Create all database tables, then bring existing ones up to date
 models.Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with SessionLocal() as db:
+        versions.ensure_rows(db)
+        audience.ensure_backfilled(db)
+        rollups.ensure_backfilled(db)
+
+    realtime.hub.bind(asyncio.get_running_loop())
+
+    # Reminder cycles run in the background instead of inside an HTTP request
+    app.state.reminder_scheduler = ReminderScheduler()
+    app.state.reminder_scheduler.start()
+    dispatcher = None
+    if settings.OUTBOX_DISPATCH_ENABLED:
+        dispatcher = OutboxDispatcher()
+        dispatcher.start()
+    pool_logger = None
+    if settings.DB_POOL_LOG_INTERVAL_SECONDS > 0:
+        pool_logger = asyncio.create_task(log_pool_metrics_periodically(settings.DB_POOL_LOG_INTERVAL_SECONDS))
+    retention_job = None
+    if settings.RETENTION_INTERVAL_SECONDS > 0:
+        retention_job = asyncio.create_task(retention.run_periodically(settings.RETENTION_INTERVAL_SECONDS))
+    yield
+    realtime.hub.close_all()
+    if pool_logger is not None:
+        pool_logger.cancel()
+    if retention_job is not None:
+        retention_job.cancel()
+    await app.state.reminder_scheduler.stop()
+    if dispatcher is not None:
+        await dispatcher.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="Enhanced Alerting and Notification Platform API",
     description="A scalable API for managing alerts with fine-grained visibility and user preferences.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # For local development with Streamlit's default port, this is what you need.
@@ -27,13 +75,29 @@ app.add_middleware(
     allow_headers=["*"],    # Allows all headers
 )
 
+# Opt-in: Server-Timing headers and per-request SQL/serialization timings in the log
+if settings.PROFILING_ENABLED:
+    profiling.install(engine, async_engine)
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 
 # routers
-app.include_router(analytics.router)
-app.include_router(alerts.router)
-app.include_router(users.router)
+if settings.ASYNC_DB_ENABLED:
+    # Async handlers for the hot alert, inbox and analytics paths
+    from routes import alerts_async, users_async, analytics_async
+    app.include_router(analytics_async.router)
+    app.include_router(alerts_async.router)
+    app.include_router(users_async.router)
+else:
+    app.include_router(analytics.router)
+    app.include_router(alerts.router)
+    app.include_router(users.router)
+app.include_router(stream.router)
 app.include_router(user_management.router)
 app.include_router(team_management.router)
+app.include_router(bulk_import.router)
+app.include_router(metrics.router)
+app.include_router(ui.router)
 
 @app.get("/", tags=["Root"])
 def read_root():
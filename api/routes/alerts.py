@@ -1,17 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List,Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import not_, select
+from sqlalchemy.orm import Session, selectinload
+from typing import Optional, Union
 from datetime import datetime
 
 from services import models, schemas
 from services.database import get_db
-from core import reminders
+from core import audience, http_cache, inbox, realtime, rollups, statuses, unread_counts, versions
+from utils.pagination import finish_page, seek, start_after
+from utils.settings import settings
 router = APIRouter(
     prefix="/admin/alerts",
     tags=["Admin Alerts"],
     responses={404: {"description": "Not found"}},
 )
 
+# Everything schemas.Alert reads besides columns, one IN query each whatever the page size
+ALERT_LOADS = (
+    selectinload(models.Alert.created_by),
+    selectinload(models.Alert.target_users),
+    selectinload(models.Alert.target_teams),
+)
+
+SUMMARY_COLUMNS = (
+    models.Alert.id,
+    models.Alert.title,
+    models.Alert.severity,
+    models.Alert.start_time,
+    models.Alert.expiry_time,
+    models.Alert.created_at,
+)
+
 @router.post("/", response_model=schemas.Alert, status_code=201)
 def create_alert(alert: schemas.AlertCreate, db: Session = Depends(get_db)):
     # Fetch related objects to ensure they exist
@@ -37,27 +56,119 @@ def create_alert(alert: schemas.AlertCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_alert)
+    db.flush()
+    audience.rebuild_alert_audience(db, [db_alert.id])
+    unread_counts.alert_created(db, db_alert)
+    rollups.alert_created(db, db_alert)
+    versions.bump(db, versions.ALERTS)
     db.commit()
     db.refresh(db_alert)
+    inbox.invalidate_alert(db, db_alert)
+    realtime.alert_changed(db, db_alert, "alert.created")
     return db_alert
 
-@router.get("/", response_model=List[schemas.Alert])
-def list_all_alerts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    alerts = db.query(models.Alert).filter(models.Alert.is_archived == False).offset(skip).limit(limit).all()
-    return alerts
+@router.get("/", response_model=Union[schemas.AlertPage, schemas.AlertSummaryPage])
+def list_all_alerts(
+    request: Request,
+    fields: schemas.AlertFields = schemas.AlertFields.FULL,
+    severity: Optional[schemas.AlertSeverity] = None,
+    is_archived: bool = False,
+    active: Optional[bool] = None,
+    team_id: Optional[int] = None,
+    created_by_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Alerts in id order, one page at a time; pass `next_cursor` back as
+    `cursor` (or the last id seen as `after_id`) for the next page.
+    `active` keeps alerts that are (or are not) showing right now, `team_id`
+    those targeting the team, and `created_from`/`created_to` bound
+    `created_at` to [from, to), and `q` those whose title contains it,
+    ignoring case. `fields=summary` returns only ids, titles, severities and
+    times, read as plain columns.
+    """
+    try:
+        after = start_after(cursor, after_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    summary = fields == schemas.AlertFields.SUMMARY
+    statement = alert_list_statement(
+        summary, is_archived=is_archived, severity=severity, active=active, team_id=team_id,
+        created_by_id=created_by_id, created_from=created_from, created_to=created_to, q=q,
+    )
+    page_size = limit or settings.ADMIN_PAGE_SIZE
+
+    def build():
+        result = db.execute(seek(statement, models.Alert.id, page_size, after))
+        rows, next_cursor = finish_page(result.all() if summary else result.scalars().all(), page_size)
+        return alert_list_payload(summary, rows, next_cursor)
+
+    if active is not None:
+        return build() # depends on the clock, which the ETag does not capture
+    return http_cache.cached_response(request, db, versions.ALERTS, build)
+
+def alert_list_statement(
+    summary: bool,
+    is_archived: bool = False,
+    severity: Optional[schemas.AlertSeverity] = None,
+    active: Optional[bool] = None,
+    team_id: Optional[int] = None,
+    created_by_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+):
+    """The filtered select() behind `list_all_alerts`; routes/alerts_async.py awaits the same statement."""
+    statement = select(*SUMMARY_COLUMNS) if summary else select(models.Alert).options(*ALERT_LOADS)
+    statement = statement.where(models.Alert.is_archived == is_archived)
+    if severity:
+        statement = statement.where(models.Alert.severity == severity)
+    if active is not None:
+        is_active = unread_counts.is_active_alert(datetime.utcnow())
+        statement = statement.where(is_active if active else not_(is_active))
+    if team_id is not None:
+        statement = statement.where(models.Alert.target_teams.any(models.Team.id == team_id))
+    if created_by_id is not None:
+        statement = statement.where(models.Alert.created_by_id == created_by_id)
+    if created_from is not None:
+        statement = statement.where(models.Alert.created_at >= created_from)
+    if created_to is not None:
+        statement = statement.where(models.Alert.created_at < created_to)
+    if q:
+        statement = statement.where(models.Alert.title.icontains(q, autoescape=True))
+    return statement
 
-@router.post("/trigger-reminders", tags=["Admin Actions"])
-def trigger_reminder_processing(db: Session = Depends(get_db)):
+def alert_list_payload(summary: bool, rows: list, next_cursor: Optional[str]):
+    if summary:
+        return {"items": [row._asdict() for row in rows], "next_cursor": next_cursor}
+    return schemas.AlertPage(items=rows, next_cursor=next_cursor)
+
+@router.post("/trigger-reminders", tags=["Admin Actions"], response_model=schemas.ReminderCycle, status_code=202)
+def trigger_reminder_processing(request: Request):
     """
-    Manually triggers the reminder processing logic.
-    In production, this would be replaced by a scheduled cron job.
+    Queues a reminder cycle on the background scheduler and returns its id
+    immediately. Cycles also run on their own every REMINDER_INTERVAL_SECONDS.
     """
-    result = reminders.process_reminders(db)
-    return result
+    cycle = request.app.state.reminder_scheduler.enqueue()
+    return cycle.model_copy(update={"message": cycle.message or "Reminder cycle queued."})
+
+@router.get("/reminder-cycles/{cycle_id}", tags=["Admin Actions"], response_model=schemas.ReminderCycle)
+def get_reminder_cycle(cycle_id: str, request: Request):
+    """A queued, running or finished cycle; cycles are stored in the database, so any API worker can answer."""
+    cycle = request.app.state.reminder_scheduler.get_cycle(cycle_id)
+    if cycle is None:
+        raise HTTPException(status_code=404, detail="Reminder cycle not found")
+    return cycle
 
-router.get("/{alert_id}", response_model=schemas.Alert)
+@router.get("/{alert_id}", response_model=schemas.Alert)
 def get_alert_by_id(alert_id: int, db: Session = Depends(get_db)):
-    db_alert = db.query(models.Alert).filter(models.Alert.id == alert_id).first()
+    db_alert = db.query(models.Alert).options(*ALERT_LOADS).filter(models.Alert.id == alert_id).first()
     if db_alert is None:
         raise HTTPException(status_code=404, detail="Alert not found")
     return db_alert
@@ -65,13 +176,32 @@ def get_alert_by_id(alert_id: int, db: Session = Depends(get_db)):
 @router.put("/{alert_id}", response_model=schemas.Alert)
 def update_alert(alert_id: int, alert_update: schemas.AlertUpdate, db: Session = Depends(get_db)):
     db_alert = get_alert_by_id(alert_id, db) # Reuse the get function to check existence
+    inbox.invalidate_alert(db, db_alert) # Whoever could see it before the change
+    audience_before = realtime.audience_of(db, db_alert)
+    unread_counts.alert_changed(db, db_alert)
+    old_severity = db_alert.severity
 
     update_data = alert_update.dict(exclude_unset=True)
+    target_user_ids = update_data.pop("target_user_ids", None)
+    target_team_ids = update_data.pop("target_team_ids", None)
     for key, value in update_data.items():
         setattr(db_alert, key, value)
-        
+
+    if target_user_ids is not None:
+        db_alert.target_users = db.query(models.User).filter(models.User.id.in_(target_user_ids)).all()
+    if target_team_ids is not None:
+        db_alert.target_teams = db.query(models.Team).filter(models.Team.id.in_(target_team_ids)).all()
+    db.flush()
+    if target_user_ids is not None or target_team_ids is not None or "is_org_wide" in update_data:
+        audience.rebuild_alert_audience(db, [alert_id])
+    unread_counts.alert_changed(db, db_alert)
+    rollups.alert_severity_changed(db, old_severity, db_alert.severity)
+    versions.bump(db, versions.ALERTS, versions.ANALYTICS) # the dashboard shows alert titles
+
     db.commit()
     db.refresh(db_alert)
+    inbox.invalidate_alert(db, db_alert) # and whoever can see it now
+    realtime.alert_changed(db, db_alert, "alert.updated", audience_before)
     return db_alert
 
 @router.delete("/{alert_id}", status_code=204)
@@ -81,21 +211,25 @@ def archive_alert(alert_id: int, db: Session = Depends(get_db)):
     """
     db_alert = get_alert_by_id(alert_id, db)
     db_alert.is_archived = True
+    unread_counts.alert_changed(db, db_alert)
+    versions.bump(db, versions.ALERTS)
     db.commit()
+    inbox.invalidate_alert(db, db_alert)
+    realtime.alert_changed(db, db_alert, "alert.archived")
     return
 
-@router.get("/", response_model=List[schemas.Alert])
-def list_all_alerts(
-    severity: Optional[schemas.AlertSeverity] = None,
-    is_archived: bool = False,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
-):
-    query = db.query(models.Alert).filter(models.Alert.is_archived == is_archived)
-    
-    if severity:
-        query = query.filter(models.Alert.severity == severity)
-        
-    alerts = query.offset(skip).limit(limit).all()
-    return alerts
\ No newline at end of file
+@router.post("/{alert_id}/acknowledge-for", response_model=schemas.BulkStatusResult)
+def acknowledge_alert_for(alert_id: int, request: schemas.AlertAcknowledgeFor, db: Session = Depends(get_db)):
+    """
+    Applies a status (read, snooze or unsnooze) to an alert on behalf of a
+    whole team or of its entire audience, in one statement.
+    """
+    db_alert = get_alert_by_id(alert_id, db)
+    pairs = statuses.audience_pairs_for_alert(alert_id, team_id=request.team_id)
+    updated = statuses.bulk_set(db, pairs, request.action)
+
+    unread_counts.users_changed(db, select(pairs.subquery().c.user_id))
+    db.commit()
+    inbox.invalidate_alert(db, db_alert)
+    realtime.alert_changed(db, db_alert, "status.changed")
+    return {"updated": updated}
@@ -0,0 +1,99 @@
+"""
+Async versions of the admin alert routes, mounted instead of routes/alerts.py
+when ASYNC_DB_ENABLED is set.
+
+Most handlers run their sync counterpart through AsyncSession.run_sync, so
+the two paths cannot drift. run_sync only awaits the driver's I/O: the
+handler itself (ORM row processing, building and validating the response)
+runs on the event loop thread and blocks every other request of the worker,
+WebSocket and SSE streams included, for its CPU time. That is short for
+single alerts and writes.
+
+The list, which returns pages of up to 500 alerts, is native instead: it
+awaits the same select() as the sync route with session.execute, and
+validates and encodes the page in a worker thread (http_cache.encode_in_thread).
+Row processing still runs on the loop, and the worker thread still needs the
+GIL, so a large page slows the loop down rather than stopping it.
+"""
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
+
+from services import models, schemas
+from services.database import get_async_db
+from core import http_cache, versions
+from routes import alerts
+from utils.pagination import finish_page, seek, start_after
+from utils.settings import settings
+
+router = APIRouter(
+    prefix="/admin/alerts",
+    tags=["Admin Alerts"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.post("/", response_model=schemas.Alert, status_code=201)
+async def create_alert(alert: schemas.AlertCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: schemas.Alert.model_validate(alerts.create_alert(alert, db=session)))
+
+@router.get("/", response_model=Union[schemas.AlertPage, schemas.AlertSummaryPage])
+async def list_all_alerts(
+    request: Request,
+    fields: schemas.AlertFields = schemas.AlertFields.FULL,
+    severity: Optional[schemas.AlertSeverity] = None,
+    is_archived: bool = False,
+    active: Optional[bool] = None,
+    team_id: Optional[int] = None,
+    created_by_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        after = start_after(cursor, after_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    summary = fields == schemas.AlertFields.SUMMARY
+    statement = alerts.alert_list_statement(
+        summary, is_archived=is_archived, severity=severity, active=active, team_id=team_id,
+        created_by_id=created_by_id, created_from=created_from, created_to=created_to, q=q,
+    )
+    page_size = limit or settings.ADMIN_PAGE_SIZE
+
+    async def build() -> bytes:
+        result = await db.execute(seek(statement, models.Alert.id, page_size, after))
+        rows, next_cursor = finish_page(result.all() if summary else result.scalars().all(), page_size)
+        return await http_cache.encode_in_thread(lambda: alerts.alert_list_payload(summary, rows, next_cursor))
+
+    if active is not None:
+        return Response(content=await build(), media_type="application/json")
+    return await http_cache.cached_response_async(request, db, versions.ALERTS, build)
+
+@router.post("/trigger-reminders", tags=["Admin Actions"], response_model=schemas.ReminderCycle, status_code=202)
+async def trigger_reminder_processing(request: Request):
+    return alerts.trigger_reminder_processing(request)
+
+@router.get("/reminder-cycles/{cycle_id}", tags=["Admin Actions"], response_model=schemas.ReminderCycle)
+async def get_reminder_cycle(cycle_id: str, request: Request):
+    return alerts.get_reminder_cycle(cycle_id, request)
+
+@router.get("/{alert_id}", response_model=schemas.Alert)
+async def get_alert_by_id(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: schemas.Alert.model_validate(alerts.get_alert_by_id(alert_id, db=session)))
+
+@router.put("/{alert_id}", response_model=schemas.Alert)
+async def update_alert(alert_id: int, alert_update: schemas.AlertUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: schemas.Alert.model_validate(alerts.update_alert(alert_id, alert_update, db=session)))
+
+@router.delete("/{alert_id}", status_code=204)
+async def archive_alert(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: alerts.archive_alert(alert_id, db=session))
+
+@router.post("/{alert_id}/acknowledge-for", response_model=schemas.BulkStatusResult)
+async def acknowledge_alert_for(alert_id: int, request: schemas.AlertAcknowledgeFor, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: alerts.acknowledge_alert_for(alert_id, request, db=session))
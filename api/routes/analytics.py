@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func, literal, tuple_
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 from services import models, schemas
 from services.database import get_db
+from core import http_cache, timeseries, versions
+from utils.pagination import decode_cursor, encode_cursor
+from utils.settings import settings
 
 router = APIRouter(
     prefix="/analytics",
@@ -13,39 +16,27 @@ router = APIRouter(
 )
 
 @router.get("/dashboard", response_model=schemas.AnalyticsDashboard)
-def get_analytics_dashboard(db: Session = Depends(get_db)):
+def get_analytics_dashboard(request: Request, db: Session = Depends(get_db)):
     """
     Provides a dashboard with system-wide metrics on alert performance.
+    Reads the rollup tables maintained by core/rollups.py, so its cost grows
+    with the number of alerts, not with the number of deliveries. Supports
+    If-None-Match; unchanged dashboards are answered with 304.
     """
-    now = datetime.utcnow()
+    return http_cache.cached_response(request, db, versions.ANALYTICS, lambda: _build_dashboard(db))
 
-    # --- 1. Overall Stats ---
-    total_alerts = db.query(func.count(models.Alert.id)).scalar()
-    total_deliveries = db.query(func.count(models.NotificationDelivery.id)).scalar()
-    
-    total_reads_query = db.query(func.count(models.UserAlertStatus.id)).filter(
-        models.UserAlertStatus.status == models.UserAlertStatusEnum.READ
-    ).scalar()
-    
-    active_snoozes_query = db.query(func.count(models.UserAlertStatus.id)).filter(
-        models.UserAlertStatus.snoozed_until > now
-    ).scalar()
+def _build_dashboard(db: Session) -> schemas.AnalyticsDashboard:
+    now = datetime.utcnow()
 
-    overall_stats = schemas.OverallStats(
-        total_alerts_created=total_alerts,
-        total_notifications_sent=total_deliveries,
-        total_reads=total_reads_query,
-        active_snoozes=active_snoozes_query,
-    )
+    # --- 1. Severity Breakdown ---
+    severity_rows = db.query(
+        models.SeverityRollup.severity,
+        models.SeverityRollup.alert_count,
+        models.SeverityRollup.delivered_count,
+    ).all()
 
-    # --- 2. Severity Breakdown ---
-    severity_counts_query = db.query(
-        models.Alert.severity,
-        func.count(models.Alert.id)
-    ).group_by(models.Alert.severity).all()
-    
     # Convert list of tuples to a dictionary for easy access
-    severity_map: Dict[str, int] = {sev.name: count for sev, count in severity_counts_query}
+    severity_map: Dict[str, int] = {row.severity.name: row.alert_count for row in severity_rows}
 
     severity_breakdown = schemas.SeverityBreakdown(
         critical=severity_map.get("CRITICAL", 0),
@@ -53,48 +44,124 @@ def get_analytics_dashboard(db: Session = Depends(get_db)):
         info=severity_map.get("INFO", 0),
     )
 
-    # --- 3. Per-Alert Performance ---
-    # This is a more complex query joining alerts with aggregated stats
-    
-    # Subquery for notification counts per alert
-    delivery_counts = db.query(
-        models.NotificationDelivery.alert_id,
-        func.count(models.NotificationDelivery.id).label("delivery_count")
-    ).group_by(models.NotificationDelivery.alert_id).subquery()
-
-    # Subquery for read and snooze counts per alert
-    status_counts = db.query(
+    # --- 2. Overall Stats ---
+    total_reads = db.query(func.coalesce(func.sum(models.AlertRollup.read_count), 0)).scalar()
+
+    # Snoozes depend on the clock; this is a range scan of the snoozed_until index
+    active_snoozes = db.query(func.count()).select_from(models.UserAlertStatus).filter(
+        models.UserAlertStatus.snoozed_until > now
+    ).scalar()
+
+    overall_stats = schemas.OverallStats(
+        total_alerts_created=sum(row.alert_count for row in severity_rows),
+        total_notifications_sent=sum(row.delivered_count for row in severity_rows),
+        total_reads=total_reads,
+        active_snoozes=active_snoozes,
+    )
+
+    # --- 3. Per-Alert Performance (first page) ---
+    alerts_performance = get_alerts_performance(sort="alert_id", order="asc", limit=settings.ANALYTICS_PAGE_SIZE, cursor=None, db=db)
+
+    # --- Assemble final dashboard object ---
+    return schemas.AnalyticsDashboard(
+        overall_stats=overall_stats,
+        severity_breakdown=severity_breakdown,
+        alerts_performance=alerts_performance.items,
+        alerts_performance_next_cursor=alerts_performance.next_cursor,
+    )
+
+PERFORMANCE_SORT_KEYS = ("alert_id", "notifications_sent", "read_count", "snooze_count")
+
+@router.get("/alerts-performance", response_model=schemas.AlertPerformancePage)
+def get_alerts_performance(
+    sort: str = Query("alert_id", enum=list(PERFORMANCE_SORT_KEYS)),
+    order: str = Query("asc", enum=["asc", "desc"]),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Per-alert deliveries, reads and active snoozes, one page at a time.
+    Keyset-paginated on (sort key, alert id): pass `next_cursor` back as `cursor`.
+    """
+    now = datetime.utcnow()
+    limit = limit or settings.ANALYTICS_PAGE_SIZE
+
+    # Active snoozes per alert, through the snoozed_until index
+    snooze_counts = db.query(
         models.UserAlertStatus.alert_id,
-        func.count(case((models.UserAlertStatus.status == models.UserAlertStatusEnum.READ, 1))).label("read_count"),
-        func.count(case((models.UserAlertStatus.snoozed_until > now, 1))).label("snooze_count")
-    ).group_by(models.UserAlertStatus.alert_id).subquery()
+        func.count().label("snooze_count")
+    ).filter(models.UserAlertStatus.snoozed_until > now).group_by(models.UserAlertStatus.alert_id).subquery()
 
-    # Main query to assemble the performance data
-    alerts_performance_query = db.query(
+    sort_columns = {
+        "alert_id": models.Alert.id,
+        "notifications_sent": func.coalesce(models.AlertRollup.delivered_count, 0),
+        "read_count": func.coalesce(models.AlertRollup.read_count, 0),
+        "snooze_count": func.coalesce(snooze_counts.c.snooze_count, 0),
+    }
+    query = db.query(
         models.Alert.id,
         models.Alert.title,
-        func.coalesce(delivery_counts.c.delivery_count, 0).label("notifications_sent"),
-        func.coalesce(status_counts.c.read_count, 0).label("read_count"),
-        func.coalesce(status_counts.c.snooze_count, 0).label("snooze_count")
+        sort_columns["notifications_sent"].label("notifications_sent"),
+        sort_columns["read_count"].label("read_count"),
+        sort_columns["snooze_count"].label("snooze_count")
     ).outerjoin(
-        delivery_counts, models.Alert.id == delivery_counts.c.alert_id
+        models.AlertRollup, models.Alert.id == models.AlertRollup.alert_id
     ).outerjoin(
-        status_counts, models.Alert.id == status_counts.c.alert_id
-    ).order_by(models.Alert.id).all()
-
-    alerts_performance = [
-        schemas.AlertPerformance(
-            alert_id=row.id,
-            alert_title=row.title,
-            notifications_sent=row.notifications_sent,
-            read_count=row.read_count,
-            snooze_count=row.snooze_count,
-        ) for row in alerts_performance_query
-    ]
+        snooze_counts, models.Alert.id == snooze_counts.c.alert_id
+    )
 
-    # --- Assemble final dashboard object ---
-    return schemas.AnalyticsDashboard(
-        overall_stats=overall_stats,
-        severity_breakdown=severity_breakdown,
-        alerts_performance=alerts_performance
-    )
\ No newline at end of file
+    sort_column = sort_columns[sort]
+    key = tuple_(sort_column, models.Alert.id)
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = tuple_(literal(last_value), literal(last_id))
+        query = query.filter(key < after if order == "desc" else key > after)
+
+    if order == "desc":
+        query = query.order_by(sort_column.desc(), models.Alert.id.desc())
+    else:
+        query = query.order_by(sort_column, models.Alert.id)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.id if sort == "alert_id" else getattr(last, sort), last.id])
+
+    return schemas.AlertPerformancePage(
+        items=[
+            schemas.AlertPerformance(
+                alert_id=row.id,
+                alert_title=row.title,
+                notifications_sent=row.notifications_sent,
+                read_count=row.read_count,
+                snooze_count=row.snooze_count,
+            ) for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
+
+@router.get("/timeseries", response_model=schemas.Timeseries)
+def get_timeseries(
+    metric: schemas.TimeseriesMetric,
+    bucket: schemas.TimeseriesBucket = schemas.TimeseriesBucket.HOUR,
+    from_time: Optional[datetime] = Query(None, alias="from"),
+    to_time: Optional[datetime] = Query(None, alias="to"),
+    alert_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Deliveries, reads or snoozes per minute, hour or day, bucketed in SQL.
+    Long ranges are downsampled to at most ANALYTICS_MAX_POINTS buckets;
+    `bucket_seconds` in the response gives the width actually used.
+    """
+    try:
+        return timeseries.series(db, metric, bucket, start=from_time, end=to_time, alert_id=alert_id, team_id=team_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Async version of the analytics routes; see routes/alerts_async.py. The
+handlers go through run_sync, so assembling the dashboard runs on the event
+loop thread; its body is cached per ETag, which keeps that to once per change.
+"""
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Optional
+
+from services import schemas
+from services.database import get_async_db
+from routes import analytics
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+)
+
+@router.get("/dashboard", response_model=schemas.AnalyticsDashboard)
+async def get_analytics_dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: analytics.get_analytics_dashboard(request, db=session))
+
+@router.get("/alerts-performance", response_model=schemas.AlertPerformancePage)
+async def get_alerts_performance(
+    sort: str = Query("alert_id", enum=list(analytics.PERFORMANCE_SORT_KEYS)),
+    order: str = Query("asc", enum=["asc", "desc"]),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(lambda session: analytics.get_alerts_performance(
+        sort=sort, order=order, limit=limit, cursor=cursor, db=session
+    ))
+
+@router.get("/timeseries", response_model=schemas.Timeseries)
+async def get_timeseries(
+    metric: schemas.TimeseriesMetric,
+    bucket: schemas.TimeseriesBucket = schemas.TimeseriesBucket.HOUR,
+    from_time: Optional[datetime] = Query(None, alias="from"),
+    to_time: Optional[datetime] = Query(None, alias="to"),
+    alert_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(lambda session: analytics.get_timeseries(
+        metric, bucket=bucket, from_time=from_time, to_time=to_time, alert_id=alert_id, team_id=team_id, db=session
+    ))
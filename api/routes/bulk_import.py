@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from services import schemas
+from core import bulk_import
+
+router = APIRouter(prefix="/admin/import", tags=["Admin Import"])
+
+@router.post("", response_model=schemas.ImportReport)
+async def import_records(request: Request, kind: schemas.ImportKind, format: Optional[schemas.ImportFormat] = None):
+    """
+    Imports the CSV or JSONL body as `kind` rows; see core/bulk_import.py for
+    the columns. The format comes from `format`, else from the Content-Type
+    (`application/x-ndjson` or `application/jsonl` for JSONL, CSV otherwise).
+    The body is read as it streams in and written in chunks, each committed
+    on its own, so rows before a failure stay imported. Rows that could not
+    be imported are listed in the report with their line.
+    """
+    importer = bulk_import.Importer(kind, format or bulk_import.format_for(request.headers.get("content-type")))
+    async for data in request.stream():
+        if data:
+            await run_in_threadpool(importer.feed, data)
+    return await run_in_threadpool(importer.finish)
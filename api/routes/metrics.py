@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from typing import Dict
+
+from services import schemas
+from services.database import get_db
+from core import http_cache, inbox, outbox, realtime
+from services.pool_metrics import all_pool_snapshots
+
+router = APIRouter(prefix="/admin/metrics", tags=["Admin Metrics"])
+
+@router.get("/cache", response_model=Dict[str, schemas.CacheStats])
+def get_cache_metrics():
+    """Hit rate and occupancy of the in-process caches, for sizing them."""
+    return {"inbox": inbox.inbox_cache.stats(), "responses": http_cache.response_cache.stats()}
+
+
+@router.get("/db-pool", response_model=Dict[str, schemas.PoolStats])
+def get_db_pool_metrics():
+    """Checked-out connections, overflow, checkout wait times and timeouts per engine."""
+    return all_pool_snapshots()
+
+@router.get("/streams", response_model=schemas.StreamStats)
+def get_stream_metrics():
+    """Open /users/{user_id}/stream connections in this worker and the events sent to them."""
+    return realtime.hub.stats()
+
+@router.get("/outbox", response_model=Dict[str, schemas.OutboxStats])
+def get_outbox_metrics(db: Session = Depends(get_db)):
+    """Queued, in-flight and dead delivery jobs per channel."""
+    return outbox.stats(db)
@@ -0,0 +1,89 @@
+"""
+Live inbox events for one user, over a WebSocket or Server-Sent Events at
+the same path. Events only say what changed (see core/realtime.py); clients
+reload GET /users/{user_id}/alerts when one arrives. Neither transport holds
+a database connection while it is open, so idle streams cost a task and a
+small buffer each.
+
+WebSocket clients may send "ping" and get a "pong" event back. Both
+transports send a heartbeat every STREAM_HEARTBEAT_SECONDS without traffic.
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from services import models
+from services.database import SessionLocal
+from core import realtime
+from utils.settings import settings
+
+router = APIRouter(
+    prefix="/users",
+    tags=["End-User Alerts"],
+)
+
+def _user_exists(user_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.query(models.User.id).filter(models.User.id == user_id).first() is not None
+
+async def _read_client(websocket: WebSocket, subscriber: realtime.Subscriber):
+    try:
+        while True:
+            if await websocket.receive_text() == "ping":
+                subscriber.push({"type": "pong"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscriber.close()
+
+@router.websocket("/{user_id}/stream")
+async def stream_websocket(websocket: WebSocket, user_id: int):
+    if not await run_in_threadpool(_user_exists, user_id):
+        await websocket.close(code=4404, reason="User not found")
+        return
+    await websocket.accept()
+
+    subscriber = realtime.hub.subscribe(user_id)
+    reader = asyncio.create_task(_read_client(websocket, subscriber))
+    try:
+        while not subscriber.closed:
+            events = await subscriber.next_events(settings.STREAM_HEARTBEAT_SECONDS)
+            if subscriber.closed:
+                break
+            for event in events or [realtime.PING]:
+                await websocket.send_text(json.dumps(event))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        realtime.hub.unsubscribe(subscriber)
+        if websocket.client_state.name == "CONNECTED":
+            await websocket.close()
+
+@router.get("/{user_id}/stream")
+async def stream_events(user_id: int, request: Request):
+    """Server-Sent Events; each event's name is its type and its data the JSON event."""
+    if not await run_in_threadpool(_user_exists, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def events():
+        subscriber = realtime.hub.subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            while not subscriber.closed and not await request.is_disconnected():
+                batch = await subscriber.next_events(settings.STREAM_HEARTBEAT_SECONDS)
+                if not batch:
+                    yield ": ping\n\n"
+                for event in batch:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            realtime.hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # no proxy buffering either
+    )
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 
 from services import models, schemas
 from services.database import get_db
+from core import http_cache, versions
+from utils.pagination import id_page, start_after
+from utils.settings import settings
 
 router = APIRouter(prefix="/admin/teams", tags=["Admin Team Management"])
 
@@ -11,10 +14,30 @@ router = APIRouter(prefix="/admin/teams", tags=["Admin Team Management"])
 def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
     db_team = models.Team(**team.dict())
     db.add(db_team)
+    versions.bump(db, versions.TEAMS)
     db.commit()
     db.refresh(db_team)
     return db_team
 
-@router.get("/", response_model=List[schemas.Team])
-def list_teams(db: Session = Depends(get_db)):
-    return db.query(models.Team).all()
\ No newline at end of file
+@router.get("/", response_model=schemas.TeamPage)
+def list_teams(
+    request: Request,
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Teams in id order, one page at a time; see `list_users` for the cursor. `q` matches names, ignoring case."""
+    try:
+        after = start_after(cursor, after_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def build():
+        query = db.query(models.Team)
+        if q:
+            query = query.filter(models.Team.name.icontains(q, autoescape=True))
+        teams, next_cursor = id_page(query, models.Team.id, limit or settings.ADMIN_PAGE_SIZE, after)
+        return schemas.TeamPage(items=teams, next_cursor=next_cursor)
+    return http_cache.cached_response(request, db, versions.TEAMS, build)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+One-request page loads for the Streamlit front end. Each page gets what it
+renders on load in a single response, built with a fixed number of queries
+however many rows it holds; follow-up interactions (other filters, later
+pages) still use the regular endpoints.
+"""
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from services import models, schemas
+from services.database import get_db
+from core import http_cache, versions
+from routes import users
+from routes.alerts import ALERT_LOADS, SUMMARY_COLUMNS
+from utils.pagination import id_page
+from utils.settings import settings
+
+router = APIRouter(prefix="/ui", tags=["UI"])
+
+PICKER_LIMIT = 500 # options offered in a selector before it needs a search, like the list endpoints' largest page
+
+def _picker_options(query, id_column):
+    """The first PICKER_LIMIT rows and whether there are more; the pickers search the list endpoints (`q`) for the rest."""
+    rows, next_cursor = id_page(query, id_column, PICKER_LIMIT)
+    return rows, next_cursor is not None
+
+def _active_users(db: Session):
+    return _picker_options(db.query(models.User).filter(models.User.is_active == True), models.User.id)
+
+def _admin_page(db: Session) -> schemas.UIBootstrap:
+    open_alerts = db.query(models.Alert).options(*ALERT_LOADS).filter(models.Alert.is_archived == False)
+    alerts, next_cursor = id_page(open_alerts, models.Alert.id, settings.ADMIN_PAGE_SIZE, None)
+    users, more_users = _active_users(db)
+    teams, more_teams = _picker_options(db.query(models.Team), models.Team.id)
+    choices, more_choices = _picker_options(
+        db.query(*SUMMARY_COLUMNS).filter(models.Alert.is_archived == False), models.Alert.id,
+    )
+    return schemas.UIBootstrap(
+        page=schemas.UIPage.ADMIN,
+        users=users,
+        more_users=more_users,
+        teams=teams,
+        more_teams=more_teams,
+        alerts=schemas.AlertPage(items=alerts, next_cursor=next_cursor),
+        alert_choices=[row._asdict() for row in choices],
+        more_alert_choices=more_choices,
+    )
+
+@router.get("/bootstrap", response_model=schemas.UIBootstrap)
+def bootstrap(request: Request, page: schemas.UIPage, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """
+    - `admin`: active users and teams for the pickers, the first page of
+      non-archived alerts and summaries of them for the edit picker;
+      cached and revalidated like the lists it combines.
+    - `user`: active users for the picker and the inbox of `user_id`, or
+      of the first active user when it is omitted.
+
+    Picker lists stop at PICKER_LIMIT entries; `more_*` is then true and
+    the front end searches the list endpoints for the others.
+    """
+    if page == schemas.UIPage.ADMIN:
+        return http_cache.cached_response(
+            request, db, (versions.USERS, versions.TEAMS, versions.ALERTS), lambda: _admin_page(db),
+        )
+
+    active_users, more_users = _active_users(db)
+    if user_id is None and active_users:
+        user_id = active_users[0].id
+    return schemas.UIBootstrap(
+        page=page,
+        users=active_users,
+        more_users=more_users,
+        user_id=user_id,
+        inbox=users.get_user_alerts(user_id, db=db) if user_id is not None else [],
+    )
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Optional
 
 from services import models, schemas
 from services.database import get_db
+from core import audience, http_cache, inbox, realtime, unread_counts, versions
+from utils.pagination import id_page, start_after
+from utils.settings import settings
 
 router = APIRouter(prefix="/admin/users", tags=["Admin User Management"])
 
@@ -11,10 +15,69 @@ router = APIRouter(prefix="/admin/users", tags=["Admin User Management"])
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = models.User(email=user.email, full_name=user.full_name, team_id=user.team_id)
     db.add(db_user)
+    db.flush()
+    audience.sync_user_audience(db, db_user.id)
+    versions.bump(db, versions.USERS)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-@router.get("/", response_model=List[schemas.User])
-def list_users(db: Session = Depends(get_db)):
-    return db.query(models.User).all()
\ No newline at end of file
+@router.put("/{user_id}", response_model=schemas.User)
+def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Depends(get_db)):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    update_data = user_update.dict(exclude_unset=True)
+    for key, value in update_data.items():
+        setattr(db_user, key, value)
+
+    if "team_id" in update_data:
+        # Team-targeted alerts follow the user to their new team
+        db.flush()
+        audience.sync_user_audience(db, user_id)
+        unread_counts.user_changed(db, user_id)
+
+    versions.bump(db, versions.USERS, versions.ALERTS) # alert listings embed their creator
+
+    db.commit()
+    db.refresh(db_user)
+    inbox.invalidate_user(user_id)
+    if "team_id" in update_data:
+        realtime.inbox_changed(user_id)
+    return db_user
+
+@router.get("/", response_model=schemas.UserPage)
+def list_users(
+    request: Request,
+    team_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    q: Optional[str] = None,
+    after_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Users in id order, one page at a time. Pass `next_cursor` back as `cursor`
+    (or the last id seen as `after_id`) for the next page. `q` keeps users
+    whose email or name contains it, ignoring case.
+    """
+    try:
+        after = start_after(cursor, after_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def build():
+        query = db.query(models.User)
+        if team_id is not None:
+            query = query.filter(models.User.team_id == team_id)
+        if is_active is not None:
+            query = query.filter(models.User.is_active == is_active)
+        if q:
+            query = query.filter(or_(
+                models.User.email.icontains(q, autoescape=True), models.User.full_name.icontains(q, autoescape=True),
+            ))
+        users, next_cursor = id_page(query, models.User.id, limit or settings.ADMIN_PAGE_SIZE, after)
+        return schemas.UserPage(items=users, next_cursor=next_cursor)
+    return http_cache.cached_response(request, db, versions.USERS, build)
\ No newline at end of file
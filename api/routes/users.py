@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from services import models, schemas
 from services.database import get_db
+from core import inbox, realtime, statuses, unread_counts
 
 router = APIRouter(
     prefix="/users",
@@ -18,83 +18,70 @@ def get_user_alerts(user_id: int, db: Session = Depends(get_db)):
     Get all active, non-expired, non-archived alerts for a specific user.
     This is the core logic for the user's dashboard.
     """
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    cached = inbox.inbox_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    response = inbox.load_inbox(db, user_id)
+    if not response and not db.query(models.User.id).filter(models.User.id == user_id).first():
         raise HTTPException(status_code=404, detail="User not found")
 
-    now = datetime.utcnow()
-    
-    # Find all relevant alerts for the user
-    alerts_query = db.query(models.Alert).filter(
-        models.Alert.is_archived == False,
-        models.Alert.start_time <= now,
-        or_(models.Alert.expiry_time == None, models.Alert.expiry_time > now)
-    ).filter(
-        or_(
-            models.Alert.is_org_wide == True,
-            models.Alert.target_teams.any(id=user.team_id),
-            models.Alert.target_users.any(id=user.id)
-        )
-    )
+    inbox.inbox_cache.set(user_id, response)
+    return response
 
-    alerts = alerts_query.all()
-    
-    # Prepare the response with personalized status
-    response = []
-    for alert in alerts:
-        status_obj = db.query(models.UserAlertStatus).filter_by(user_id=user_id, alert_id=alert.id).first()
-        if not status_obj:
-            # If no status exists, it's implicitly UNREAD
-            status_obj = models.UserAlertStatus(status=schemas.UserAlertStatusEnum.UNREAD, snoozed_until=None)
+@router.get("/unread-counts", response_model=List[schemas.UnreadCount])
+def get_unread_counts(user_ids: List[int] = Query(...), db: Session = Depends(get_db)):
+    """Badge counters for many users at once; unknown user ids are left out."""
+    found = unread_counts.get_unread_counts(db, user_ids)
+    return [{"user_id": user_id, "unread_count": found[user_id]} for user_id in user_ids if user_id in found]
 
-        response.append({
-            "id": alert.id,
-            "title": alert.title,
-            "message_body": alert.message_body,
-            "severity": alert.severity,
-            "start_time": alert.start_time,
-            "personal_status": {
-                "status": status_obj.status,
-                "snoozed_until": status_obj.snoozed_until,
-            }
-        })
-    return response
+@router.get("/{user_id}/alerts/unread-count", response_model=schemas.UnreadCount)
+def get_unread_count(user_id: int, db: Session = Depends(get_db)):
+    """Number of active alerts the user has neither read nor snoozed. Meant for badge polling."""
+    found = unread_counts.get_unread_counts(db, [user_id])
+    if user_id not in found:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"user_id": user_id, "unread_count": found[user_id]}
 
 @router.post("/{user_id}/alerts/{alert_id}/snooze", status_code=204)
 def snooze_alert(user_id: int, alert_id: int, db: Session = Depends(get_db)):
     """Snooze an alert for the current day."""
-    status_obj = db.query(models.UserAlertStatus).filter_by(user_id=user_id, alert_id=alert_id).first()
-    
     # Snooze until the end of the current day (in UTC)
-    end_of_day = datetime.utcnow().replace(hour=23, minute=59, second=59, microsecond=999999)
+    now = datetime.utcnow()
+    end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+    if statuses.set_status(db, user_id, alert_id, {"snoozed_until": end_of_day}, now=now):
+        unread_counts.alert_cleared(db, user_id, alert_id, until=end_of_day)
 
-    if status_obj:
-        status_obj.snoozed_until = end_of_day
-    else:
-        status_obj = models.UserAlertStatus(
-            user_id=user_id, 
-            alert_id=alert_id,
-            snoozed_until=end_of_day
-        )
-        db.add(status_obj)
-    
     db.commit()
+    inbox.invalidate_user(user_id)
+    realtime.status_changed(user_id, alert_id)
     return
 
 @router.post("/{user_id}/alerts/{alert_id}/read", status_code=204)
 def mark_alert_as_read(user_id: int, alert_id: int, db: Session = Depends(get_db)):
     """Mark an alert as read."""
-    status_obj = db.query(models.UserAlertStatus).filter_by(user_id=user_id, alert_id=alert_id).first()
-    
-    if status_obj:
-        status_obj.status = schemas.UserAlertStatusEnum.READ
-    else:
-        status_obj = models.UserAlertStatus(
-            user_id=user_id, 
-            alert_id=alert_id,
-            status=schemas.UserAlertStatusEnum.READ
-        )
-        db.add(status_obj)
-        
+    if statuses.set_status(db, user_id, alert_id, {"status": models.UserAlertStatusEnum.READ}):
+        unread_counts.alert_cleared(db, user_id, alert_id)
+
+    db.commit()
+    inbox.invalidate_user(user_id)
+    realtime.status_changed(user_id, alert_id)
+    return
+
+@router.post("/{user_id}/alerts/bulk", response_model=schemas.BulkStatusResult)
+def bulk_update_alerts(user_id: int, update: schemas.UserBulkStatusUpdate, db: Session = Depends(get_db)):
+    """
+    Read, snooze or unsnooze many alerts at once: the listed alert ids, or
+    every alert currently visible to the user. Alerts the user cannot see are skipped.
+    """
+    now = datetime.utcnow()
+    pairs = statuses.visible_pairs_for_user(user_id, now, None if update.all_visible else update.alert_ids)
+    updated = statuses.bulk_set(db, pairs, update.action, now=now)
+    if not updated and not db.query(models.User.id).filter(models.User.id == user_id).first():
+        raise HTTPException(status_code=404, detail="User not found")
+
+    unread_counts.user_changed(db, user_id)
     db.commit()
-    return
\ No newline at end of file
+    inbox.invalidate_user(user_id)
+    realtime.inbox_changed(user_id)
+    return {"updated": updated}
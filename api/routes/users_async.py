@@ -0,0 +1,50 @@
+"""
+Async versions of the end-user routes; see routes/alerts_async.py. The inbox
+is native, like the alert list; the other handlers go through run_sync.
+"""
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from services import models, schemas
+from services.database import get_async_db
+from core import http_cache, inbox
+from routes import users
+
+router = APIRouter(
+    prefix="/users",
+    tags=["End-User Alerts"],
+)
+
+@router.get("/{user_id}/alerts", response_model=List[schemas.UserAlert])
+async def get_user_alerts(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    items = inbox.inbox_cache.get(user_id)
+    if items is None:
+        rows = (await db.execute(inbox.inbox_statement(user_id, datetime.utcnow()))).all()
+        if not rows and await db.scalar(select(models.User.id).where(models.User.id == user_id)) is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        items = inbox.render_inbox(rows)
+        inbox.inbox_cache.set(user_id, items)
+    return Response(content=await http_cache.encode_in_thread(lambda: items), media_type="application/json")
+
+@router.get("/unread-counts", response_model=List[schemas.UnreadCount])
+async def get_unread_counts(user_ids: List[int] = Query(...), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: users.get_unread_counts(user_ids, db=session))
+
+@router.get("/{user_id}/alerts/unread-count", response_model=schemas.UnreadCount)
+async def get_unread_count(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: users.get_unread_count(user_id, db=session))
+
+@router.post("/{user_id}/alerts/{alert_id}/snooze", status_code=204)
+async def snooze_alert(user_id: int, alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: users.snooze_alert(user_id, alert_id, db=session))
+
+@router.post("/{user_id}/alerts/{alert_id}/read", status_code=204)
+async def mark_alert_as_read(user_id: int, alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    await db.run_sync(lambda session: users.mark_alert_as_read(user_id, alert_id, db=session))
+
+@router.post("/{user_id}/alerts/bulk", response_model=schemas.BulkStatusResult)
+async def bulk_update_alerts(user_id: int, update: schemas.UserBulkStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(lambda session: users.bulk_update_alerts(user_id, update, db=session))
@@ -1,11 +1,31 @@
-from sqlalchemy import create_engine
+import csv
+import io
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from utils.settings import settings
+from services.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, attach_pool_events
 # Replace with your PostgreSQL connection details
 DATABASE_URL = settings.DB_URL
 
-engine = create_engine(DATABASE_URL)
+def pool_options(url: str, poolclass) -> dict:
+    """QueuePool settings from Settings; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool))
+attach_pool_events(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,4 +37,65 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def dialect_insert(db):
+    """The dialect's `insert` construct when it supports ON CONFLICT upserts (PostgreSQL, SQLite), else None."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+def bulk_insert(db, table, rows):
+    """
+    Writes `rows` (dicts with the same keys) to `table` in the caller's
+    transaction: COPY on PostgreSQL (psycopg2), a multi-row INSERT elsewhere.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.driver != "psycopg2":
+        db.execute(insert(table), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row[column] for column in columns)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+# --- Optional async engine (ASYNC_DB_ENABLED) ---
+def to_async_url(url: str) -> str:
+    """Maps a sync SQLAlchemy URL onto its async driver: asyncpg for PostgreSQL, aiosqlite for SQLite."""
+    scheme, _, rest = url.partition("://")
+    backend = scheme.split("+")[0]
+    if backend in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if backend == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    raise ValueError(f"No async driver configured for database URL scheme: {scheme}")
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.ASYNC_DB_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = settings.ASYNC_DB_URL or to_async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool))
+    attach_pool_events(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,178 @@
+"""
+One-shot schema changes for databases created before a model change.
+
+`create_all` only creates missing tables, so changes to tables that already
+exist are applied here. Each migration runs once, in its own transaction, and
+is recorded in `schema_migrations`. Migrations run at API startup, right
+after `create_all`.
+
+Usage (from the api/ directory):
+    python -m services.migrations apply
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from services import models, partitions
+from services.database import engine
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def _create_index(conn: Connection, table, name: str):
+    next(index for index in table.indexes if index.name == name).create(conn, checkfirst=True)
+
+def dedupe_user_alert_status(conn: Connection):
+    """
+    Merges duplicate (user_id, alert_id) status rows into the newest one, then
+    adds the unique index. A merged row is READ if any duplicate was, and keeps
+    the latest snooze.
+    """
+    status = models.UserAlertStatus.__table__
+    read = models.UserAlertStatusEnum.READ
+    duplicates = conn.execute(
+        select(
+            status.c.user_id,
+            status.c.alert_id,
+            func.max(status.c.id),
+            func.max(case((status.c.status == read, 1), else_=0)),
+            func.max(status.c.snoozed_until),
+        ).
+        group_by(status.c.user_id, status.c.alert_id).
+        having(func.count() > 1)
+    ).all()
+
+    for user_id, alert_id, keep_id, any_read, snoozed_until in duplicates:
+        values = {"snoozed_until": snoozed_until}
+        if any_read:
+            values["status"] = read
+        conn.execute(update(status).where(status.c.id == keep_id).values(**values))
+        conn.execute(delete(status).where(
+            status.c.user_id == user_id, status.c.alert_id == alert_id, status.c.id != keep_id
+        ))
+
+    if duplicates:
+        # Duplicates were double-counted; counters are recomputed on their next read
+        conn.execute(delete(models.UserUnreadCount.__table__))
+    logger.info("migrations.deduped table=user_alert_status pairs=%s", len(duplicates))
+
+    _create_index(conn, status, "ux_user_alert_status_user_alert")
+
+def index_snoozed_until(conn: Connection):
+    """Active snoozes are counted through this index instead of scanning user_alert_status."""
+    _create_index(conn, models.UserAlertStatus.__table__, "ix_user_alert_status_snoozed_until")
+
+def add_status_timestamps(conn: Connection):
+    """read_at / snoozed_at on user_alert_status and an index on sent_at, for the analytics time series."""
+    status = models.UserAlertStatus.__table__
+    existing = {column["name"] for column in inspect(conn).get_columns(status.name)}
+    for name in ("read_at", "snoozed_at"):
+        if name not in existing:
+            column_type = status.c[name].type.compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {status.name} ADD COLUMN {name} {column_type}"))
+        _create_index(conn, status, f"ix_{status.name}_{name}")
+    _create_index(conn, models.NotificationDelivery.__table__, "ix_notification_deliveries_sent_at")
+
+def add_list_filter_columns(conn: Connection):
+    """alerts.created_at, backfilled from start_time, and indexes for the admin list filters."""
+    alerts = models.Alert.__table__
+    if "created_at" not in {column["name"] for column in inspect(conn).get_columns(alerts.name)}:
+        column_type = alerts.c.created_at.type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {alerts.name} ADD COLUMN created_at {column_type}"))
+    conn.execute(update(alerts).where(alerts.c.created_at == None).values(created_at=alerts.c.start_time))
+    _create_index(conn, alerts, "ix_alerts_created_at")
+    _create_index(conn, alerts, "ix_alerts_created_by_id")
+    _create_index(conn, models.User.__table__, "ix_users_team_id")
+
+def add_delivery_alert_count(conn: Connection):
+    """notification_deliveries.alert_count; rows that predate digests each covered one alert."""
+    deliveries = models.NotificationDelivery.__table__
+    if "alert_count" not in {column["name"] for column in inspect(conn).get_columns(deliveries.name)}:
+        conn.execute(text(f"ALTER TABLE {deliveries.name} ADD COLUMN alert_count INTEGER NOT NULL DEFAULT 1"))
+
+def partition_deliveries(conn: Connection):
+    """
+    On PostgreSQL, rebuilds notification_deliveries as a table partitioned by
+    month on sent_at and copies its rows over. Other databases keep the plain table.
+    """
+    if conn.dialect.name != "postgresql" or partitions.is_partitioned(conn):
+        return
+    table, legacy = partitions.TABLE, f"{partitions.TABLE}_unpartitioned"
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    # LIKE copies the columns and the id sequence default; the key must include sent_at
+    conn.execute(text(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (sent_at)"))
+    conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN sent_at SET NOT NULL"))
+
+    partitions.create_default(conn)
+    oldest = conn.execute(text(f"SELECT min(sent_at) FROM {legacy}")).scalar() or datetime.utcnow()
+    first, current = partitions.month_of(oldest), partitions.month_of(datetime.utcnow())
+    months = (current.year - first.year) * 12 + current.month - first.month + 1
+    partitions.ensure_months(conn, first, months + settings.DELIVERY_PARTITIONS_AHEAD)
+
+    conn.execute(text(
+        f"INSERT INTO {table} (id, alert_id, user_id, channel, sent_at, alert_count) "
+        f"SELECT id, alert_id, user_id, channel, coalesce(sent_at, now()), alert_count FROM {legacy}"
+    ))
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": legacy}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {legacy} CASCADE"))
+
+    # Constraint and index names are free again now that the old table is gone
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, sent_at)"))
+    conn.execute(text(f"ALTER TABLE {table} ADD FOREIGN KEY (alert_id) REFERENCES alerts (id)"))
+    conn.execute(text(f"ALTER TABLE {table} ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+    _create_index(conn, models.NotificationDelivery.__table__, "ix_notification_deliveries_sent_at")
+
+def exclude_dead_jobs_from_outbox_key(conn: Connection):
+    """Rebuilds the outbox's (channel, user, alert) unique index over live jobs only, so dead letters stop absorbing reminders."""
+    index = next(index for index in models.DeliveryJob.__table__.indexes if index.name == "ux_delivery_outbox_target")
+    index.drop(conn, checkfirst=True)
+    index.create(conn)
+
+# Applied in order; never rename or reorder entries that have shipped
+MIGRATIONS = [
+    ("0001_dedupe_user_alert_status", dedupe_user_alert_status),
+    ("0002_index_user_alert_status_snoozed_until", index_snoozed_until),
+    ("0003_add_status_timestamps", add_status_timestamps),
+    ("0004_add_list_filter_columns", add_list_filter_columns),
+    ("0005_add_delivery_alert_count", add_delivery_alert_count),
+    ("0006_partition_notification_deliveries", partition_deliveries),
+    ("0007_exclude_dead_jobs_from_outbox_key", exclude_dead_jobs_from_outbox_key),
+]
+
+def run_migrations(bind: Engine = engine):
+    table = models.schema_migrations
+    table.create(bind, checkfirst=True)
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(table.c.name)).scalars())
+
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        try:
+            with bind.begin() as conn:
+                migrate(conn)
+                conn.execute(insert(table).values(name=name))
+        except IntegrityError:
+            # Another API worker applied it first; our transaction was rolled back
+            logger.info("migrations.skipped name=%s reason=applied_concurrently", name)
+            continue
+        logger.info("migrations.applied name=%s", name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending one-shot schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("apply", help="Apply every migration not yet recorded in schema_migrations")
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations()
+
+if __name__ == "__main__":
+    main()
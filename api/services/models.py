@@ -1,5 +1,5 @@
-from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer, String,
-                        Enum, Table)
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String,
+                        Enum, Table, text)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -28,6 +28,14 @@ alert_target_teams = Table('alert_target_teams', Base.metadata,
     Column('team_id', Integer, ForeignKey('teams.id'), primary_key=True)
 )
 
+# Materialized audience: one row per user an alert is visible to, resolved from
+# target_users and target_teams. Org-wide alerts are not expanded here; they are
+# covered by Alert.is_org_wide instead. Maintained by core/audience.py.
+alert_recipients = Table('alert_recipients', Base.metadata,
+    Column('alert_id', Integer, ForeignKey('alerts.id'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True, index=True)
+)
+
 # --- Core Models ---
 class User(Base):
     __tablename__ = "users"
@@ -35,7 +43,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, index=True)
     is_active = Column(Boolean, default=True)
-    team_id = Column(Integer, ForeignKey("teams.id"))
+    team_id = Column(Integer, ForeignKey("teams.id"), index=True)
 
     team = relationship("Team", back_populates="members")
     created_alerts = relationship("Alert", back_populates="created_by")
@@ -60,11 +68,12 @@ class Alert(Base):
     
     reminder_enabled = Column(Boolean, default=True)
     is_archived = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, index=True)
     
     # Visibility fields
     is_org_wide = Column(Boolean, default=False)
     
-    created_by_id = Column(Integer, ForeignKey("users.id"))
+    created_by_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_by = relationship("User", back_populates="created_alerts")
 
     # Many-to-Many relationships for visibility
@@ -73,24 +82,170 @@ class Alert(Base):
 
     user_statuses = relationship("UserAlertStatus", back_populates="alert", cascade="all, delete-orphan")
 
+    # Read by schemas.Alert; load the relationships with selectinload when listing
+    @property
+    def target_user_ids(self):
+        return [user.id for user in self.target_users]
+
+    @property
+    def target_team_ids(self):
+        return [team.id for team in self.target_teams]
+
 class UserAlertStatus(Base):
-    """Tracks the interaction of a specific user with a specific alert."""
+    """Tracks the interaction of a specific user with a specific alert. One row per (user, alert)."""
     __tablename__ = "user_alert_status"
+    __table_args__ = (
+        Index("ux_user_alert_status_user_alert", "user_id", "alert_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     alert_id = Column(Integer, ForeignKey("alerts.id"), nullable=False)
 
     status = Column(Enum(UserAlertStatusEnum), default=UserAlertStatusEnum.UNREAD, nullable=False)
-    snoozed_until = Column(DateTime(timezone=True), nullable=True)
+    snoozed_until = Column(DateTime(timezone=True), nullable=True, index=True) # active snoozes are counted off this index
+    read_at = Column(DateTime(timezone=True), nullable=True, index=True)     # when the alert was first read
+    snoozed_at = Column(DateTime(timezone=True), nullable=True, index=True)  # when the latest snooze was set
     
     user = relationship("User", back_populates="alert_statuses")
     alert = relationship("Alert", back_populates="user_statuses")
 
 class NotificationDelivery(Base):
-    """A log to track every notification sent. Useful for analytics."""
+    """
+    A log to track every notification sent. Useful for analytics. A digest
+    (alert_count > 1) covers several alerts, listed in
+    notification_delivery_alerts; its alert_id is the first of them. Rows
+    older than DELIVERY_RETENTION_DAYS are removed by core/retention.py; on
+    PostgreSQL the table is partitioned by month on sent_at (migration 0006).
+    """
     __tablename__ = "notification_deliveries"
     id = Column(Integer, primary_key=True, index=True)
     alert_id = Column(Integer, ForeignKey("alerts.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     channel = Column(String, nullable=False) # e.g., "IN_APP", "EMAIL"
-    sent_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    sent_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    alert_count = Column(Integer, nullable=False, default=1, server_default="1")
+
+class NotificationDeliveryAlert(Base):
+    """
+    The alerts one digest delivery covered. delivery_id has no foreign key,
+    as a partitioned notification_deliveries is only unique on (id, sent_at).
+    """
+    __tablename__ = "notification_delivery_alerts"
+    delivery_id = Column(Integer, primary_key=True)
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True, index=True)
+
+class DeliveryJob(Base):
+    """
+    A queued notification for one channel, drained by core/outbox.py. Rows
+    are deleted once delivered; after OUTBOX_MAX_ATTEMPTS failures they stay
+    behind as DEAD letters. One live (not DEAD) row per (channel, user,
+    alert), so reminders for a pair that is still queued are not stacked up,
+    while a dead letter does not block the pair's later reminders.
+    """
+    __tablename__ = "delivery_outbox"
+    __table_args__ = (
+        Index("ux_delivery_outbox_target", "channel", "user_id", "alert_id", unique=True,
+              postgresql_where=text("status != 'DEAD'"), sqlite_where=text("status != 'DEAD'")),
+        Index("ix_delivery_outbox_claim", "channel", "status", "next_attempt_at"),
+    )
+    id = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    alert_id = Column(Integer, ForeignKey("alerts.id"), nullable=False)
+    severity = Column(Enum(AlertSeverity), nullable=False)
+    title = Column(String, nullable=False)
+
+    status = Column(String, default="PENDING", nullable=False) # PENDING, SENDING, DEAD
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(String, nullable=True)
+    claim_token = Column(String, nullable=True, index=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+class SchedulerLock(Base):
+    """A lease-based lock so only one API worker runs a scheduled job at a time."""
+    __tablename__ = "scheduler_locks"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class ReminderCycle(Base):
+    """One reminder cycle run by the API's scheduler; shared by all API workers, so any of them can report on it."""
+    __tablename__ = "reminder_cycles"
+    cycle_id = Column(String, primary_key=True)
+    trigger = Column(String, nullable=False) # manual, interval
+    status = Column(String, default="QUEUED", nullable=False) # QUEUED, RUNNING, COMPLETED, SKIPPED, ABORTED, FAILED
+    owner = Column(String, nullable=False) # the scheduler that queued it, and runs it
+    message = Column(String, nullable=True)
+    queued_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Float, nullable=True)
+
+class ReminderShard(Base):
+    """A slice of the user-id space claimed by one reminder worker during a sharded cycle."""
+    __tablename__ = "reminder_shards"
+    id = Column(Integer, primary_key=True, index=True)
+    cycle_id = Column(String, index=True, nullable=False)
+    user_id_start = Column(Integer, nullable=False) # inclusive
+    user_id_end = Column(Integer, nullable=False)   # exclusive
+    status = Column(String, default="PENDING", nullable=False, index=True) # PENDING, CLAIMED, DONE, FAILED
+    claim_token = Column(String, nullable=True, index=True)
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    sent_count = Column(Integer, default=0) # deliveries queued on the outbox
+
+class UserUnreadCount(Base):
+    """
+    Per-user badge counter: visible, active alerts that are neither read nor
+    currently snoozed. Maintained by core/unread_counts.py; the row is
+    recomputed once `valid_until` passes (an alert starts or expires, a snooze ends).
+    """
+    __tablename__ = "user_unread_counts"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    valid_until = Column(DateTime(timezone=True), nullable=True)
+
+# --- Analytics Rollups (maintained by core/rollups.py) ---
+class AlertRollup(Base):
+    """Per-alert delivery and read counters for the analytics dashboard."""
+    __tablename__ = "alert_rollups"
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True)
+    delivered_count = Column(Integer, nullable=False, default=0)
+    read_count = Column(Integer, nullable=False, default=0)
+
+class SeverityRollup(Base):
+    """Alerts created and notifications delivered per severity."""
+    __tablename__ = "severity_rollups"
+    severity = Column(Enum(AlertSeverity), primary_key=True)
+    alert_count = Column(Integer, nullable=False, default=0)
+    delivered_count = Column(Integer, nullable=False, default=0)
+
+class DeliveryDailyRollup(Base):
+    """Notifications delivered per UTC day and channel."""
+    __tablename__ = "delivery_daily_rollups"
+    day = Column(Date, primary_key=True)
+    channel = Column(String, primary_key=True)
+    delivered_count = Column(Integer, nullable=False, default=0)
+
+class DeliveryArchiveRollup(Base):
+    """Deliveries per UTC day, alert and channel of the rows core/retention.py removed."""
+    __tablename__ = "delivery_archive_rollups"
+    day = Column(Date, primary_key=True)
+    alert_id = Column(Integer, ForeignKey("alerts.id"), primary_key=True, index=True)
+    channel = Column(String, primary_key=True)
+    delivered_count = Column(Integer, nullable=False, default=0)
+
+class ResourceVersion(Base):
+    """A counter bumped by every write to a resource; list endpoints derive their ETags from it."""
+    __tablename__ = "resource_versions"
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Names of the one-shot schema migrations already applied (services/migrations.py)
+schema_migrations = Table('schema_migrations', Base.metadata,
+    Column('name', String, primary_key=True),
+    Column('applied_at', DateTime(timezone=True), server_default=func.now())
+)
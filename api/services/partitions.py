@@ -0,0 +1,88 @@
+"""
+Monthly range partitions of notification_deliveries on PostgreSQL.
+
+Each partition holds one UTC month of sent_at and is named
+notification_deliveries_YYYY_MM; notification_deliveries_default catches rows
+outside every partition, so inserts never fail for want of one. On other
+databases the table is not partitioned and `is_partitioned` is False.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+TABLE = "notification_deliveries"
+DEFAULT_PARTITION = f"{TABLE}_default"
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": TABLE}).scalar()
+    return relkind == "p"
+
+def month_of(value) -> date:
+    return date(value.year, value.month, 1)
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def month_start(month: date) -> datetime:
+    """The naive UTC datetime a monthly partition starts at."""
+    return datetime(month.year, month.month, 1)
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+def create_month(conn: Connection, month: date):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{next_month(month).isoformat()} 00:00:00+00')"
+    ))
+
+def create_default(conn: Connection):
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+def ensure_months(conn: Connection, first: date, count: int) -> int:
+    """
+    Creates the partitions for `count` months from `first` that do not exist
+    yet. A month whose rows already landed in the default partition cannot
+    get one; it is logged and skipped. Returns how many were created.
+    """
+    existing = {month for _, month in month_partitions(conn)}
+    created = 0
+    month = month_of(first)
+    for _ in range(count):
+        if month not in existing:
+            try:
+                with conn.begin_nested():
+                    create_month(conn, month)
+                created += 1
+            except DBAPIError as exc:
+                logger.warning("partitions.create_failed name=%s error=%s", partition_name(month), exc.orig)
+        month = next_month(month)
+    return created
+
+def month_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """(name, month) of every monthly partition, oldest first."""
+    names = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:name)"
+    ), {"name": TABLE}).scalars()
+
+    partitions = []
+    for name in names:
+        suffix = name[len(TABLE) + 1:]
+        if name == DEFAULT_PARTITION or len(suffix) != 7:
+            continue
+        partitions.append((name, date(int(suffix[:4]), int(suffix[5:]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+def drop_month(conn: Connection, name: str):
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
@@ -0,0 +1,137 @@
+"""
+Connection-pool instrumentation.
+
+Engines are created with an instrumented QueuePool that times every
+connection checkout (including time spent waiting for a free connection)
+and counts checkout timeouts; pool events count connects, checkins and
+invalidated connections. Together with the pool's own gauges this is
+served at /admin/metrics/db-pool and written to the log periodically.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS: List[float] = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.events = {"connect": 0, "checkout": 0, "checkin": 0, "invalidate": 0}
+
+    def count(self, event_name: str):
+        with self._lock:
+            self.events[event_name] += 1
+
+    def record(self, wait_ms: float, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            labels = [f"le_{bound:g}ms" for bound in WAIT_BUCKETS_MS] + ["gt_{:g}ms".format(WAIT_BUCKETS_MS[-1])]
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram": dict(zip(labels, self.wait_buckets)),
+                "events": dict(self.events),
+            }
+
+class _TimedCheckoutMixin:
+    """Times QueuePool._do_get, which is where a checkout blocks when the pool is exhausted."""
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        self.stats.record((time.perf_counter() - started) * 1000, timed_out=False)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats # keep counting across engine.dispose()
+        return pool
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+# SQLAlchemy names pool loggers after the pool class; keep these as quiet as its own "sqlalchemy.pool" loggers
+for _pool_class in (InstrumentedQueuePool, InstrumentedAsyncQueuePool):
+    logging.getLogger(f"{__name__}.{_pool_class.__name__}").setLevel(logging.WARNING)
+
+def attach_pool_events(engine):
+    """Counts pool events of an engine whose pool is instrumented; listeners survive engine.dispose()."""
+    if not isinstance(engine.pool, _TimedCheckoutMixin):
+        return
+    stats = engine.pool.stats
+    for event_name in stats.events:
+        event.listen(engine, event_name, lambda *args, _name=event_name: stats.count(_name))
+
+def pool_snapshot(engine) -> dict:
+    """Live gauges plus the checkout counters of an engine's pool."""
+    pool = engine.pool
+    snapshot = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, _TimedCheckoutMixin):
+        snapshot.update(pool.stats.snapshot())
+    return snapshot
+
+def all_pool_snapshots() -> Dict[str, dict]:
+    from services.database import async_engine, engine
+
+    snapshots = {"sync": pool_snapshot(engine)}
+    if async_engine is not None:
+        snapshots["async"] = pool_snapshot(async_engine.sync_engine)
+    return snapshots
+
+async def log_pool_metrics_periodically(interval_seconds: int):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        for name, snapshot in all_pool_snapshots().items():
+            logger.info(
+                "db_pool.stats engine=%s checked_out=%s overflow=%s checkouts=%s timeouts=%s avg_wait_ms=%s max_wait_ms=%s",
+                name, snapshot.get("checked_out"), snapshot.get("overflow"), snapshot.get("checkouts"),
+                snapshot.get("checkout_timeouts"), snapshot.get("avg_wait_ms"), snapshot.get("max_wait_ms"),
+            )
@@ -0,0 +1,241 @@
+"""
+Per-request profiling (PROFILING_ENABLED).
+
+ProfilingMiddleware times every HTTP request. Engine events count the SQL
+statements it runs, with their total time and the slowest one, and FastAPI's
+response-model serialization (plus the cached list bodies of
+core/http_cache.py) is timed separately. The numbers are sent back in a
+Server-Timing header, which browser dev tools display next to the request,
+and written as a `request.profile` log line.
+
+With PROFILING_SAMPLE_RATE above zero, that share of requests also runs
+under cProfile (or pyinstrument, PROFILING_BACKEND), one request at a time.
+When a sampled request takes longer than PROFILING_SLOW_MS its profile is
+written to PROFILING_OUTPUT_DIR. cProfile sees every thread, so a profile
+also holds whatever other requests ran meanwhile. pyinstrument only samples
+the thread it started in, so the threadpool calls that run sync handlers and
+dependencies are profiled one by one and merged into the report.
+"""
+import cProfile
+import functools
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import fastapi.dependencies.utils
+import fastapi.routing
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+SQL_LOG_MAX_CHARS = 500
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_sampling = threading.Lock() # held while a request runs under a profiler
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.sampler = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def record_query(self, statement: str, elapsed_ms: float):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'app;dur={self.elapsed_ms():.1f}, db;dur={self.db_ms:.1f};desc="{self.queries} queries", '
+            f"db-slowest;dur={self.slowest_ms:.1f}, serialize;dur={self.serialize_ms:.1f}"
+        )
+
+@contextmanager
+def serialization():
+    """Counts the enclosed block as serialization time of the current request, if it is profiled."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serialize_ms += (time.perf_counter() - started) * 1000
+
+# --- SQL statements ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profiling_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.get("profiling_started")
+    if profile is not None and started:
+        profile.record_query(statement, (time.perf_counter() - started.pop()) * 1000)
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("profiling_started"):
+        connection.info["profiling_started"].pop()
+
+# --- Sampling profilers ---
+class _CProfileSampler:
+    """Since Python 3.12 one cProfile profiler covers all threads, threadpool included."""
+    suffix = ".prof" # open with `python -m pstats` or snakeviz
+
+    def start(self):
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop(self):
+        self._profiler.disable()
+
+    def save(self, path: Path):
+        pstats.Stats(self._profiler).dump_stats(path)
+
+class _PyinstrumentSampler:
+    suffix = ".html"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+        self._profiler_class = Profiler
+        self._sessions = []
+
+    def start(self):
+        self._main = self._profiler_class(async_mode="enabled")
+        self._main.start()
+
+    def stop(self):
+        self._sessions.append(self._main.stop())
+
+    def run(self, func, /, *args, **kwargs):
+        profiler = self._profiler_class(async_mode="disabled")
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._sessions.append(profiler.stop())
+
+    def save(self, path: Path):
+        from pyinstrument.renderers import HTMLRenderer
+        from pyinstrument.session import Session
+        path.write_text(HTMLRenderer().render(functools.reduce(Session.combine, self._sessions)))
+
+SAMPLERS = {"cprofile": _CProfileSampler, "pyinstrument": _PyinstrumentSampler}
+
+async def _profiled_run_in_threadpool(func, *args, **kwargs):
+    """Stands in for run_in_threadpool in FastAPI's request handling, so pyinstrument also samples the worker thread."""
+    profile = _current.get()
+    if profile is not None and profile.sampler is not None:
+        return await run_in_threadpool(profile.sampler.run, func, *args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
+
+def _timed_serialize_response(serialize_response):
+    @functools.wraps(serialize_response)
+    async def wrapper(*args, **kwargs):
+        with serialization():
+            return await serialize_response(*args, **kwargs)
+    return wrapper
+
+def _profile_path(scope, elapsed_ms: float, suffix: str) -> Path:
+    name = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    return Path(settings.PROFILING_OUTPUT_DIR) / f"{stamp}-{scope['method']}-{name}-{elapsed_ms:.0f}ms{suffix}"
+
+def install(*engines):
+    """Hooks the engines and FastAPI's request handling; called once by main.py before the app serves requests."""
+    if settings.PROFILING_BACKEND not in SAMPLERS:
+        raise ValueError(f"Unknown PROFILING_BACKEND {settings.PROFILING_BACKEND!r}; expected one of {', '.join(SAMPLERS)}")
+    for engine in engines:
+        if engine is None:
+            continue
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+    fastapi.routing.serialize_response = _timed_serialize_response(fastapi.routing.serialize_response)
+    if settings.PROFILING_SAMPLE_RATE > 0 and settings.PROFILING_BACKEND == "pyinstrument":
+        fastapi.routing.run_in_threadpool = _profiled_run_in_threadpool
+        fastapi.dependencies.utils.run_in_threadpool = _profiled_run_in_threadpool
+
+class ProfilingMiddleware:
+    """ASGI middleware; WebSocket connections pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        if random.random() < settings.PROFILING_SAMPLE_RATE and _sampling.acquire(blocking=False):
+            sampler = SAMPLERS[settings.PROFILING_BACKEND]()
+            try:
+                sampler.start()
+                profile.sampler = sampler
+            except (RuntimeError, ValueError):
+                # Another profiler (a debugger, py-spy's friends) already runs in this process
+                logger.warning("request.profile_skipped path=%s", scope["path"], exc_info=True)
+                _sampling.release()
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            elapsed_ms = profile.elapsed_ms()
+            slowest_sql = " ".join(profile.slowest_sql.split())[:SQL_LOG_MAX_CHARS] if profile.slowest_sql else None
+            logger.info(
+                "request.profile method=%s path=%s status=%s total_ms=%.1f queries=%d db_ms=%.1f serialize_ms=%.1f slowest_ms=%.1f slowest_sql=%r",
+                scope["method"], scope["path"], status, elapsed_ms, profile.queries, profile.db_ms,
+                profile.serialize_ms, profile.slowest_ms, slowest_sql,
+            )
+            if profile.sampler is not None:
+                await self._finish_sample(profile.sampler, scope, elapsed_ms)
+
+    async def _finish_sample(self, sampler, scope, elapsed_ms: float):
+        try:
+            sampler.stop()
+            if elapsed_ms >= settings.PROFILING_SLOW_MS:
+                path = _profile_path(scope, elapsed_ms, sampler.suffix)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                await run_in_threadpool(sampler.save, path)
+                logger.info("request.profile_saved method=%s path=%s total_ms=%.1f file=%s",
+                            scope["method"], scope["path"], elapsed_ms, path)
+        except Exception:
+            logger.exception("request.profile_save_failed path=%s", scope["path"])
+        finally:
+            _sampling.release()
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Dict, List, Optional
 from datetime import datetime
+import enum
 from .models import AlertSeverity, UserAlertStatusEnum
 
 # --- User Schemas ---
@@ -11,6 +12,7 @@ class UserBase(BaseModel):
 class User(UserBase):
     id: int
     team_id: Optional[int] = None
+    is_active: bool = True
     class Config:
         from_attributes = True
 
@@ -19,6 +21,11 @@ class UserCreate(BaseModel):
     email : str
     full_name :str
 
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    team_id: Optional[int] = None
+    is_active: Optional[bool] = None
+
 
 # --- Team Schemas ---
 class TeamBase(BaseModel):
@@ -60,14 +67,47 @@ class AlertUpdate(BaseModel):
     expiry_time: Optional[datetime] = None
     reminder_enabled: Optional[bool] = None
     is_archived: Optional[bool] = None
+    is_org_wide: Optional[bool] = None
+    target_user_ids: Optional[List[int]] = None
+    target_team_ids: Optional[List[int]] = None
 
 class Alert(AlertBase):
     id: int
     created_by: User
     is_archived: bool
+    created_at: Optional[datetime] = None
     class Config:
         from_attributes = True
 
+# --- Admin List Pages (keyset-paginated on id) ---
+class UserPage(BaseModel):
+    items: List[User]
+    next_cursor: Optional[str] = None # pass back as `cursor` for the next page; None on the last page
+
+class TeamPage(BaseModel):
+    items: List[Team]
+    next_cursor: Optional[str] = None
+
+class AlertPage(BaseModel):
+    items: List[Alert]
+    next_cursor: Optional[str] = None
+
+class AlertFields(str, enum.Enum):
+    FULL = "full"
+    SUMMARY = "summary" # AlertSummary rows, read as plain columns
+
+class AlertSummary(BaseModel):
+    id: int
+    title: str
+    severity: AlertSeverity
+    start_time: Optional[datetime] = None
+    expiry_time: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+class AlertSummaryPage(BaseModel):
+    items: List[AlertSummary]
+    next_cursor: Optional[str] = None
+
 # --- User-Facing Alert Schemas ---
 class UserAlertStatus(BaseModel):
     status: UserAlertStatusEnum
@@ -86,6 +126,175 @@ class UserAlert(BaseModel):
     class Config:
         from_attributes = True
 
+class UnreadCount(BaseModel):
+    user_id: int
+    unread_count: int
+
+class BulkStatusAction(str, enum.Enum):
+    READ = "READ"
+    SNOOZE = "SNOOZE"     # until the end of the current day (UTC)
+    UNSNOOZE = "UNSNOOZE"
+
+class UserBulkStatusUpdate(BaseModel):
+    action: BulkStatusAction
+    alert_ids: List[int] = []
+    all_visible: bool = False # apply to every alert currently visible to the user instead of alert_ids
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if not self.all_visible and not self.alert_ids:
+            raise ValueError("Provide alert_ids or set all_visible")
+        return self
+
+class AlertAcknowledgeFor(BaseModel):
+    action: BulkStatusAction = BulkStatusAction.READ
+    team_id: Optional[int] = None # None applies to the alert's entire audience
+
+class BulkStatusResult(BaseModel):
+    updated: int
+
+
+# --- UI Bootstrap Schemas ---
+class UIPage(str, enum.Enum):
+    ADMIN = "admin"
+    USER = "user"
+
+class UIBootstrap(BaseModel):
+    """Everything one front-end page renders on load; fields a page does not use are left empty."""
+    page: UIPage
+    users: List[User]                             # active users, for the pickers
+    more_users: bool = False                      # users stops at the picker limit; search for the rest
+    teams: List[Team] = []                        # admin
+    more_teams: bool = False
+    alerts: Optional[AlertPage] = None            # admin: first page of non-archived alerts
+    alert_choices: List[AlertSummary] = []        # admin: non-archived alerts for the edit picker
+    more_alert_choices: bool = False
+    user_id: Optional[int] = None                 # user: whose inbox this is
+    inbox: List[UserAlert] = []                   # user
+
+# --- Bulk Import Schemas ---
+class ImportKind(str, enum.Enum):
+    TEAMS = "teams"
+    USERS = "users"
+    MEMBERSHIPS = "memberships"
+    ALERTS = "alerts"
+
+class ImportFormat(str, enum.Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+class ImportRow(BaseModel):
+    """One record of an import; surrounding whitespace is ignored."""
+    class Config:
+        str_strip_whitespace = True
+
+class ImportTeamRow(ImportRow):
+    name: str = Field(min_length=1)
+
+class ImportUserRow(ImportRow):
+    email: str = Field(min_length=1)
+    full_name: Optional[str] = None
+    team: Optional[str] = None # team name
+    team_id: Optional[int] = None
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def check_team(self):
+        if self.team is not None and self.team_id is not None:
+            raise ValueError("Give team or team_id, not both")
+        return self
+
+class ImportMembershipRow(ImportRow):
+    email: str = Field(min_length=1)
+    team: str = Field(min_length=1) # team name
+
+class ImportAlertRow(ImportRow):
+    title: str
+    message_body: str
+    created_by: str # creator's email
+    severity: AlertSeverity = AlertSeverity.INFO
+    start_time: Optional[datetime] = None
+    expiry_time: Optional[datetime] = None
+    reminder_enabled: bool = True
+    is_org_wide: bool = False
+    target_teams: List[str] = [] # team names
+    target_users: List[str] = [] # emails
+
+    @field_validator("target_teams", "target_users", mode="before")
+    @classmethod
+    def split_list(cls, value):
+        # CSV cells hold lists as "a|b|c"
+        if isinstance(value, str):
+            return [item.strip() for item in value.split("|") if item.strip()]
+        return value
+
+class ImportRowError(BaseModel):
+    line: int # line of the body the record starts on
+    error: str
+
+class ImportReport(BaseModel):
+    kind: ImportKind
+    received: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False # more rows failed than IMPORT_MAX_ERRORS; only the first are listed
+    duration_ms: Optional[float] = None
+
+# --- Reminder Scheduler Schemas ---
+class ReminderCycle(BaseModel):
+    cycle_id: str
+    trigger: str
+    status: str
+    message: Optional[str] = None
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+# --- Metrics Schemas ---
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    invalidations: int
+
+class StreamStats(BaseModel):
+    connections: int
+    users: int
+    published: int
+    delivered: int
+    resyncs: int # connections whose buffer overflowed
+
+class OutboxStats(BaseModel):
+    pending: int
+    sending: int
+    dead: int
+    oldest_pending_at: Optional[datetime] = None
+
+class PoolStats(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout_seconds: Optional[float] = None
+    checkouts: Optional[int] = None
+    checkout_timeouts: Optional[int] = None
+    avg_wait_ms: Optional[float] = None
+    max_wait_ms: Optional[float] = None
+    wait_histogram: Optional[Dict[str, int]] = None
+    events: Optional[Dict[str, int]] = None
+
 
 #analytics  schemas
 class OverallStats(BaseModel):
@@ -106,10 +315,37 @@ class AlertPerformance(BaseModel):
     read_count: int
     snooze_count: int 
 
+class AlertPerformancePage(BaseModel):
+    items: List[AlertPerformance]
+    next_cursor: Optional[str] = None # pass back as `cursor` for the next page; None on the last page
+
 class AnalyticsDashboard(BaseModel):
     overall_stats: OverallStats
     severity_breakdown: SeverityBreakdown
-    alerts_performance: List[AlertPerformance]
+    alerts_performance: List[AlertPerformance] # first page; the rest via /analytics/alerts-performance
+    alerts_performance_next_cursor: Optional[str] = None
+
+class TimeseriesMetric(str, enum.Enum):
+    DELIVERIES = "deliveries"
+    READS = "reads"
+    SNOOZES = "snoozes"
+
+class TimeseriesBucket(str, enum.Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    count: int
+
+class Timeseries(BaseModel):
+    metric: TimeseriesMetric
+    bucket: TimeseriesBucket
+    bucket_seconds: int # wider than `bucket` when the range was downsampled
+    from_time: datetime
+    to_time: datetime
+    points: List[TimeseriesPoint]
 
 
 
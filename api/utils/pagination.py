@@ -0,0 +1,48 @@
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+
+def encode_cursor(values: List[Any]) -> str:
+    """An opaque keyset cursor holding the sort key of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Raises ValueError for cursors this module did not produce."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(values, list):
+        raise ValueError("Malformed cursor")
+    return values
+
+def start_after(cursor: Optional[str], after_id: Optional[int] = None) -> Optional[int]:
+    """The id an id-ordered page starts after: the cursor's when given, else `after_id`."""
+    if not cursor:
+        return after_id
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError("Malformed cursor")
+    return values[0]
+
+def seek(query, id_column, limit: int, after: Optional[int] = None):
+    """
+    `query` (a Query or a select()) narrowed to one page in `id_column` order
+    after id `after`, plus one row that tells whether another page follows.
+    Seeks through the primary key index instead of an OFFSET, so deep pages
+    cost the same as the first.
+    """
+    if after is not None:
+        query = query.filter(id_column > after)
+    return query.order_by(id_column).limit(limit + 1)
+
+def finish_page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    """The rows fetched for `seek` cut down to the page, and the cursor of the next page (None on the last one)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([rows[-1].id])
+
+def id_page(query, id_column, limit: int, after: Optional[int] = None) -> Tuple[list, Optional[str]]:
+    """One page of `query` in `id_column` order, starting after id `after`, and the cursor of the next page."""
+    return finish_page(seek(query, id_column, limit, after).all(), limit)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,10 +9,89 @@ load_dotenv()
 class Settings(BaseSettings):
     DB_URL: str
 
+    # --- Connection pool ---
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30 # seconds a checkout waits for a free connection
+    DB_POOL_RECYCLE: int = 1800 # seconds; -1 never recycles
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_LOG_INTERVAL_SECONDS: int = 60 # 0 disables the periodic pool log line
+
+    # --- Async mode ---
+    ASYNC_DB_ENABLED: bool = False
+    ASYNC_DB_URL: Optional[str] = None # derived from DB_URL when unset (asyncpg / aiosqlite)
+
+    # --- Reminders ---
+    REMINDER_BATCH_SIZE: int = 1000
+    DELIVERY_COMMIT_CHUNK_SIZE: int = 5000
+    REMINDER_INTERVAL_SECONDS: int = 300 # 0 disables scheduled cycles; manual triggers still run
+    REMINDER_LOCK_TTL_SECONDS: int = 900
+    REMINDER_SHARD_COUNT: int = 32
+    REMINDER_WORKERS: int = 4
+    REMINDER_DIGEST_SEVERITIES: str = "INFO,WARNING" # sent as one digest per user; other severities one by one, "" disables digests
+
+    # --- Delivery outbox ---
+    DELIVERY_CHANNELS: str = "IN_APP" # comma-separated channels every reminder is queued on, e.g. "IN_APP,EMAIL"
+    OUTBOX_DISPATCH_ENABLED: bool = True # drain the outbox inside the API; disable when `python -m core.outbox drain` runs instead
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_LEASE_SECONDS: int = 300 # a claimed batch is retried after this long without an outcome
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BASE_SECONDS: int = 30 # doubled after every failed attempt
+    OUTBOX_RETRY_MAX_SECONDS: int = 3600
+    IN_APP_BATCH_SIZE: int = 5000
+    IN_APP_CONCURRENCY: int = 1
+    EMAIL_BATCH_SIZE: int = 100
+    EMAIL_CONCURRENCY: int = 4 # batches (and SMTP connections) in flight at once
+
+    # --- Delivery retention ---
+    DELIVERY_RETENTION_DAYS: int = 90 # older notification_deliveries rows are rolled up and removed; 0 keeps them forever
+    RETENTION_INTERVAL_SECONDS: int = 86400 # 0 disables the in-API job; run `python -m core.retention run` instead
+    RETENTION_CHUNK_ROWS: int = 10000 # rows deleted per transaction
+    RETENTION_SQLITE_VACUUM: bool = True # VACUUM after removing rows on SQLite, which locks the database while it runs
+    DELIVERY_PARTITIONS_AHEAD: int = 2 # PostgreSQL monthly partitions created ahead of time
+
+    # --- Email (SMTP) ---
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USERNAME: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    SMTP_STARTTLS: bool = False
+    SMTP_TIMEOUT_SECONDS: int = 10
+    EMAIL_FROM: str = "alerts@localhost"
+
+    # --- Caching ---
+    INBOX_CACHE_SIZE: int = 10000
+    INBOX_CACHE_TTL_SECONDS: int = 30
+    RESPONSE_CACHE_SIZE: int = 256
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESOURCE_VERSION_TTL_SECONDS: float = 1.0 # how long a worker trusts its copy of a resource version
+
+    # --- Live streams ---
+    STREAM_QUEUE_SIZE: int = 100 # events buffered per connection before it is told to resync
+    STREAM_HEARTBEAT_SECONDS: int = 25
+
+    # --- Admin lists ---
+    ADMIN_PAGE_SIZE: int = 100 # default page size of the user, team and alert lists
+
+    # --- Bulk import ---
+    IMPORT_CHUNK_ROWS: int = 5000 # records validated and written per transaction by POST /admin/import
+    IMPORT_MAX_ERRORS: int = 1000 # failed rows listed in the import report; the rest are only counted
+
+    # --- Analytics ---
+    ANALYTICS_MAX_POINTS: int = 500 # time series are downsampled to at most this many buckets
+    ANALYTICS_PAGE_SIZE: int = 50
+
+    # --- Request profiling ---
+    PROFILING_ENABLED: bool = False # Server-Timing header and a request.profile log line for every request
+    PROFILING_SAMPLE_RATE: float = 0.0 # share of requests also run under a profiler, one at a time
+    PROFILING_SLOW_MS: float = 500.0 # sampled requests slower than this have their profile written
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    PROFILING_BACKEND: str = "cprofile" # or "pyinstrument" (uv sync --extra profiling)
+
     model_config = {
         "env_file": ".env",
         "extra": "ignore"
     }
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,168 @@
+"""
+Compares requests/sec of the sync and async (ASYNC_DB_ENABLED) API modes
+under many concurrent clients.
+
+For each mode the script seeds a throwaway SQLite database (or uses
+--db-url), starts `uvicorn main:app` from api/, drives it with
+--concurrency clients through httpx, and reports throughput and latency.
+Meanwhile one more client requests --probe-path (a cheap endpoint) one call
+at a time; its latency shows how long the load keeps other requests waiting,
+e.g. while an async handler holds the event loop.
+
+Usage (from the repository root; needs httpx, uvicorn and aiosqlite/asyncpg):
+    python benchmarks/bench_concurrency.py --concurrency 500 --requests 20000
+    python benchmarks/bench_concurrency.py --alerts 600 --concurrency 20 --requests 1000 \
+        --path "/admin/alerts/?limit=500&active=true"   # full pages; active=true bypasses the response cache
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="SQLAlchemy URL of a scratch database (its tables are dropped).")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=10_000, help="Total requests per mode.")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--alerts", type=int, default=20)
+    parser.add_argument("--path", default="/users/{user_id}/alerts/unread-count",
+                        help="Endpoint to hit; {user_id} is replaced with a rotating user id.")
+    parser.add_argument("--probe-path", default="/", help="Endpoint timed one call at a time during the load.")
+    parser.add_argument("--modes", default="sync,async")
+    return parser.parse_args()
+
+
+def seed(db_url: str, users: int, alerts: int):
+    env = dict(os.environ, DB_URL=db_url)
+    script = f"""
+from services import models
+from services.database import engine, SessionLocal
+models.Base.metadata.drop_all(bind=engine)
+models.Base.metadata.create_all(bind=engine)
+db = SessionLocal()
+db.add(models.Team(name="Bench"))
+db.commit()
+db.execute(models.User.__table__.insert(), [
+    {{"email": f"user{{i}}@bench.local", "full_name": f"User {{i}}", "team_id": 1}} for i in range({users})
+])
+for i in range({alerts}):
+    db.add(models.Alert(title=f"Alert {{i}}", message_body="Bench", is_org_wide=True, created_by_id=1))
+db.commit()
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=API_DIR, env=env, check=True)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_url: str, async_mode: bool, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_URL=db_url, ASYNC_DB_ENABLED=str(async_mode).lower(), REMINDER_INTERVAL_SECONDS="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+def _percentiles(latencies) -> tuple:
+    latencies = sorted(latencies)
+    return statistics.median(latencies) * 1000, latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000
+
+
+async def drive(base_url: str, path: str, probe_path: str, total: int, concurrency: int, users: int):
+    latencies, probe_latencies, errors = [], [], 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=60) as probe_client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path.format(user_id=i % users + 1))
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await probe_client.get(probe_path)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        prober = asyncio.create_task(probe())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    p50_ms, p99_ms = _percentiles(latencies)
+    probe_p50_ms, probe_p99_ms = _percentiles(probe_latencies)
+    return {
+        "rps": total / elapsed,
+        "p50_ms": p50_ms,
+        "p99_ms": p99_ms,
+        "errors": errors,
+        "probe_p50_ms": probe_p50_ms,
+        "probe_p99_ms": probe_p99_ms,
+    }
+
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if not args.db_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db_url = f"sqlite:///{tmpdir.name}/bench.db"
+
+    seed(args.db_url, args.users, args.alerts)
+    print(f"{args.requests:,} requests of {args.path} with {args.concurrency} concurrent clients, probing {args.probe_path}")
+
+    for mode in args.modes.split(","):
+        port = free_port()
+        server = start_server(args.db_url, mode == "async", port)
+        try:
+            result = asyncio.run(drive(f"http://127.0.0.1:{port}", args.path, args.probe_path, args.requests, args.concurrency, args.users))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{mode:>6}: {result['rps']:,.0f} req/s  p50 {result['p50_ms']:.1f} ms  "
+              f"p99 {result['p99_ms']:.1f} ms  errors {result['errors']}  "
+              f"probe p50 {result['probe_p50_ms']:.1f} ms  p99 {result['probe_p99_ms']:.1f} ms")
+
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmarks delivery-log writes: the old per-row ORM path against
+InAppNotificationChannel.send_many.
+
+Usage (from the repository root):
+    python benchmarks/bench_delivery_writes.py --rows 100000
+    python benchmarks/bench_delivery_writes.py --db-url postgresql://... --rows 100000
+
+Without --db-url a throwaway SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="SQLAlchemy URL of a scratch database (its tables are dropped).")
+    parser.add_argument("--rows", type=int, default=50_000, help="Delivery rows to write per run.")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Override DELIVERY_COMMIT_CHUNK_SIZE.")
+    return parser.parse_args()
+
+
+def legacy_send(db, models, targets):
+    """The pre-send_many behaviour: a print and an ORM add per row, one commit."""
+    with open(os.devnull, "w") as devnull:
+        for target in targets:
+            print(f"INFO: Generating IN_APP notification for user {target.user_id} for alert {target.alert_id}", file=devnull)
+            db.add(models.NotificationDelivery(alert_id=target.alert_id, user_id=target.user_id, channel="IN_APP"))
+    db.commit()
+
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if not args.db_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db_url = f"sqlite:///{tmpdir.name}/bench.db"
+
+    os.environ["DB_URL"] = args.db_url
+    sys.path.insert(0, str(API_DIR))
+
+    from services import models
+    from services.database import engine, SessionLocal
+    from core.notifications import NotificationTarget, InAppNotificationChannel
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    team = models.Team(name="Bench")
+    db.add(team)
+    db.commit()
+    db.execute(
+        models.User.__table__.insert(),
+        [{"email": f"user{i}@bench.local", "full_name": f"User {i}", "team_id": team.id} for i in range(args.rows)],
+    )
+    alert = models.Alert(title="Bench", message_body="Bench", is_org_wide=True, created_by_id=1)
+    db.add(alert)
+    db.commit()
+
+    user_ids = [row[0] for row in db.query(models.User.id).order_by(models.User.id)]
+    targets = [NotificationTarget(user_id, alert.id, alert.severity, alert.title) for user_id in user_ids]
+
+    results = {}
+    for label, run in (
+        ("legacy_orm", lambda: legacy_send(db, models, targets)),
+        ("send_many", lambda: InAppNotificationChannel().send_many(db, targets, chunk_size=args.chunk_size)),
+    ):
+        db.query(models.NotificationDelivery).delete()
+        db.commit()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        results[label] = len(targets) / elapsed
+        print(f"{label:>12}: {len(targets):,} rows in {elapsed:.2f}s -> {results[label]:,.0f} rows/sec")
+
+    print(f"{'speedup':>12}: {results['send_many'] / results['legacy_orm']:.1f}x")
+
+    db.close()
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
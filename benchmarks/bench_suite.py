@@ -0,0 +1,259 @@
+"""
+Times the hot paths on a generated dataset and writes JSON results that can
+be diffed between versions to catch regressions.
+
+The dataset comes from seed.py (a throwaway SQLite file unless --db-url is
+given; the dataset options are seed.py's). Each case then runs --repeat
+times after one warm-up call, and its wall time (min, median, p95, mean) and
+SQL statements per call are recorded:
+
+- find_users_needing_reminders and process_reminders (core/reminders.py);
+- GET /users/{id}/alerts, /analytics/dashboard and the admin lists, through
+  the FastAPI TestClient.
+
+The inbox and response caches are cleared before every call, so the HTTP
+numbers are for cold requests. process_reminders starts each run from an
+empty outbox.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py --users 100000 --output before.json
+    python benchmarks/bench_suite.py --users 100000 --compare before.json
+    python benchmarks/bench_suite.py --db-url postgresql://... --no-generate --cases get_user_alerts,list_alerts
+
+With --compare the exit status is 1 when a case's median time grew by more
+than --threshold, or it runs more statements than in the baseline.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+API_DIR = ROOT / "api"
+sys.path.insert(0, str(ROOT))
+
+import seed
+
+# A mid-sized organisation with a few dozen active alerts among a longer history;
+# every value can be overridden with seed.py's options
+BENCH_DATASET = {
+    "teams": 50,
+    "users": 5_000,
+    "alerts": 300,
+    "expired_share": 0.85,
+    "teams_per_alert": 2,
+    "users_per_alert": 50,
+    "deliveries": 100_000,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", help="SQLAlchemy URL of a scratch database (its tables are dropped unless --no-generate).")
+    parser.add_argument("--no-generate", action="store_true", help="Benchmark the data already in --db-url.")
+    parser.add_argument("--async-mode", action="store_true", help="Serve the HTTP cases with ASYNC_DB_ENABLED=true.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per case.")
+    parser.add_argument("--cases", default=None, help="Comma-separated subset of cases to run.")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout).")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed growth of a median before --compare fails (0.2 = 20%%).")
+    seed.add_arguments(parser)
+    return parser.parse_args()
+
+
+def git_revision() -> dict:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def summarize(timings, queries) -> dict:
+    timings = sorted(seconds * 1000 for seconds in timings)
+    return {
+        "runs": len(timings),
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "queries": int(statistics.median(queries)),
+    }
+
+
+def build_cases(client, SessionLocal, user_ids, reset):
+    """name -> (setup, run); setup is untimed and run returns nothing of interest."""
+    from sqlalchemy import delete
+    from services import models
+    from core.reminders import find_users_needing_reminders, process_reminders
+
+    db = SessionLocal()
+    rotation = iter(range(10**9))
+
+    def get(path_for):
+        def run():
+            response = client.get(path_for())
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {response.request.url} returned {response.status_code}: {response.text[:200]}")
+        return run
+
+    def empty_outbox():
+        reset()
+        db.execute(delete(models.DeliveryJob))
+        db.commit()
+
+    def reminders_scan():
+        find_users_needing_reminders(db)
+        db.rollback()
+
+    return db, {
+        "find_users_needing_reminders": (reset, reminders_scan),
+        "process_reminders": (empty_outbox, lambda: process_reminders(db)),
+        "get_user_alerts": (reset, get(lambda: f"/users/{user_ids[next(rotation) * 7919 % len(user_ids)]}/alerts")),
+        "get_analytics_dashboard": (reset, get(lambda: "/analytics/dashboard")),
+        "list_users": (reset, get(lambda: "/admin/users/")),
+        "list_teams": (reset, get(lambda: "/admin/teams/")),
+        "list_alerts": (reset, get(lambda: "/admin/alerts/")),
+        "list_alerts_summary": (reset, get(lambda: "/admin/alerts/?fields=summary")),
+    }
+
+
+def configure(args):
+    """Points the API at the benchmark database; must run before anything imports its settings."""
+    os.environ.update({
+        "DB_URL": args.db_url,
+        "ASYNC_DB_ENABLED": str(args.async_mode).lower(),
+        # Nothing runs in the background while cases are timed
+        "REMINDER_INTERVAL_SECONDS": "0",
+        "OUTBOX_DISPATCH_ENABLED": "false",
+        "RETENTION_INTERVAL_SECONDS": "0",
+        "DB_POOL_LOG_INTERVAL_SECONDS": "0",
+    })
+    sys.path.insert(0, str(API_DIR))
+
+
+def run_suite(args, dataset: dict) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, select
+    import main
+    from services import models
+    from services.database import SessionLocal, async_engine, engine
+    from core import http_cache, inbox
+
+    logging.getLogger().setLevel(logging.WARNING)
+    statements = [0]
+    def count(*_):
+        statements[0] += 1
+    event.listen(engine, "before_cursor_execute", count)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+
+    def reset():
+        inbox.inbox_cache.clear()
+        http_cache.response_cache.clear()
+
+    selected = set(args.cases.split(",")) if args.cases else None
+    results = {}
+    with TestClient(main.app) as client:
+        with SessionLocal() as db:
+            user_ids = db.execute(select(models.User.id).where(models.User.is_active == True).order_by(models.User.id)).scalars().all()
+        session, cases = build_cases(client, SessionLocal, user_ids, reset)
+        unknown = (selected or set()) - set(cases)
+        if unknown:
+            raise SystemExit(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+        for name, (setup, run) in cases.items():
+            if selected and name not in selected:
+                continue
+            setup()
+            run() # warm-up: imports, statement caches, first connection
+            timings, queries = [], []
+            for _ in range(args.repeat):
+                setup()
+                statements[0] = 0
+                started = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - started)
+                queries.append(statements[0])
+            results[name] = summarize(timings, queries)
+            print(f"{name:>30}: median {results[name]['median_ms']:9.2f} ms  p95 {results[name]['p95_ms']:9.2f} ms  "
+                  f"queries {results[name]['queries']}", file=sys.stderr)
+        session.close()
+
+    import sqlalchemy
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": engine.dialect.name,
+            "async_mode": args.async_mode,
+        },
+        "dataset": dataset,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Prints the change of every case found in both; returns True when one regressed."""
+    regressed = False
+    print(f"{'case':>30}  {'baseline':>10}  {'current':>10}  {'change':>8}  queries", file=sys.stderr)
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        slower = change > threshold
+        more_queries = result["queries"] > before["queries"]
+        regressed |= slower or more_queries
+        print(f"{name:>30}  {before['median_ms']:8.2f}ms  {result['median_ms']:8.2f}ms  {change:+7.1%}  "
+              f"{before['queries']} -> {result['queries']}{'  REGRESSION' if slower or more_queries else ''}",
+              file=sys.stderr)
+    if baseline.get("dataset") != json.loads(json.dumps(current["dataset"])):
+        print("note: the baseline was measured on a different dataset", file=sys.stderr)
+    return regressed
+
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if not args.db_url:
+        if args.no_generate:
+            raise SystemExit("--no-generate needs --db-url")
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db_url = f"sqlite:///{tmpdir.name}/bench.db"
+
+    configure(args)
+    dataset = None
+    if not args.no_generate:
+        dataset = {**seed.DEFAULTS, **BENCH_DATASET, **seed.dataset_options(args)}
+        print(f"Generating {dataset['users']:,} users, {dataset['alerts']:,} alerts and "
+              f"{dataset['deliveries']:,} deliveries", file=sys.stderr)
+        seed.generate(args.db_url, log=lambda line: print(line, file=sys.stderr), **dataset)
+
+    report = run_suite(args, dataset)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    regressed = False
+    if args.compare:
+        regressed = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+    if tmpdir:
+        tmpdir.cleanup()
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,61 @@
+import threading
+from collections import OrderedDict
+
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Any, Optional
+from urllib3.util.retry import Retry
 
 # --- Configuration ---
 BACKEND_URL = "http://127.0.0.1:8000"
+REQUEST_TIMEOUT = (3.05, 30) # seconds to connect, seconds to wait for the response
+
+# How long each group of reads is served from st.cache_data. Writes made
+# through this module clear the groups they change right away; the TTLs only
+# bound how stale a change made elsewhere (another tab, the scheduler) can be.
+PAGES_TTL_SECONDS = 10 # /ui/bootstrap page loads, which combine the groups below
+DIRECTORY_TTL_SECONDS = 60 # users and teams
+ALERTS_TTL_SECONDS = 15
+INBOX_TTL_SECONDS = 10
+ANALYTICS_TTL_SECONDS = 30
+ETAG_CACHE_SIZE = 256 # response bodies kept for If-None-Match revalidation, least recently used evicted
+
+class BackendError(Exception):
+    """A failed API call; raised inside cached reads so failures are not cached."""
+
+# --- HTTP session ---
+@st.cache_resource
+def _session() -> requests.Session:
+    """
+    One keep-alive session for the whole Streamlit server, so reruns reuse
+    pooled connections instead of opening one per call. Only idempotent
+    reads are retried, on connection errors and gateway errors.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _send(method: str, path: str, **kwargs) -> requests.Response:
+    try:
+        return _session().request(method, f"{BACKEND_URL}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+    except requests.exceptions.RequestException as exc:
+        raise BackendError(f"Could not reach the API: {exc}") from exc
 
 # --- Helper Functions ---
+def _error_detail(response: requests.Response) -> str:
+    try:
+        detail = response.json().get("detail", "No detail provided.")
+    except requests.exceptions.JSONDecodeError:
+        detail = response.text
+    return f"API Error (Status {response.status_code}): {detail}"
+
 def handle_response(response, success_code=200):
     """Helper to check for HTTP errors and return JSON."""
     if response.status_code == success_code or (200 <= response.status_code < 300 and success_code != 204):
@@ -13,75 +63,196 @@ def handle_response(response, success_code=200):
             return True
         return response.json()
     else:
-        try:
-            detail = response.json().get("detail", "No detail provided.")
-        except requests.exceptions.JSONDecodeError:
-            detail = response.text
-        st.error(f"API Error (Status {response.status_code}): {detail}")
+        st.error(_error_detail(response))
+        return None
+
+def _write(method: str, path: str, success_code: int = 200, **kwargs):
+    """Sends a write and returns handle_response's result; an unreachable API is reported like an API error."""
+    try:
+        response = _send(method, path, **kwargs)
+    except BackendError as exc:
+        st.error(str(exc))
         return None
+    return handle_response(response, success_code=success_code)
+
+def _read(cached_get, path: str, params: Dict[str, Any] = None):
+    """Runs a cached GET, showing the error and returning None when it failed."""
+    try:
+        return cached_get(path, params or {})
+    except BackendError as exc:
+        st.error(str(exc))
+        return None
+
+# (url, sorted params) -> (ETag, body) of the last successful response, shared by
+# every session's script thread; bounded because params include cursors and filters
+_etag_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_etag_lock = threading.Lock()
+
+def _etag_get(key: tuple) -> Optional[tuple]:
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+        if cached is not None:
+            _etag_cache.move_to_end(key)
+        return cached
+
+def _etag_set(key: tuple, etag: str, data):
+    with _etag_lock:
+        _etag_cache[key] = (etag, data)
+        _etag_cache.move_to_end(key)
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+
+def get_cached_json(path: str, params: Dict[str, Any] = None):
+    """
+    GET with If-None-Match: list endpoints answer 304 when nothing changed since
+    the last call, and the body seen then is reused instead of downloaded again.
+    Raises BackendError when the call fails.
+    """
+    url = f"{BACKEND_URL}{path}"
+    key = (url, tuple(sorted((params or {}).items())))
+    cached = _etag_get(key)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = _send("GET", path, params=params, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    if response.status_code != 200:
+        raise BackendError(_error_detail(response))
+    data = response.json()
+    if response.headers.get("ETag"):
+        _etag_set(key, response.headers["ETag"], data)
+    return data
+
+# --- Cached reads, one st.cache_data group per kind of data ---
+@st.cache_data(ttl=PAGES_TTL_SECONDS, show_spinner=False)
+def _get_pages(path: str, params: Dict[str, Any]):
+    return get_cached_json(path, params)
+
+@st.cache_data(ttl=DIRECTORY_TTL_SECONDS, show_spinner=False)
+def _get_directory(path: str, params: Dict[str, Any]):
+    return get_cached_json(path, params)
+
+@st.cache_data(ttl=ALERTS_TTL_SECONDS, show_spinner=False)
+def _get_alerts(path: str, params: Dict[str, Any]):
+    return get_cached_json(path, params)
+
+@st.cache_data(ttl=INBOX_TTL_SECONDS, show_spinner=False)
+def _get_inbox(path: str, params: Dict[str, Any]):
+    return get_cached_json(path, params)
+
+@st.cache_data(ttl=ANALYTICS_TTL_SECONDS, show_spinner=False)
+def _get_analytics(path: str, params: Dict[str, Any]):
+    return get_cached_json(path, params)
+
+def _page(cached_get, path: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    """One page of a keyset-paginated list: {"items": [...], "next_cursor": ...}."""
+    return _read(cached_get, path, params) or {"items": [], "next_cursor": None}
+
+def _directory_changed():
+    _get_directory.clear()
+    _get_pages.clear()
+
+def _alerts_changed():
+    # Alert writes change what every inbox shows and what analytics count
+    _get_alerts.clear()
+    _get_inbox.clear()
+    _get_analytics.clear()
+    _get_pages.clear()
+
+def _statuses_changed():
+    _get_inbox.clear()
+    _get_analytics.clear()
+    _get_pages.clear()
+
+# --- Page loads ---
+def get_bootstrap(page: str, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Everything the "admin" or "user" page renders on load, in one request (GET /ui/bootstrap)."""
+    params = {"page": page}
+    if user_id is not None:
+        params["user_id"] = user_id
+    return _read(_get_pages, "/ui/bootstrap", params)
 
 # --- Analytics API ---
 def get_analytics_dashboard() -> Optional[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/analytics/dashboard")
-    return handle_response(response)
+    return _read(_get_analytics, "/analytics/dashboard")
+
+def get_alerts_performance(params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+    """One keyset page of per-alert performance: {"items": [...], "next_cursor": ...}."""
+    return _read(_get_analytics, "/analytics/alerts-performance", params)
+
+def get_timeseries(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    return _read(_get_analytics, "/analytics/timeseries", params)
 
 # --- Admin User Management ---
-def list_users() -> List[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/admin/users/")
-    data = handle_response(response)
-    return data if data else []
+def list_users(params: Dict[str, Any] = None) -> Dict[str, Any]:
+    return _page(_get_directory, "/admin/users/", params)
 
 def create_user(user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    response = requests.post(f"{BACKEND_URL}/admin/users/", json=user_data)
-    return handle_response(response, success_code=201)
+    created = _write("POST", "/admin/users/", success_code=201, json=user_data)
+    if created:
+        _directory_changed()
+    return created
 
 # --- Admin Team Management ---
-def list_teams() -> List[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/admin/teams/")
-    data = handle_response(response)
-    return data if data else []
+def list_teams(params: Dict[str, Any] = None) -> Dict[str, Any]:
+    return _page(_get_directory, "/admin/teams/", params)
 
 def create_team(team_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    response = requests.post(f"{BACKEND_URL}/admin/teams/", json=team_data)
-    return handle_response(response, success_code=201)
+    created = _write("POST", "/admin/teams/", success_code=201, json=team_data)
+    if created:
+        _directory_changed()
+    return created
 
 # --- Admin Alert Management ---
 def create_alert(alert_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    response = requests.post(f"{BACKEND_URL}/admin/alerts/", json=alert_data)
-    return handle_response(response, success_code=201)
+    created = _write("POST", "/admin/alerts/", success_code=201, json=alert_data)
+    if created:
+        _alerts_changed()
+    return created
+
+def get_all_alerts_for_admin(params: Dict[str, Any] = None) -> Dict[str, Any]:
+    return _page(_get_alerts, "/admin/alerts/", params)
 
-def get_all_alerts_for_admin(params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/admin/alerts/", params=params)
-    data = handle_response(response)
-    return data if data else []
-    
 def get_alert_by_id(alert_id: int) -> Optional[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/admin/alerts/{alert_id}")
-    return handle_response(response)
+    return _read(_get_alerts, f"/admin/alerts/{alert_id}")
 
 def update_alert(alert_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    response = requests.put(f"{BACKEND_URL}/admin/alerts/{alert_id}", json=update_data)
-    return handle_response(response)
+    updated = _write("PUT", f"/admin/alerts/{alert_id}", json=update_data)
+    if updated:
+        _alerts_changed()
+    return updated
 
 def archive_alert(alert_id: int) -> bool:
-    response = requests.delete(f"{BACKEND_URL}/admin/alerts/{alert_id}")
-    return handle_response(response, success_code=204) is not None
+    archived = _write("DELETE", f"/admin/alerts/{alert_id}", success_code=204) is not None
+    if archived:
+        _alerts_changed()
+    return archived
 
 # --- Admin Actions ---
 def trigger_reminders() -> Optional[Dict[str, Any]]:
-    response = requests.post(f"{BACKEND_URL}/admin/alerts/trigger-reminders")
-    return handle_response(response)
+    # Deliveries land in the background, so cached analytics catch up on their TTL
+    return _write("POST", "/admin/alerts/trigger-reminders")
 
 # --- End-User Alert Interaction ---
 def get_alerts_for_user(user_id: int) -> List[Dict[str, Any]]:
-    response = requests.get(f"{BACKEND_URL}/users/{user_id}/alerts")
-    data = handle_response(response)
+    data = _read(_get_inbox, f"/users/{user_id}/alerts")
     return data if data else []
 
 def mark_as_read(user_id: int, alert_id: int) -> bool:
-    response = requests.post(f"{BACKEND_URL}/users/{user_id}/alerts/{alert_id}/read")
-    return handle_response(response, success_code=204) is not None
+    done = _write("POST", f"/users/{user_id}/alerts/{alert_id}/read", success_code=204) is not None
+    if done:
+        _statuses_changed()
+    return done
 
 def snooze_alert(user_id: int, alert_id: int) -> bool:
-    response = requests.post(f"{BACKEND_URL}/users/{user_id}/alerts/{alert_id}/snooze")
-    return handle_response(response, success_code=204) is not None
\ No newline at end of file
+    done = _write("POST", f"/users/{user_id}/alerts/{alert_id}/snooze", success_code=204) is not None
+    if done:
+        _statuses_changed()
+    return done
+
+def bulk_update_alerts(user_id: int, action: str, alert_ids: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+    """Applies READ, SNOOZE or UNSNOOZE to the given alerts, or to every visible alert when alert_ids is None."""
+    payload = {"action": action, "alert_ids": alert_ids or [], "all_visible": alert_ids is None}
+    result = _write("POST", f"/users/{user_id}/alerts/bulk", json=payload)
+    if result:
+        _statuses_changed()
+    return result
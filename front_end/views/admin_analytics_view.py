@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from services import backend_service
+from views.pagination import current_page, page_buttons
 
 def show():
     st.title("📊 Analytics Dashboard")
@@ -34,6 +35,27 @@ def show():
     
     st.divider()
 
+    # --- Activity Over Time ---
+    st.header("Activity Over Time")
+    col1, col2 = st.columns(2)
+    with col1:
+        metric = st.selectbox("Metric", ["deliveries", "reads", "snoozes"])
+    with col2:
+        bucket = st.selectbox("Bucket", ["hour", "day", "minute"])
+
+    # The API downsamples to a bounded number of points, so this chart stays small however much history exists
+    series = backend_service.get_timeseries({"metric": metric, "bucket": bucket})
+    if series and series['points']:
+        series_df = pd.DataFrame(series['points'])
+        series_df['bucket_start'] = pd.to_datetime(series_df['bucket_start'])
+        st.line_chart(series_df.set_index('bucket_start')['count'], color="#00ADB5")
+        if series['bucket_seconds'] != {"minute": 60, "hour": 3600, "day": 86400}[bucket]:
+            st.caption(f"Downsampled to {series['bucket_seconds'] // 60} minute buckets.")
+    else:
+        st.info("No activity in this range yet.")
+
+    st.divider()
+
     # --- Severity Breakdown & Performance ---
     col1, col2 = st.columns([1, 2])
     with col1:
@@ -44,9 +66,16 @@ def show():
 
     with col2:
         st.header("Individual Alert Performance")
-        performance = data['alerts_performance']
-        if performance:
-            perf_df = pd.DataFrame(performance).set_index('alert_id')
+        sort_col, order_col = st.columns(2)
+        with sort_col:
+            sort = st.selectbox("Sort by", ["alert_id", "notifications_sent", "read_count", "snooze_count"])
+        with order_col:
+            order = st.selectbox("Order", ["desc", "asc"])
+
+        page = current_page("performance", backend_service.get_alerts_performance, {"sort": sort, "order": order})
+        if page and page['items']:
+            perf_df = pd.DataFrame(page['items']).set_index('alert_id')
             st.dataframe(perf_df, use_container_width=True)
+            page_buttons("performance", page)
         else:
-            st.info("No alert performance data available yet.")
\ No newline at end of file
+            st.info("No alert performance data available yet.")
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 from services import backend_service
+from views import pickers
+from views.pagination import current_page, page_buttons
 
 def show():
     st.title("👥 User & Team Management")
@@ -11,20 +13,28 @@ def show():
         st.header("Create New User")
         with st.container():
             st.markdown('<div class="form-container">', unsafe_allow_html=True)
-            teams = backend_service.list_teams()
-            team_map = {team['name']: team['id'] for team in teams}
+            first_teams = backend_service.list_teams({"limit": pickers.PICKER_LIMIT})
+            more_teams = first_teams['next_cursor'] is not None
+
+            def search_teams(text):
+                return backend_service.list_teams({"q": text, "limit": pickers.SEARCH_LIMIT})
+
+            # Outside the form so its search box updates it as you type
+            team_id = pickers.select_one(
+                "new_user_team", "Assign to Team", "teams", first_teams['items'], more_teams,
+                search_teams, pickers.team_label, blank="No team",
+            )
 
             with st.form("create_user_form"):
                 email = st.text_input("Email")
                 full_name = st.text_input("Full Name")
-                team_name = st.selectbox("Assign to Team", options=team_map.keys(), index=None)
                 
                 submitted = st.form_submit_button("Create User")
                 if submitted:
                     if email and full_name:
                         user_data = {
                             "email": email, "full_name": full_name,
-                            "team_id": team_map.get(team_name)
+                            "team_id": team_id
                         }
                         if backend_service.create_user(user_data):
                             st.success(f"User '{full_name}' created.")
@@ -33,9 +43,15 @@ def show():
             st.markdown('</div>', unsafe_allow_html=True)
         
         st.header("Existing Users")
-        users = backend_service.list_users()
-        if users:
-            st.dataframe(pd.DataFrame(users), use_container_width=True)
+        filter_team_id = pickers.select_one(
+            "user_filter_team", "Filter by Team", "teams", first_teams['items'], more_teams,
+            search_teams, pickers.team_label, blank="ALL",
+        )
+        params = {} if filter_team_id is None else {"team_id": filter_team_id}
+        users = current_page("users", backend_service.list_users, params)
+        if users['items']:
+            st.dataframe(pd.DataFrame(users['items']), use_container_width=True)
+            page_buttons("users", users)
         else:
             st.info("No users found.")
 
@@ -52,8 +68,9 @@ def show():
             st.markdown('</div>', unsafe_allow_html=True)
 
         st.header("Existing Teams")
-        teams_list = backend_service.list_teams()
-        if teams_list:
-            st.dataframe(pd.DataFrame(teams_list), use_container_width=True)
+        teams_page = current_page("teams", backend_service.list_teams, {})
+        if teams_page['items']:
+            st.dataframe(pd.DataFrame(teams_page['items']), use_container_width=True)
+            page_buttons("teams", teams_page)
         else:
             st.info("No teams found.")
\ No newline at end of file
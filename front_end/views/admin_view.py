@@ -1,43 +1,63 @@
 import streamlit as st
 import pandas as pd
 from services import backend_service
+from views import pickers
+from views.pagination import current_page, page_buttons
+
+DEFAULT_ALERT_FILTERS = {"is_archived": False} # the table's first page comes with the bootstrap payload
 
 def show():
     st.title("🚨 Alert Management")
 
+    # One request for the pickers, the alert table's first page and the edit picker
+    data = backend_service.get_bootstrap("admin")
+    if data is None:
+        return
+
     tab1, tab2 = st.tabs(["Create & View Alerts", "Update / Archive an Alert"])
 
     with tab1:
         st.header("Create New Alert")
         with st.container():
             st.markdown('<div class="form-container">', unsafe_allow_html=True)
-            users = backend_service.list_users()
-            teams = backend_service.list_teams()
-            
-            if not users:
+            if not data['users']:
                 st.error("Cannot create alerts. At least one user must exist.")
                 return
-                
-            user_map = {f"{user['full_name']} ({user['email']})": user['id'] for user in users}
-            team_map = {team['name']: team['id'] for team in teams}
+
+            def search_users(text):
+                return backend_service.list_users({"q": text, "is_active": True, "limit": pickers.SEARCH_LIMIT})
+
+            def search_teams(text):
+                return backend_service.list_teams({"q": text, "limit": pickers.SEARCH_LIMIT})
+
+            # The pickers sit outside the form so their search boxes update them as you type
+            creator_id = pickers.select_one(
+                "alert_creator", "Created By (Admin)", "users", data['users'], data['more_users'],
+                search_users, pickers.user_label,
+            )
+            is_org_wide = st.checkbox("Entire Organization")
+            target_team_ids = pickers.select_many(
+                "alert_target_teams", "Target Teams", "teams", data['teams'], data['more_teams'],
+                search_teams, pickers.team_label, disabled=is_org_wide,
+            )
+            target_user_ids = pickers.select_many(
+                "alert_target_users", "Target Users", "users", data['users'], data['more_users'],
+                search_users, pickers.user_label, disabled=is_org_wide,
+            )
 
             with st.form("create_alert_form"):
                 title = st.text_input("Title")
                 message_body = st.text_area("Message Body", height=150)
                 severity = st.selectbox("Severity", ["INFO", "WARNING", "CRITICAL"])
-                creator_name = st.selectbox("Created By (Admin)", options=user_map.keys())
-                is_org_wide = st.checkbox("Entire Organization")
-                target_team_names = st.multiselect("Target Teams", options=team_map.keys(), disabled=is_org_wide)
-                target_user_names = st.multiselect("Target Users", options=user_map.keys(), disabled=is_org_wide)
 
                 submitted = st.form_submit_button("Create Alert")
-                if submitted and title and message_body:
+                if submitted and title and message_body and creator_id is not None:
                     alert_data = {
                         "title": title, "message_body": message_body, "severity": severity,
                         "is_org_wide": is_org_wide,
-                        "target_team_ids": [team_map[name] for name in target_team_names],
-                        "target_user_ids": [user_map[name] for name in target_user_names],
-                        "created_by_id": user_map[creator_name]
+                        "target_team_ids": [] if is_org_wide else target_team_ids,
+                        "target_user_ids": [] if is_org_wide else target_user_ids,
+                        "created_by_id": creator_id
                     }
                     if backend_service.create_alert(alert_data):
                         st.success("Alert created!")
@@ -47,9 +67,9 @@ def show():
         st.header("View Alerts & Actions")
 
         if st.button("🔄 Trigger Reminder Cycle"):
-            with st.spinner("Processing reminders..."):
-                result = backend_service.trigger_reminders()
-                st.success(result.get('message', 'Reminders processed.'))
+            result = backend_service.trigger_reminders()
+            if result:
+                st.success(f"{result.get('message', 'Reminder cycle queued.')} (cycle {result.get('cycle_id', '')[:8]})")
         
         col1, col2 = st.columns(2)
         severity_filter = col1.selectbox("Filter by Severity", ["ALL", "INFO", "WARNING", "CRITICAL"])
@@ -59,26 +79,34 @@ def show():
         if severity_filter != "ALL":
             params["severity"] = severity_filter
 
-        alerts_data = backend_service.get_all_alerts_for_admin(params)
-        if alerts_data:
-            st.dataframe(pd.DataFrame(alerts_data), use_container_width=True)
+        def fetch_alerts(page_params):
+            if page_params == DEFAULT_ALERT_FILTERS:
+                return data['alerts']
+            return backend_service.get_all_alerts_for_admin(page_params)
+
+        alerts_page = current_page("alerts", fetch_alerts, params)
+        if alerts_page['items']:
+            st.dataframe(pd.DataFrame(alerts_page['items']), use_container_width=True)
+            page_buttons("alerts", alerts_page)
         else:
             st.info("No alerts match the current filters.")
 
 
     with tab2:
         st.header("Modify an Existing Alert")
-        all_alerts = backend_service.get_all_alerts_for_admin()
-        if not all_alerts:
+        if not data['alert_choices']:
             st.info("No alerts exist to modify.")
             return
 
-        alert_map = {f"ID {a['id']}: {a['title']}": a['id'] for a in all_alerts}
-        selected_alert_title = st.selectbox("Select an Alert to Modify", options=alert_map.keys())
+        alert_id = pickers.select_one(
+            "edit_alert", "Select an Alert to Modify", "alerts", data['alert_choices'], data['more_alert_choices'],
+            lambda text: backend_service.get_all_alerts_for_admin({"fields": "summary", "q": text, "limit": pickers.SEARCH_LIMIT}),
+            pickers.alert_label,
+        )
 
-        if selected_alert_title:
-            alert_id = alert_map[selected_alert_title]
-            alert_details = backend_service.get_alert_by_id(alert_id)
+        if alert_id is not None:
+            loaded = {alert['id']: alert for alert in data['alerts']['items']}
+            alert_details = loaded.get(alert_id) or backend_service.get_alert_by_id(alert_id)
 
             if alert_details:
                 with st.container():
@@ -99,4 +127,5 @@ def show():
                 st.subheader("Archive Alert")
                 if st.button("Archive this Alert", type="primary"):
                     if backend_service.archive_alert(alert_id):
+                        pickers.clear("edit_alert")
                         st.success("Alert archived!")
\ No newline at end of file
@@ -0,0 +1,26 @@
+import streamlit as st
+from typing import Any, Callable, Dict
+
+def current_page(key: str, fetch: Callable[[Dict[str, Any]], Dict[str, Any]], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fetches the page of a keyset-paginated list the user is on. The cursor of
+    every page visited is kept in session_state so "Previous" can go back;
+    changing `params` starts over from the first page.
+    """
+    if st.session_state.get(f"{key}_params") != params:
+        st.session_state[f"{key}_params"] = dict(params)
+        st.session_state[f"{key}_cursors"] = [None]
+    cursor = st.session_state[f"{key}_cursors"][-1]
+    return fetch(dict(params, cursor=cursor) if cursor else dict(params))
+
+def page_buttons(key: str, page: Dict[str, Any]):
+    cursors = st.session_state[f"{key}_cursors"]
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if len(cursors) > 1 and st.button("Previous Page", key=f"{key}_previous"):
+            cursors.pop()
+            st.rerun()
+    with next_col:
+        if page['next_cursor'] and st.button("Next Page", key=f"{key}_next"):
+            cursors.append(page['next_cursor'])
+            st.rerun()
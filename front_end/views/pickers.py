@@ -0,0 +1,76 @@
+import streamlit as st
+from typing import Any, Callable, Dict, List, Optional
+
+PICKER_LIMIT = 500 # options loaded up front; the API caps a page at 500
+SEARCH_LIMIT = 50 # matches offered for a search
+
+Item = Dict[str, Any]
+
+def _options(key: str, noun: str, first_items: List[Item], more: bool,
+             search: Callable[[str], Dict[str, Any]], label_of: Callable[[Item], str], disabled: bool) -> Dict[str, int]:
+    """
+    Option label -> id. Lists longer than what was loaded up front (`more`)
+    get a search box, and typing in it swaps the first items for the matches
+    the API finds.
+    """
+    items = first_items
+    if more:
+        text = st.text_input(
+            f"Search {noun}", key=f"{key}_search", disabled=disabled,
+            placeholder=f"Showing the first {len(first_items)}; type to find the others",
+        ).strip()
+        if text:
+            page = search(text)
+            items = page['items']
+            if page['next_cursor']:
+                st.caption(f"Showing the first {len(items)} matches; type more to narrow them down.")
+            elif not items:
+                st.caption(f"No {noun} match '{text}'.")
+    return {label_of(item): item['id'] for item in items}
+
+def select_one(key: str, label: str, noun: str, first_items: List[Item], more: bool,
+               search: Callable[[str], Dict[str, Any]], label_of: Callable[[Item], str],
+               blank: Optional[str] = None, disabled: bool = False) -> Optional[int]:
+    """
+    A selectbox over a list that may be too long to load whole; returns the
+    chosen id, or None for the `blank` option. The choice is kept in
+    session_state, so it survives searching for something else.
+    """
+    options = _options(key, noun, first_items, more, search, label_of, disabled)
+    if blank is not None:
+        options = {blank: None, **options}
+    chosen = st.session_state.get(f"{key}_chosen")
+    if chosen and chosen[0] not in options:
+        options = {chosen[0]: chosen[1], **options}
+    labels = list(options)
+    index = labels.index(chosen[0]) if chosen else (0 if labels else None)
+    picked = st.selectbox(label, options=labels, index=index, disabled=disabled)
+    if picked is None:
+        return None
+    st.session_state[f"{key}_chosen"] = (picked, options[picked])
+    return options[picked]
+
+def select_many(key: str, label: str, noun: str, first_items: List[Item], more: bool,
+                search: Callable[[str], Dict[str, Any]], label_of: Callable[[Item], str],
+                disabled: bool = False) -> List[int]:
+    """A multiselect counterpart of `select_one`; what was picked stays picked across searches."""
+    options = _options(key, noun, first_items, more, search, label_of, disabled)
+    chosen = st.session_state.get(f"{key}_chosen", {})
+    options = {**chosen, **options}
+    picked = st.multiselect(label, options=list(options), default=list(chosen), disabled=disabled)
+    st.session_state[f"{key}_chosen"] = {name: options[name] for name in picked}
+    return list(st.session_state[f"{key}_chosen"].values())
+
+def clear(key: str):
+    st.session_state.pop(f"{key}_chosen", None)
+    st.session_state.pop(f"{key}_search", None)
+
+# --- The lists the views pick from ---
+def user_label(user: Item) -> str:
+    return f"{user['full_name']} ({user['email']})"
+
+def team_label(team: Item) -> str:
+    return team['name']
+
+def alert_label(alert: Item) -> str:
+    return f"ID {alert['id']}: {alert['title']}"
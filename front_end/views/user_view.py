@@ -1,29 +1,51 @@
 import streamlit as st
 import pandas as pd
 from services import backend_service
+from views import pickers
 
 def show_end_user_view():
     st.title("Your Active Alerts")
 
     # --- User selection to simulate login ---
-    users = backend_service.list_users()
-    if not users:
+    # The selector keeps its choice in session_state, so the user list and that
+    # user's inbox arrive together in one request (the first user's on first load)
+    data = backend_service.get_bootstrap("user", st.session_state.get("inbox_user_id"))
+    if data is None:
+        return
+    if not data['users']:
         st.error("No users found. Please create a user in the Admin panel.")
         return
 
-    user_map = {f"{user['full_name']} ({user['email']})": user['id'] for user in users}
-    selected_user_name = st.selectbox("Select User to View Alerts For:", options=user_map.keys())
-    selected_user_id = user_map[selected_user_name]
-    
+    selected_user_id = pickers.select_one(
+        "inbox_user", "Select User to View Alerts For:", "users", data['users'], data['more_users'],
+        lambda text: backend_service.list_users({"q": text, "is_active": True, "limit": pickers.SEARCH_LIMIT}),
+        pickers.user_label,
+    )
+    st.session_state["inbox_user_id"] = selected_user_id
+
     st.divider()
 
     # --- Display Alerts for the selected user ---
-    user_alerts = backend_service.get_alerts_for_user(selected_user_id)
+    if selected_user_id == data['user_id']:
+        user_alerts = data['inbox']
+    else:
+        user_alerts = backend_service.get_alerts_for_user(selected_user_id)
 
     if not user_alerts:
         st.success("🎉 No active alerts for you. All clear!")
         return
 
+    # --- Bulk actions: one request for every visible alert ---
+    bulk_col1, bulk_col2, _ = st.columns([1, 1, 2])
+    with bulk_col1:
+        if st.button("Mark All as Read", key="bulk_read"):
+            if backend_service.bulk_update_alerts(selected_user_id, "READ"):
+                st.rerun()
+    with bulk_col2:
+        if st.button("Snooze All for Today", key="bulk_snooze"):
+            if backend_service.bulk_update_alerts(selected_user_id, "SNOOZE"):
+                st.rerun()
+
     for alert in user_alerts:
         alert_id = alert['id']
         status = alert['personal_status']['status']
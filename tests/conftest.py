@@ -0,0 +1,50 @@
+"""
+The API reads its settings on import, so the environment is set here, before
+any test module imports it. Tests run against a throwaway SQLite file, or
+against TEST_DB_URL when it is set (a scratch database: its tables are dropped).
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+API_DIR = Path(__file__).resolve().parents[1] / "api"
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.update({
+    "DB_URL": os.environ.get("TEST_DB_URL") or f"sqlite:///{_tmpdir.name}/test.db",
+    "ASYNC_DB_ENABLED": "false",
+    "REMINDER_INTERVAL_SECONDS": "0",
+    "OUTBOX_DISPATCH_ENABLED": "false",
+    "RETENTION_INTERVAL_SECONDS": "0",
+    "DB_POOL_LOG_INTERVAL_SECONDS": "0",
+    "RESOURCE_VERSION_TTL_SECONDS": "0", # every request reads the versions, as a cold one would
+})
+sys.path.insert(0, str(API_DIR))
+
+
+def pytest_unconfigure(config):
+    _tmpdir.cleanup()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """A TestClient on empty tables, shared by the tests of one module."""
+    from fastapi.testclient import TestClient
+
+    import main
+    from core import http_cache, inbox
+    from services import models
+    from services.database import engine
+    from services.migrations import run_migrations
+
+    # As main.py does on import, but from empty tables
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    inbox.inbox_cache.clear()
+    http_cache.response_cache.clear()
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,125 @@
+"""
+The EMAIL channel against a local SMTP stand-in (aiosmtpd): a drained batch
+reaches the server, and while the server is down its job is retried with
+backoff until it ends up DEAD.
+"""
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select, update
+
+from core import outbox
+from core.notifications import EmailNotificationChannel, NotificationTarget
+from services import models
+from services.database import SessionLocal
+from utils.settings import settings
+
+jobs = models.DeliveryJob.__table__
+
+
+class SmtpStandIn:
+    """An SMTP server on a free local port that keeps every message it accepts."""
+    def __init__(self):
+        self.envelopes = []
+        self.controller = Controller(self, hostname="127.0.0.1", port=_free_port())
+        self.running = False
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+    def start(self):
+        self.controller.start()
+        self.running = True
+
+    def stop(self):
+        if self.running:
+            self.controller.stop()
+            self.running = False
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    server = SmtpStandIn()
+    monkeypatch.setattr(settings, "SMTP_HOST", server.controller.hostname)
+    monkeypatch.setattr(settings, "SMTP_PORT", server.controller.port)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="module")
+def target(client):
+    client.post("/admin/teams/", json={"id": 1, "name": "Ops"}).raise_for_status()
+    user = client.post("/admin/users/", json={"email": "ops@example.com", "full_name": "Ops", "team_id": 1})
+    user.raise_for_status()
+    alert = client.post("/admin/alerts/", json={
+        "title": "Disk full", "message_body": "db-1 is at 95%", "severity": "CRITICAL",
+        "created_by_id": user.json()["id"], "target_team_ids": [1],
+    })
+    alert.raise_for_status()
+    return NotificationTarget(user.json()["id"], alert.json()["id"], models.AlertSeverity.CRITICAL, "Disk full")
+
+
+def _enqueue(target: NotificationTarget) -> int:
+    with SessionLocal() as db:
+        assert outbox.enqueue(db, [target], [EmailNotificationChannel()]) == 1
+        db.commit()
+        return db.execute(select(jobs.c.id).where(jobs.c.channel == "EMAIL")).scalar_one()
+
+
+def _job(job_id: int):
+    with SessionLocal() as db:
+        return db.execute(select(jobs).where(jobs.c.id == job_id)).one_or_none()
+
+
+def test_drained_email_reaches_the_server(smtp, target):
+    job_id = _enqueue(target)
+
+    assert outbox.process_batch(EmailNotificationChannel()) == 1
+
+    [envelope] = smtp.envelopes
+    assert envelope.rcpt_tos == ["ops@example.com"]
+    message = envelope.content.decode()
+    assert "Subject: [CRITICAL] Disk full" in message and "db-1 is at 95%" in message
+    assert _job(job_id) is None
+    with SessionLocal() as db:
+        assert db.execute(select(models.NotificationDelivery.channel).where(
+            models.NotificationDelivery.user_id == target.user_id,
+            models.NotificationDelivery.alert_id == target.alert_id,
+        )).scalars().all() == ["EMAIL"]
+
+
+def test_email_is_retried_with_backoff_until_dead(smtp, target, monkeypatch):
+    smtp.stop()
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    job_id = _enqueue(target)
+
+    for attempts in (1, 2):
+        before = datetime.utcnow()
+        assert outbox.process_batch(EmailNotificationChannel()) == 1
+        job = _job(job_id)
+        assert (job.status, job.attempts) == ("PENDING", attempts)
+        assert "ConnectionRefusedError" in job.last_error
+        # OUTBOX_RETRY_BASE_SECONDS doubled per attempt, with jitter between half and all of it
+        delay = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        assert before + timedelta(seconds=delay / 2) <= job.next_attempt_at.replace(tzinfo=None)
+        assert job.next_attempt_at.replace(tzinfo=None) <= datetime.utcnow() + timedelta(seconds=delay)
+
+        assert outbox.process_batch(EmailNotificationChannel()) == 0 # not due yet
+        with SessionLocal() as db:
+            db.execute(update(jobs).where(jobs.c.id == job_id).values(next_attempt_at=datetime.utcnow()))
+            db.commit()
+
+    assert outbox.process_batch(EmailNotificationChannel()) == 1
+    job = _job(job_id)
+    assert (job.status, job.attempts) == ("DEAD", 3)
+    assert smtp.envelopes == []
@@ -0,0 +1,78 @@
+"""
+The list endpoints and the inbox must run a fixed number of SQL statements,
+however many rows they return: an N+1 (a lazy load per row) shows up here as
+a count that grows with the page.
+
+Run from the repository root: python -m pytest -q
+"""
+import pytest
+from sqlalchemy import event
+
+from core import http_cache, inbox
+from services.database import engine
+
+
+@pytest.fixture(scope="module")
+def client(client):
+    for team_id, name in ((1, "Ops"), (2, "Sales")):
+        client.post("/admin/teams/", json={"id": team_id, "name": name}).raise_for_status()
+    for i in range(8):
+        client.post("/admin/users/", json={
+            "email": f"user{i}@example.com", "full_name": f"User {i}", "team_id": 1 if i < 4 else 2,
+        }).raise_for_status()
+    alerts = [
+        {"is_org_wide": True},
+        {"target_team_ids": [1]},
+        {"target_team_ids": [1, 2], "severity": "CRITICAL"},
+        {"target_user_ids": [1, 2, 5]},
+        {"target_team_ids": [1], "target_user_ids": [6]},
+        {"target_team_ids": [2], "severity": "WARNING"},
+    ]
+    for i, targets in enumerate(alerts):
+        client.post("/admin/alerts/", json={
+            "title": f"Alert {i}", "message_body": "Body", "created_by_id": i % 3 + 1, **targets,
+        }).raise_for_status()
+    client.post("/users/1/alerts/1/read").raise_for_status()
+    client.post("/users/1/alerts/2/snooze").raise_for_status()
+    return client
+
+
+@pytest.fixture
+def count_statements(client):
+    """Returns a function that GETs a path on a cold cache and returns the statements it ran."""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def get(path):
+        inbox.inbox_cache.clear()
+        http_cache.response_cache.clear()
+        statements.clear()
+        response = client.get(path)
+        assert response.status_code == 200, response.text
+        return len(statements), response.json()
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield get
+    event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.mark.parametrize("path", ["/admin/alerts/", "/admin/alerts/?fields=summary", "/admin/users/"])
+def test_list_statements_do_not_grow_with_page_size(count_statements, path):
+    separator = "&" if "?" in path else "?"
+    small_count, small = count_statements(f"{path}{separator}limit=2")
+    large_count, large = count_statements(f"{path}{separator}limit=50")
+
+    assert len(small["items"]) == 2 and small["next_cursor"]
+    assert len(large["items"]) > 2 and large["next_cursor"] is None
+    assert small_count == large_count
+
+
+def test_inbox_statements_do_not_grow_with_alerts(count_statements):
+    # User 1 (Ops) sees five alerts, with a read and a snoozed status; user 8 (Sales) sees three
+    large_count, large = count_statements("/users/1/alerts")
+    small_count, small = count_statements("/users/8/alerts")
+
+    assert len(large) == 5 and len(small) == 3
+    assert small_count == large_count
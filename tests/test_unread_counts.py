@@ -0,0 +1,78 @@
+"""
+Badge polls recompute stale counters on the read path, so two polls of the same
+user may recompute the same counter at once. Against PostgreSQL (TEST_DB_URL)
+a delete-then-insert made the later commit fail on the primary key.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from core import unread_counts
+from services import models
+from services.database import SessionLocal
+
+counts = models.UserUnreadCount.__table__
+
+
+@pytest.fixture(scope="module")
+def user_id(client):
+    client.post("/admin/teams/", json={"id": 1, "name": "Ops"}).raise_for_status()
+    user = client.post("/admin/users/", json={"email": "ops@example.com", "full_name": "Ops", "team_id": 1})
+    user.raise_for_status()
+    for targets in ({"is_org_wide": True}, {"target_team_ids": [1]}):
+        client.post("/admin/alerts/", json={
+            "title": "Alert", "message_body": "Body", "created_by_id": user.json()["id"], **targets,
+        }).raise_for_status()
+    return user.json()["id"]
+
+
+def _make_stale(user_id: int):
+    with SessionLocal() as db:
+        unread_counts.get_unread_counts(db, [user_id]) # make sure the row exists
+        db.execute(update(counts).where(counts.c.user_id == user_id).values(
+            unread_count=99, valid_until=datetime.utcnow() - timedelta(minutes=1),
+        ))
+        db.commit()
+
+
+def test_concurrent_polls_recompute_a_stale_counter_once(user_id, monkeypatch):
+    _make_stale(user_id)
+
+    # Both polls have seen the stale counter before either of them writes
+    both_stale = threading.Barrier(2, timeout=10)
+    recompute = unread_counts.recompute
+    def recompute_together(db, user_ids=None):
+        both_stale.wait()
+        recompute(db, user_ids)
+    monkeypatch.setattr(unread_counts, "recompute", recompute_together)
+
+    results, errors = [], []
+    def poll():
+        try:
+            with SessionLocal() as db:
+                results.append(unread_counts.get_unread_counts(db, [user_id]))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=poll) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [{user_id: 2}, {user_id: 2}]
+    with SessionLocal() as db:
+        rows = db.execute(select(counts).where(counts.c.user_id == user_id)).all()
+    assert len(rows) == 1 and rows[0].unread_count == 2
+    assert rows[0].valid_until is None or rows[0].valid_until > datetime.utcnow()
+
+
+def test_stale_counters_of_deleted_users_are_dropped(user_id):
+    _make_stale(user_id)
+    with SessionLocal() as db:
+        unread_counts.recompute(db, [user_id, user_id + 1000])
+        db.commit()
+        assert unread_counts.get_unread_counts(db, [user_id, user_id + 1000]) == {user_id: 2}